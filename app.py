@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, send_file, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, send_file, session, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_cors import CORS
@@ -15,7 +15,16 @@ from datetime import datetime, timedelta
 from services.document_processor import DocumentProcessor
 from services.chatbot_trainer import ChatbotTrainer
 from services.chat_service_openai import ChatServiceOpenAI
+from services.training_queue import TrainingQueue, WORKER_ID
+from services.response_cache import response_cache
+from services.conversation_store import get_conversation_store
+from services.usage_buffer import UsageBuffer
+from services.settings_cache import settings_cache
+from services.plan_cache import plan_cache
+from services.homepage_chatbot import homepage_chatbot_cache
 from services.analytics_service import AnalyticsService
+from services import conversation_rollup
+from services.keyword_cache import keyword_cache
 
 # Optional Stripe dependency (guarded)
 try:
@@ -33,6 +42,7 @@ except ImportError:
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+usage_buffer = UsageBuffer()
 
 # Database Models
 class User(UserMixin, db.Model):
@@ -62,8 +72,15 @@ class Chatbot(db.Model):
     greeting_message = db.Column(db.String(500), nullable=True)  # Custom greeting message
     homepage_url = db.Column(db.String(500), nullable=True)  # Homepage URL
     contact_us_url = db.Column(db.String(500), nullable=True)  # Contact US URL
+    # Answer cache for repeated questions (NULL TTL / size = RESPONSE_CACHE_TTL / RESPONSE_CACHE_MAX_ENTRIES)
+    response_cache_enabled = db.Column(db.Boolean, default=True)
+    response_cache_ttl = db.Column(db.Integer, nullable=True)  # seconds
+    response_cache_max_entries = db.Column(db.Integer, nullable=True)
     documents = db.relationship('Document', backref='chatbot', lazy=True, cascade='all, delete-orphan')
     conversations = db.relationship('Conversation', backref='chatbot', lazy=True, cascade='all, delete-orphan')
+    training_jobs = db.relationship('TrainingJob', backref='chatbot', lazy=True, cascade='all, delete-orphan')
+    daily_stats = db.relationship('ConversationDailyStats', lazy=True, cascade='all, delete-orphan')
+    cached_keywords = db.relationship('ChatbotKeywords', uselist=False, lazy=True, cascade='all, delete-orphan')
 
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -74,13 +91,56 @@ class Document(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     processed = db.Column(db.Boolean, default=False)
 
+class TrainingJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    chatbot_id = db.Column(db.Integer, db.ForeignKey('chatbot.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # 'queued', 'running', 'completed', 'failed'
+    message = db.Column(db.String(500), nullable=True)  # Latest progress message
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    worker_id = db.Column(db.String(64), nullable=True)  # Process that queued / runs the job (services/training_queue.py)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Last sign of life of the running job
+
 class Conversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     chatbot_id = db.Column(db.Integer, db.ForeignKey('chatbot.id'), nullable=False)
     user_message = db.Column(db.Text, nullable=False)
     bot_response = db.Column(db.Text, nullable=False)
+    conversation_id = db.Column(db.String(64), nullable=True, index=True)  # Chat session the turn belongs to
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     response_status = db.Column(db.String(20), default='active')  # 'active', 'resolved', 'pending'
+    
+    # Per-chatbot time ranges (analytics rollups, latest conversations)
+    __table_args__ = (db.Index('ix_conversation_chatbot_timestamp', 'chatbot_id', 'timestamp'),)
+
+class ConversationDailyStats(db.Model):
+    # Analytics rollup of Conversation: one row per chatbot, day and hour of day (UTC), see services/conversation_rollup.py
+    id = db.Column(db.Integer, primary_key=True)
+    chatbot_id = db.Column(db.Integer, db.ForeignKey('chatbot.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    hour = db.Column(db.Integer, nullable=False)  # 0-23
+    conversation_count = db.Column(db.Integer, nullable=False, default=0)
+    resolved_count = db.Column(db.Integer, nullable=False, default=0)
+    active_count = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    message_length_sum = db.Column(db.Integer, nullable=False, default=0)  # characters of the user messages
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('uq_conversation_daily_stats', 'chatbot_id', 'day', 'hour', unique=True),)
+
+class ChatbotKeywords(db.Model):
+    # Analytics keywords of a chatbot, extracted in the background (services/keyword_cache.py)
+    chatbot_id = db.Column(db.Integer, db.ForeignKey('chatbot.id'), primary_key=True)
+    keywords = db.Column(db.Text, nullable=False)  # JSON list of {'keyword', 'score'}
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class ConversationState(db.Model):
+    # OpenAI response chain of a chat conversation (SQL backend of services/conversation_store.py)
+    conversation_id = db.Column(db.String(64), primary_key=True)
+    response_id = db.Column(db.String(255), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 class ChatbotUsage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -93,6 +153,9 @@ class ChatbotUsage(db.Model):
     usage_count = db.Column(db.Integer, default=1)
     is_active = db.Column(db.Boolean, default=True)
     
+    # One row per chatbot and website, so buffered counts can be upserted (see migrate_add_usage_unique_domain.py)
+    __table_args__ = (db.Index('uq_chatbot_usage_domain', 'chatbot_id', 'website_domain', unique=True),)
+    
     # Relationships
     chatbot = db.relationship('Chatbot', backref='usage_tracking')
 
@@ -177,43 +240,53 @@ class HomepageSection(db.Model):
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+ADMIN_PLAN_DEFAULTS = {
+    'name': 'Admin',
+    'description': 'Admin plan with unlimited access',
+    'monthly_price': 0.0,
+    'yearly_price': 0.0,
+    'chatbot_limit': 999999,  # Effectively unlimited
+    'file_size_limit_mb': 999999,  # Effectively unlimited
+    'features': json.dumps(['Unlimited chatbots', 'Unlimited file uploads', 'Admin access']),
+    'is_active': True
+}
+
+FREE_PLAN_DEFAULTS = {
+    'name': 'Free',
+    'description': 'Free plan for all users',
+    'monthly_price': 0.0,
+    'yearly_price': 0.0,
+    'chatbot_limit': 3,
+    'features': json.dumps(['Up to 3 chatbots', 'Basic support']),
+    'is_active': True
+}
+
+def ensure_default_plans():
+    """Create the Admin and Free plans if they are missing (run once at startup)"""
+    created = False
+    for defaults in (ADMIN_PLAN_DEFAULTS, FREE_PLAN_DEFAULTS):
+        if not Plan.query.filter_by(name=defaults['name']).first():
+            db.session.add(Plan(**defaults))
+            created = True
+    if created:
+        db.session.commit()
+
 def get_user_plan(user):
-    """Get the user's current plan based on active subscription, else Free."""
+    """
+    Get the user's current plan based on active subscription, else Free.
+    Served from the plan cache; returns a read-only snapshot of the Plan row.
+    """
+    plan = plan_cache.get(user.id, user.is_admin)
+    if plan is None:
+        plan = plan_cache.put(user.id, user.is_admin, _resolve_user_plan(user))
+    return plan
+
+def _resolve_user_plan(user):
     # Admin users get unlimited access
     if user.is_admin:
-        # Get admin plan with unlimited access
         admin_plan = Plan.query.filter_by(name='Admin').first()
-        if not admin_plan:
-            try:
-                admin_plan = Plan(
-                    name='Admin',
-                    description='Admin plan with unlimited access',
-                    monthly_price=0.0,
-                    yearly_price=0.0,
-                    chatbot_limit=999999,  # Effectively unlimited
-                    file_size_limit_mb=999999,  # Effectively unlimited
-                    features=json.dumps(['Unlimited chatbots', 'Unlimited file uploads', 'Admin access']),
-                    is_active=True
-                )
-                db.session.add(admin_plan)
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                # If creation fails, try to get existing admin plan
-                admin_plan = Plan.query.filter_by(name='Admin').first()
-                if not admin_plan:
-                    # If still no plan, create a fallback plan object
-                    admin_plan = Plan(
-                        name='Admin',
-                        description='Admin plan with unlimited access',
-                        monthly_price=0.0,
-                        yearly_price=0.0,
-                        chatbot_limit=999999,
-                        file_size_limit_mb=999999,
-                        features=json.dumps(['Unlimited chatbots', 'Unlimited file uploads', 'Admin access']),
-                        is_active=True
-                    )
-        return admin_plan
+        # Default plans are seeded at startup; fall back to an unsaved plan if it was deleted
+        return admin_plan or Plan(**ADMIN_PLAN_DEFAULTS)
     
     try:
         sub = UserSubscription.query.filter_by(user_id=user.id, status='active').order_by(UserSubscription.created_at.desc()).first()
@@ -225,19 +298,7 @@ def get_user_plan(user):
         pass
 
     free_plan = Plan.query.filter_by(name='Free', is_active=True).first()
-    if not free_plan:
-        free_plan = Plan(
-            name='Free',
-            description='Free plan for all users',
-            monthly_price=0.0,
-            yearly_price=0.0,
-            chatbot_limit=3,
-            features=json.dumps(['Up to 3 chatbots', 'Basic support']),
-            is_active=True
-        )
-        db.session.add(free_plan)
-        db.session.commit()
-    return free_plan
+    return free_plan or Plan(**FREE_PLAN_DEFAULTS)
 
 
 def get_site_settings():
@@ -363,7 +424,7 @@ def admin_required(f):
     return decorated_function
 
 def set_setting(key, value):
-    """Set a setting value in the database"""
+    """Set a setting value in the database (every worker's settings cache picks it up)"""
     setting = Settings.query.filter_by(key=key).first()
     if setting:
         setting.value = value
@@ -371,7 +432,9 @@ def set_setting(key, value):
     else:
         setting = Settings(key=key, value=value)
         db.session.add(setting)
+    settings_cache.bump_generation()
     db.session.commit()
+    settings_cache.invalidate_local()
     return setting
 
 def encode_image_to_base64(file):
@@ -447,7 +510,7 @@ def is_valid_chatbot_name(name):
     return True, "Valid"
 
 def track_chatbot_usage(chatbot_id, website_url):
-    """Track where a chatbot is being used"""
+    """Track where a chatbot is being used (buffered, written to the database in batches)"""
     try:
         from urllib.parse import urlparse
         
@@ -459,36 +522,36 @@ def track_chatbot_usage(chatbot_id, website_url):
         if domain in ['localhost', '127.0.0.1', '0.0.0.0'] or domain.endswith('.local'):
             return
         
-        # Check if usage already exists
-        existing_usage = ChatbotUsage.query.filter_by(
-            chatbot_id=chatbot_id, 
-            website_domain=domain
-        ).first()
-        
-        if existing_usage:
-            # Update existing usage
-            existing_usage.last_seen = datetime.utcnow()
-            existing_usage.usage_count += 1
-            existing_usage.is_active = True
-        else:
-            # Create new usage record
-            usage = ChatbotUsage(
-                chatbot_id=chatbot_id,
-                website_url=website_url,
-                website_domain=domain,
-                website_title=None,  # Could be populated later with web scraping
-                first_seen=datetime.utcnow(),
-                last_seen=datetime.utcnow(),
-                usage_count=1,
-                is_active=True
-            )
-            db.session.add(usage)
-        
-        db.session.commit()
+        usage_buffer.record(chatbot_id, domain[:255], website_url[:500])
     except Exception as e:
         print(f"Error tracking chatbot usage: {e}")
         # Don't fail the main request if tracking fails
 
+def save_conversation(chatbot_id, user_message, bot_response, conversation_id=None):
+    """Store one chat exchange (and count it in the analytics rollup, in the same transaction)"""
+    conversation = Conversation(
+        chatbot_id=chatbot_id,
+        user_message=user_message,
+        bot_response=bot_response,
+        conversation_id=conversation_id[:64] if conversation_id else None,  # ids come from the widget
+        timestamp=datetime.utcnow()
+    )
+    db.session.add(conversation)
+    conversation_rollup.record_turn(chatbot_id, conversation.timestamp, len(user_message))
+    db.session.commit()
+
+def end_conversation(chatbot_id, conversation_id, resolved):
+    """Record whether the visitor's questions were answered when a conversation ends"""
+    # Set-based UPDATEs of this conversation's turns (indexed on conversation_id), which also
+    # move their counts between the status columns of the analytics rollup
+    conversation_rollup.set_conversation_status(chatbot_id, conversation_id[:64], 'resolved' if resolved else 'active')
+    db.session.commit()
+    # The visitor starts over next time, so forget the OpenAI response chain
+    try:
+        get_conversation_store().delete(conversation_id)
+    except Exception as e:
+        print(f"[WARNING] Could not clear conversation state {conversation_id}: {e}")
+
 def create_app():
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
@@ -532,9 +595,8 @@ def create_app():
     # Add custom Jinja2 function for getting settings
     @app.template_global()
     def get_setting(key, default=None):
-        """Get a setting value from the database"""
-        setting = Settings.query.filter_by(key=key).first()
-        return setting.value if setting else default
+        """Get a setting value (served from the settings cache)"""
+        return settings_cache.get(key, default)
     
     @app.template_global()
     def get_logo_url(site_settings):
@@ -579,6 +641,12 @@ def create_app():
 
     db.init_app(app)
     login_manager.init_app(app)
+    usage_buffer.init_app(
+        app,
+        flush_interval=float(os.getenv('USAGE_FLUSH_INTERVAL', '5')),
+        max_pending=int(os.getenv('USAGE_FLUSH_MAX_PENDING', '500'))
+    )
+    keyword_cache.init_app(app)
     login_manager.login_view = 'login'
     
     # Enable CORS for all routes to allow embedded chatbots on external websites
@@ -591,23 +659,38 @@ def create_app():
     })
     
     # Initialize services
-    document_processor = DocumentProcessor()
+    document_processor = DocumentProcessor(cache_dir=os.path.join(app.config['UPLOAD_FOLDER'], '.extraction_cache'))
     chatbot_trainer = ChatbotTrainer()
 
     # Initialize chat service lazily to avoid startup errors
     chat_service = None
+    local_chat_service = None
 
     def get_chat_service():
         nonlocal chat_service
         if chat_service is None:
             try:
-                chat_service = ChatServiceOpenAI()
+                chat_service = ChatServiceOpenAI(trainer=chatbot_trainer)
             except ValueError as e:
                 print(f"WARNING: {e}")
                 print("INFO: OpenAI service not available. Some features may be limited.")
                 return None
         return chat_service
 
+    def get_local_chat_service():
+        # Local fallback service shares the trainer (and its embedding model) with the rest of the app
+        nonlocal local_chat_service
+        if local_chat_service is None:
+            from services.chat_service import ChatService
+            local_chat_service = ChatService(trainer=chatbot_trainer)
+        return local_chat_service
+
+    # Shared with the ASGI entry point (asgi.py), which serves the chat API outside Flask routing
+    app.extensions['chat_services'] = {
+        'openai': get_chat_service,
+        'local': get_local_chat_service
+    }
+
     # Routes
 
     @app.before_request
@@ -627,27 +710,10 @@ def create_app():
 
     @app.route('/')
     def index():
-        # Get homepage chatbot settings
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get the chatbot details if configured
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        # Fallback to demo chatbot if no specific one is configured
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         # Get active homepage sections ordered by order field
         homepage_sections = HomepageSection.query.filter_by(is_active=True).order_by(HomepageSection.order.asc(), HomepageSection.created_at.asc()).all()
         
         return render_template('index.html',
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder,
                              homepage_sections=homepage_sections)
 
     @app.route('/health')
@@ -692,25 +758,8 @@ def create_app():
                 # Get active FAQ items for error case
                 faqs = FAQ.query.filter_by(is_active=True).order_by(FAQ.order.asc(), FAQ.created_at.asc()).all()
                 
-                # Get homepage chatbot settings for chatbot display
-                homepage_chatbot_id = get_setting('homepage_chatbot_id')
-                homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-                homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-                
-                # Get the chatbot details if configured
-                homepage_chatbot = None
-                if homepage_chatbot_id:
-                    homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-                
-                # Fallback to demo chatbot if no specific one is configured
-                if not homepage_chatbot:
-                    homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-                
                 return render_template('contact.html', 
-                                     faqs=faqs,
-                                     homepage_chatbot=homepage_chatbot,
-                                     homepage_chatbot_title=homepage_chatbot_title,
-                                     homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                                     faqs=faqs)
                 
                 # Email validation
                 if '@' not in email or '.' not in email:
@@ -718,25 +767,8 @@ def create_app():
                     # Get active FAQ items for error case
                     faqs = FAQ.query.filter_by(is_active=True).order_by(FAQ.order.asc(), FAQ.created_at.asc()).all()
                     
-                    # Get homepage chatbot settings for chatbot display
-                    homepage_chatbot_id = get_setting('homepage_chatbot_id')
-                    homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-                    homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-                    
-                    # Get the chatbot details if configured
-                    homepage_chatbot = None
-                    if homepage_chatbot_id:
-                        homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-                    
-                    # Fallback to demo chatbot if no specific one is configured
-                    if not homepage_chatbot:
-                        homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-                    
                     return render_template('contact.html', 
-                                         faqs=faqs,
-                                         homepage_chatbot=homepage_chatbot,
-                                         homepage_chatbot_title=homepage_chatbot_title,
-                                         homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                                         faqs=faqs)
                 
                 try:
                     # Create email content
@@ -761,25 +793,8 @@ Time: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
                         # Get active FAQ items for error case
                         faqs = FAQ.query.filter_by(is_active=True).order_by(FAQ.order.asc(), FAQ.created_at.asc()).all()
                         
-                        # Get homepage chatbot settings for chatbot display
-                        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-                        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-                        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-                        
-                        # Get the chatbot details if configured
-                        homepage_chatbot = None
-                        if homepage_chatbot_id:
-                            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-                        
-                        # Fallback to demo chatbot if no specific one is configured
-                        if not homepage_chatbot:
-                            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-                        
                         return render_template('contact.html', 
-                                             faqs=faqs,
-                                             homepage_chatbot=homepage_chatbot,
-                                             homepage_chatbot_title=homepage_chatbot_title,
-                                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                                             faqs=faqs)
                     
                     send_email(admin_email, email_subject, email_body)
                     
@@ -809,72 +824,21 @@ Best regards,
                     # Get active FAQ items for error case
                     faqs = FAQ.query.filter_by(is_active=True).order_by(FAQ.order.asc(), FAQ.created_at.asc()).all()
                     
-                    # Get homepage chatbot settings for chatbot display
-                    homepage_chatbot_id = get_setting('homepage_chatbot_id')
-                    homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-                    homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-                    
-                    # Get the chatbot details if configured
-                    homepage_chatbot = None
-                    if homepage_chatbot_id:
-                        homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-                    
-                    # Fallback to demo chatbot if no specific one is configured
-                    if not homepage_chatbot:
-                        homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-                    
                     return render_template('contact.html', 
-                                         faqs=faqs,
-                                         homepage_chatbot=homepage_chatbot,
-                                         homepage_chatbot_title=homepage_chatbot_title,
-                                         homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                                         faqs=faqs)
         
         # Get active FAQ items ordered by order field
         faqs = FAQ.query.filter_by(is_active=True).order_by(FAQ.order.asc(), FAQ.created_at.asc()).all()
         
-        # Get homepage chatbot settings for chatbot display
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get the chatbot details if configured
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        # Fallback to demo chatbot if no specific one is configured
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         return render_template('contact.html', 
-                             faqs=faqs,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             faqs=faqs)
 
     @app.route('/plans')
     def plans():
         plans = Plan.query.filter_by(is_active=True).order_by(Plan.monthly_price.asc()).all()
         
-        # Get homepage chatbot settings for chatbot display
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get the chatbot details if configured
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        # Fallback to demo chatbot if no specific one is configured
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         return render_template('plans.html', 
-                             plans=plans,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             plans=plans)
 
     @app.route('/register', methods=['GET', 'POST'])
     def register():
@@ -1027,28 +991,11 @@ Best regards,
         current_chatbot_count = len(chatbots)
         remaining_chatbots = (current_user.user_plan.chatbot_limit - current_chatbot_count) if current_user.user_plan else 0
         
-        # Get homepage chatbot settings for chatbot display
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get the chatbot details if configured
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        # Fallback to demo chatbot if no specific one is configured
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         return render_template('dashboard.html', 
                              chatbots=chatbots,
                              user_plan=current_user.user_plan,
                              current_chatbot_count=current_chatbot_count,
-                             remaining_chatbots=remaining_chatbots,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             remaining_chatbots=remaining_chatbots)
 
     @app.route('/profile', methods=['GET', 'POST'])
     @login_required
@@ -1223,27 +1170,10 @@ Best regards,
         current_chatbot_count = Chatbot.query.filter_by(user_id=current_user.id).count()
         remaining_chatbots = user_plan.chatbot_limit - current_chatbot_count
         
-        # Get homepage chatbot settings for chatbot display
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get the chatbot details if configured
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        # Fallback to demo chatbot if no specific one is configured
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         return render_template('create_chatbot.html', 
                              user_plan=user_plan, 
                              current_chatbot_count=current_chatbot_count,
-                             remaining_chatbots=remaining_chatbots,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             remaining_chatbots=remaining_chatbots)
 
     @app.route('/<username>/<chatbot_name>')
     @login_required
@@ -1265,27 +1195,11 @@ Best regards,
         # Get usage tracking data
         usage_data = ChatbotUsage.query.filter_by(chatbot_id=chatbot.id, is_active=True).order_by(ChatbotUsage.last_seen.desc()).all()
         
-        # Get homepage chatbot settings
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get homepage chatbot
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         return render_template('chatbot_details.html', 
                              chatbot=chatbot, 
                              documents=documents, 
                              conversations=conversations,
-                             usage_data=usage_data,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             usage_data=usage_data)
 
     @app.route('/chatbot/<int:chatbot_id>')
     @login_required
@@ -1297,27 +1211,11 @@ Best regards,
         # Get usage tracking data
         usage_data = ChatbotUsage.query.filter_by(chatbot_id=chatbot_id, is_active=True).order_by(ChatbotUsage.last_seen.desc()).all()
         
-        # Get homepage chatbot settings
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get homepage chatbot
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
-        
         return render_template('chatbot_details.html', 
                              chatbot=chatbot, 
                              documents=documents, 
                              conversations=conversations,
-                             usage_data=usage_data,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             usage_data=usage_data)
 
     @app.route('/chatbot/<int:chatbot_id>/analytics')
     @login_required
@@ -1325,38 +1223,15 @@ Best regards,
         """Display analytics for a chatbot's conversations"""
         chatbot = Chatbot.query.filter_by(id=chatbot_id, user_id=current_user.id).first_or_404()
         
-        # Get conversations from the last 30 days only
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        conversations = Conversation.query.filter(
-            Conversation.chatbot_id == chatbot_id,
-            Conversation.timestamp >= thirty_days_ago
-        ).order_by(Conversation.timestamp.desc()).all()
-        
         # Initialize analytics service
         analytics_service = AnalyticsService()
         
-        # Get analytics data
-        analytics_data = analytics_service.get_conversation_analytics(conversations)
-        
-        # Get homepage chatbot settings (for platform assistant)
-        homepage_chatbot_id = get_setting('homepage_chatbot_id')
-        homepage_chatbot_title = get_setting('homepage_chatbot_title', 'Platform Assistant')
-        homepage_chatbot_placeholder = get_setting('homepage_chatbot_placeholder', 'Ask me anything about the platform...')
-        
-        # Get homepage chatbot
-        homepage_chatbot = None
-        if homepage_chatbot_id:
-            homepage_chatbot = Chatbot.query.get(homepage_chatbot_id)
-        
-        if not homepage_chatbot:
-            homepage_chatbot = Chatbot.query.filter_by(embed_code='a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb').first()
+        # Get analytics data for the last 30 days (from the daily rollups)
+        analytics_data = analytics_service.get_chatbot_analytics(chatbot_id, days=30)
         
         return render_template('analytics.html',
                              chatbot=chatbot,
-                             analytics=analytics_data,
-                             homepage_chatbot=homepage_chatbot,
-                             homepage_chatbot_title=homepage_chatbot_title,
-                             homepage_chatbot_placeholder=homepage_chatbot_placeholder)
+                             analytics=analytics_data)
 
     @app.route('/chatbot/<int:chatbot_id>/update', methods=['POST'])
     @login_required
@@ -1380,6 +1255,18 @@ Best regards,
         else:
             chatbot.system_prompt = "You are a helpful AI assistant. Answer questions based on the provided documents and your general knowledge."
         
+        # Response cache settings (empty TTL / size fields use the platform defaults)
+        if 'response_cache_ttl' in request.form:
+            chatbot.response_cache_enabled = request.form.get('response_cache_enabled') == 'on'
+            try:
+                ttl = request.form.get('response_cache_ttl', '').strip()
+                max_entries = request.form.get('response_cache_max_entries', '').strip()
+                chatbot.response_cache_ttl = max(0, int(ttl)) * 60 if ttl else None
+                chatbot.response_cache_max_entries = max(0, int(max_entries)) if max_entries else None
+            except ValueError:
+                flash('Response cache duration and size must be whole numbers.', 'error')
+                return redirect(get_chatbot_url(chatbot))
+        
         # Handle avatar selection (custom upload or predefined)
         selected_avatar = request.form.get('selected_avatar')
         if selected_avatar:
@@ -1433,6 +1320,8 @@ Best regards,
                     return redirect(get_chatbot_url(chatbot))
         
         db.session.commit()
+        response_cache.invalidate(chatbot.id)
+        homepage_chatbot_cache.invalidate(chatbot.id)
         flash('Chatbot updated successfully!')
         
         return redirect(get_chatbot_url(chatbot))
@@ -1744,17 +1633,9 @@ Best regards,
             return redirect(get_chatbot_url(chatbot))
         
         try:
-            # Scrape the website
-            print(f"Starting website scrape for: {website_url}")
-            text = document_processor.scrape_website(website_url, max_pages=50, timeout=120)
-            
-            if not text or len(text.strip()) < 100:
-                flash('The website appears to be empty or inaccessible.')
-                return redirect(get_chatbot_url(chatbot))
-            
             # Extract domain for naming
             from urllib.parse import urlparse
-            parsed_url = urlparse(website_url)
+            parsed_url = urlparse(website_url if website_url.startswith(('http://', 'https://')) else 'https://' + website_url)
             domain = parsed_url.netloc.replace('www.', '')
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
             original_filename = f"WebScrape_{domain}_{timestamp}.txt"
@@ -1765,6 +1646,25 @@ Best regards,
                 Document.original_filename.like(f"WebScrape_{domain}%")
             ).first()
             
+            # Scrape the website, re-using pages that did not change since the last scrape
+            print(f"Starting website scrape for: {website_url}")
+            result = document_processor.rescrape_website(
+                website_url,
+                manifest_path=chatbot_trainer.scrape_manifest_path(chatbot_id, domain),
+                max_pages=50,
+                timeout=120
+            )
+            text = result['text']
+            
+            if not text or len(text.strip()) < 100:
+                flash('The website appears to be empty or inaccessible.')
+                return redirect(get_chatbot_url(chatbot))
+            
+            if existing_document and not result['has_changes']:
+                # Keep the current document so the chatbot does not need retraining
+                flash(f'No changes found on {website_url} ({result["unchanged_count"]} pages checked).')
+                return redirect(get_chatbot_url(chatbot))
+            
             # Save the text content as a file
             unique_filename = f"{uuid.uuid4()}_{original_filename}"
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
@@ -1791,7 +1691,12 @@ Best regards,
                 existing_document.processed = False
                 
                 db.session.commit()
-                flash(f'Website content has been updated successfully! Scraped from: {website_url}')
+                changed_pages = result['new_pages'] + result['changed_pages']
+                flash(f'Website content has been updated successfully! Scraped from: {website_url} '
+                      f'({len(result["new_pages"])} new, {len(result["changed_pages"])} changed, '
+                      f'{len(result["removed_pages"])} removed pages)')
+                if changed_pages:
+                    flash('Updated pages: ' + ', '.join(changed_pages[:5]) + (' ...' if len(changed_pages) > 5 else ''))
             else:
                 # Create new document record
                 document = Document(
@@ -1886,69 +1791,174 @@ Best regards,
             flash(f'Error downloading file: {str(e)}')
             return redirect(get_chatbot_url(chatbot))
 
+    def resolve_document_path(doc):
+        """Resolve a document's file on disk - handle both absolute and relative paths"""
+        file_path = doc.file_path
+        
+        # If file_path doesn't exist as-is, try to resolve it
+        if not os.path.exists(file_path):
+            # Try with just the filename in the upload folder
+            alt_path = os.path.join(app.config['UPLOAD_FOLDER'], doc.filename)
+            if os.path.exists(alt_path):
+                file_path = alt_path
+            else:
+                # Handle cross-platform path issues (Windows backslashes on Linux)
+                # Extract just the filename from the stored path
+                filename_only = os.path.basename(file_path.replace('\\', '/'))
+                alt_path = os.path.join(app.config['UPLOAD_FOLDER'], filename_only)
+                if os.path.exists(alt_path):
+                    file_path = alt_path
+                else:
+                    raise FileNotFoundError(f"Document file not found: {doc.original_filename} (tried: {doc.file_path}, {alt_path})")
+        
+        return file_path
+
+    def run_training_job(job, report_progress):
+        """
+        Train a chatbot from its documents (runs on a training worker thread).
+        Returns a message for the job when some documents failed, None otherwise.
+        """
+        chatbot = Chatbot.query.get(job.chatbot_id)
+        if not chatbot:
+            raise ValueError('Chatbot no longer exists')
+        
+        documents = Document.query.filter_by(chatbot_id=chatbot.id).order_by(Document.id).all()
+        if not documents:
+            raise ValueError('Please upload at least one document before training.')
+        
+        # Process all documents for this chatbot in parallel (unchanged files come from the extraction cache)
+        report_progress(f'Processing {len(documents)} documents')
+        completed = []
+        
+        # A missing upload fails only its own document
+        results = [None] * len(documents)
+        found = []
+        for index, doc in enumerate(documents):
+            try:
+                found.append((index, resolve_document_path(doc)))
+            except FileNotFoundError as e:
+                print(f"[WARNING] {e}")
+                results[index] = {'text_file': None, 'seconds': 0.0, 'error': 'file not found'}
+        
+        def on_extracted(position, result):
+            index = found[position][0]
+            completed.append(index)
+            report_progress(f'Processed {len(completed)} of {len(found)} documents '
+                            f'({documents[index].original_filename}: {result["seconds"]:.1f}s)')
+        
+        if found:
+            extracted = document_processor.extract_documents_to_files(
+                [file_path for _, file_path in found],
+                on_complete=on_extracted
+            )
+            for (index, _), result in zip(found, extracted):
+                results[index] = result
+        
+        document_texts = []
+        failures = []
+        for doc, result in zip(documents, results):
+            if result['error']:
+                failures.append(f"{doc.original_filename} ({result['error']})")
+                doc.processed = False
+            else:
+                document_texts.append({'text_file': result['text_file']})
+                doc.processed = True
+        
+        # Commit document processing status first
+        db.session.commit()
+        
+        if not document_texts:
+            raise ValueError('No document could be processed: ' + '; '.join(failures))
+        
+        # Train the chatbot with knowledge base generation (only changed documents are regenerated)
+        report_progress('Generating knowledge base')
+        chatbot_info = {
+            'name': chatbot.name,
+            'description': chatbot.description or ''
+        }
+        chatbot_trainer.train_chatbot_from_documents(chatbot.id, document_texts, use_knowledge_base=True, chatbot_info=chatbot_info)
+        chatbot.is_trained = True
+        db.session.commit()
+        response_cache.invalidate(chatbot.id)
+        
+        if failures:
+            return f'Chatbot trained, but {len(failures)} of {len(documents)} documents could not be processed: ' + '; '.join(failures)
+
+    training_queue = TrainingQueue(app, run_training_job, max_workers=int(os.getenv('TRAINING_WORKERS', '2')))
+
     @app.route('/train_chatbot/<int:chatbot_id>', methods=['POST'])
     @login_required
     def train_chatbot(chatbot_id):
         chatbot = Chatbot.query.filter_by(id=chatbot_id, user_id=current_user.id).first_or_404()
         documents = Document.query.filter_by(chatbot_id=chatbot_id).all()
+        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
         
         if not documents:
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if is_ajax:
                 return jsonify({'success': False, 'error': 'Please upload at least one document before training.'})
             flash('Please upload at least one document before training.')
             return redirect(get_chatbot_url(chatbot))
         
         try:
-            # Process all documents for this chatbot
-            all_text = ""
-            for doc in documents:
-                # Resolve the actual file path - handle both absolute and relative paths
-                file_path = doc.file_path
-                
-                # If file_path doesn't exist as-is, try to resolve it
-                if not os.path.exists(file_path):
-                    # Try with just the filename in the upload folder
-                    alt_path = os.path.join(app.config['UPLOAD_FOLDER'], doc.filename)
-                    if os.path.exists(alt_path):
-                        file_path = alt_path
-                    else:
-                        # Handle cross-platform path issues (Windows backslashes on Linux)
-                        # Extract just the filename from the stored path
-                        filename_only = os.path.basename(file_path.replace('\\', '/'))
-                        alt_path = os.path.join(app.config['UPLOAD_FOLDER'], filename_only)
-                        if os.path.exists(alt_path):
-                            file_path = alt_path
-                        else:
-                            raise FileNotFoundError(f"Document file not found: {doc.original_filename} (tried: {doc.file_path}, {alt_path})")
-                
-                text = document_processor.process_document(file_path)
-                all_text += f"\n\n{text}"
-                doc.processed = True
-            
-            # Commit document processing status first
-            db.session.commit()
-            
-            # Train the chatbot with knowledge base generation
-            chatbot_info = {
-                'name': chatbot.name,
-                'description': chatbot.description or ''
-            }
-            chatbot_trainer.train_chatbot(chatbot_id, all_text, use_knowledge_base=True, chatbot_info=chatbot_info)
-            chatbot.is_trained = True
-            db.session.commit()
+            # Jobs whose worker died (crash, restart) are re-queued here rather than waited on
+            training_queue.requeue_stale(chatbot_id=chatbot_id)
+            
+            # Reuse a job that is already waiting or running for this chatbot
+            job = TrainingJob.query.filter(
+                TrainingJob.chatbot_id == chatbot_id,
+                TrainingJob.status.in_(['queued', 'running'])
+            ).order_by(TrainingJob.created_at.desc()).first()
+            
+            if not job:
+                job = TrainingJob(chatbot_id=chatbot_id, status='queued', worker_id=WORKER_ID, message='Waiting for a training worker')
+                db.session.add(job)
+                db.session.commit()
+                training_queue.submit(job.id)
             
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({'success': True, 'message': 'Chatbot trained successfully!'})
-            flash('Chatbot trained successfully!')
+            if is_ajax:
+                return jsonify({
+                    'success': True,
+                    'job_id': job.id,
+                    'status': job.status,
+                    'message': job.message,
+                    'status_url': url_for('training_job_status', chatbot_id=chatbot_id, job_id=job.id)
+                }), 202
+            flash('Training started. This page will show the chatbot as trained once it finishes.')
             return redirect(get_chatbot_url(chatbot))
             
         except Exception as e:
-            # Even if training fails, documents are already marked as processed
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            db.session.rollback()
+            if is_ajax:
                 return jsonify({'success': False, 'error': str(e)})
             flash(f'Training failed: {str(e)}')
             return redirect(get_chatbot_url(chatbot))
 
+    @app.route('/train_chatbot/<int:chatbot_id>/status/<int:job_id>')
+    @login_required
+    def training_job_status(chatbot_id, job_id):
+        chatbot = Chatbot.query.filter_by(id=chatbot_id, user_id=current_user.id).first_or_404()
+        job = TrainingJob.query.filter_by(id=job_id, chatbot_id=chatbot.id).first_or_404()
+        
+        if training_queue.is_stale(job):
+            try:
+                training_queue.requeue_stale(chatbot_id=chatbot.id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[WARNING] Could not re-queue training job {job.id}: {e}")
+            db.session.refresh(job)
+        
+        return jsonify({
+            'success': job.status != 'failed',
+            'job_id': job.id,
+            'status': job.status,
+            'message': job.message,
+            'error': job.error,
+            'is_trained': chatbot.is_trained,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None
+        })
+
     @app.route('/delete_chatbot/<int:chatbot_id>', methods=['POST'])
     @login_required
     def delete_chatbot(chatbot_id):
@@ -1977,6 +1987,7 @@ Best regards,
         # Delete chatbot training data
         try:
             chatbot_trainer.delete_chatbot_data(chatbot_id)
+            response_cache.invalidate(chatbot_id)
         except Exception as e:
             print(f"Error deleting training data: {e}")
         
@@ -1988,6 +1999,7 @@ Best regards,
         
         db.session.delete(chatbot)
         db.session.commit()
+        homepage_chatbot_cache.invalidate(chatbot_id)
         
         flash('Chatbot deleted successfully!')
         return redirect(url_for('dashboard'))
@@ -2016,6 +2028,10 @@ Best regards,
                     'is_trained_in_db': chatbot.is_trained
                 }), 404
             
+            # The embedding matrix lives in a binary sidecar; the JSON view shows its metadata only
+            if training_data.get('embeddings') is not None:
+                training_data = dict(training_data, embeddings=None)
+            
             return jsonify({
                 'success': True,
                 'chatbot_name': chatbot.name,
@@ -2079,13 +2095,7 @@ Best regards,
                 resolved = data.get('resolved', False)
                 
                 if conversation_id:
-                    # Update conversation status in database
-                    # Since conversation_id is a UUID string, we need to find conversations by chatbot_id
-                    # and update the most recent ones or all conversations for this chatbot
-                    conversations = Conversation.query.filter_by(chatbot_id=chatbot.id).all()
-                    for conv in conversations:
-                        conv.response_status = 'resolved' if resolved else 'active'
-                    db.session.commit()
+                    end_conversation(chatbot.id, conversation_id, resolved)
                     
                     return jsonify({
                         'success': True,
@@ -2110,12 +2120,9 @@ Best regards,
             
             print(f"🤖 Chat API: Processing message for chatbot {chatbot.id}: '{user_message}'")
             
-            # Import and use the ChatService for better response handling
+            # Shared local ChatService for better response handling (created once per process)
             try:
-                from services.chat_service import ChatService
-                print(f"[OK] Successfully imported ChatService")
-                chat_service = ChatService()
-                print(f"[OK] Successfully created ChatService instance")
+                chat_service = get_local_chat_service()
             except Exception as e:
                 print(f"[ERROR] Failed to import/create ChatService: {e}")
                 import traceback
@@ -2153,14 +2160,7 @@ Best regards,
             if not response or response.strip() == "":
                 response = "I'm sorry, I couldn't generate a proper response. Please try asking your question differently."
             
-            # Save conversation
-            conversation = Conversation(
-                chatbot_id=chatbot.id,
-                user_message=user_message,
-                bot_response=response
-            )
-            db.session.add(conversation)
-            db.session.commit()
+            save_conversation(chatbot.id, user_message, response, conversation_id)
             
             print(f"💬 Response: {response[:100]}...")
             return jsonify({'response': response, 'conversation_id': conversation_id})
@@ -2179,6 +2179,71 @@ Best regards,
             
             return jsonify(error_details), 500
 
+    @app.route('/api/chat/<embed_code>/stream', methods=['POST'])
+    def chat_api_stream(embed_code):
+        """
+        Streaming variant of chat_api: answers as Server-Sent Events (delta / replace / done)
+        so the widget can show the response while OpenAI is still generating it
+        """
+        chatbot = Chatbot.query.filter_by(embed_code=embed_code).first()
+        if not chatbot:
+            return jsonify({'error': 'Chatbot not found. Please check the embed code.'}), 404
+        
+        # Allow chatbots with custom prompts to work even without training
+        if not chatbot.is_trained and not chatbot.system_prompt:
+            return jsonify({'error': 'Chatbot is not trained yet. Please upload documents and train the chatbot first, or set a system prompt.'}), 400
+        
+        # Track usage if referer is provided
+        referer = request.headers.get('Referer')
+        if referer:
+            track_chatbot_usage(chatbot.id, referer)
+        
+        data = request.get_json(silent=True) or {}
+        user_message = data.get('message', '').strip()
+        if not user_message:
+            return jsonify({'error': 'Message is required'}), 400
+        
+        conversation_id = data.get('conversation_id') or str(uuid.uuid4())
+        chatbot_id = chatbot.id
+        print(f"🤖 Chat API (stream): Processing message for chatbot {chatbot_id}: '{user_message}'")
+        
+        def sse(event, payload):
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        
+        def generate():
+            response = None
+            try:
+                openai_service = get_chat_service()
+                if openai_service and hasattr(openai_service, 'stream_response'):
+                    for event in openai_service.stream_response(chatbot_id, user_message, conversation_id):
+                        if event['type'] == 'done':
+                            response = event['response']
+                        else:
+                            yield sse(event['type'], {'text': event['text']})
+                else:
+                    response = get_local_chat_service().get_response(chatbot_id, user_message)
+            except Exception as e:
+                print(f"[ERROR] Chat API stream error: {e}")
+                import traceback
+                traceback.print_exc()
+                yield sse('error', {'error': 'Sorry, I encountered an error. Please try again.'})
+                return
+            
+            # Ensure response is not None or empty
+            if not response or response.strip() == "":
+                response = "I'm sorry, I couldn't generate a proper response. Please try asking your question differently."
+            
+            save_conversation(chatbot_id, user_message, response, conversation_id)
+            
+            print(f"💬 Streamed response: {response[:100]}...")
+            yield sse('done', {'response': response, 'conversation_id': conversation_id})
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
     @app.route('/embed/<embed_code>')
     def embed_code(embed_code):
         chatbot = Chatbot.query.filter_by(embed_code=embed_code).first()
@@ -2355,6 +2420,17 @@ Best regards,
             flash(f'Error creating database backup: {str(e)}', 'error')
             return redirect(url_for('admin_dashboard'))
 
+    @app.route('/admin/cache-stats')
+    @admin_required
+    def admin_cache_stats():
+        """Hit/miss counters of this worker's in-process caches"""
+        return jsonify({
+            'homepage_chatbot': homepage_chatbot_cache.stats(),
+            'plans': plan_cache.stats(),
+            'responses': response_cache.stats(),
+            'settings_loads': settings_cache.loads
+        })
+
     @app.route('/admin/users')
     @admin_required
     def admin_users():
@@ -2428,6 +2504,7 @@ Best regards,
                 return render_template('admin/edit_user.html', user=user, plans=Plan.query.filter_by(is_active=True).all(), get_user_plan=get_user_plan)
             
             db.session.commit()
+            plan_cache.invalidate()
             flash(f'User {user.username} updated successfully!')
             return redirect(url_for('admin_users'))
         
@@ -2476,6 +2553,7 @@ Best regards,
             # Delete chatbot training data
             try:
                 chatbot_trainer.delete_chatbot_data(chatbot.id)
+                response_cache.invalidate(chatbot.id)
             except Exception as e:
                 print(f"Error deleting training data: {e}")
             
@@ -2487,6 +2565,7 @@ Best regards,
         
         db.session.delete(user)
         db.session.commit()
+        homepage_chatbot_cache.invalidate()
         
         flash(f'User {user.username} and all associated data deleted successfully!')
         return redirect(url_for('admin_users'))
@@ -2529,6 +2608,10 @@ Best regards,
                 }), 404
             
             print(f"DEBUG: Successfully loaded training data for chatbot {chatbot_id}")
+            # The embedding matrix lives in a binary sidecar; the JSON view shows its metadata only
+            if training_data.get('embeddings') is not None:
+                training_data = dict(training_data, embeddings=None)
+            
             return jsonify({
                 'success': True,
                 'chatbot_name': chatbot.name,
@@ -2590,6 +2673,7 @@ Best regards,
         # Delete chatbot training data
         try:
             chatbot_trainer.delete_chatbot_data(chatbot_id)
+            response_cache.invalidate(chatbot_id)
         except Exception as e:
             print(f"Error deleting training data: {e}")
         
@@ -2601,6 +2685,7 @@ Best regards,
         
         db.session.delete(chatbot)
         db.session.commit()
+        homepage_chatbot_cache.invalidate(chatbot_id)
         
         flash(f'Chatbot {chatbot.name} deleted successfully!')
         return redirect(url_for('admin_chatbots'))
@@ -2651,6 +2736,7 @@ Best regards,
                 openai_model = request.form.get('openai_model', 'gpt-3.5-turbo').strip()
                 print(f"DEBUG: OpenAI model: {openai_model}")
                 set_setting('openai_model', openai_model)
+                response_cache.invalidate()
                 
                 flash('OpenAI model settings updated successfully!')
                 
@@ -2761,6 +2847,7 @@ Best regards,
         try:
             openai_model = request.form.get('openai_model', 'gpt-3.5-turbo').strip()
             set_setting('openai_model', openai_model)
+            response_cache.invalidate()
             
             return {'success': True, 'message': 'OpenAI model settings updated successfully!'}
         except Exception as e:
@@ -2794,6 +2881,7 @@ Best regards,
                 return {'success': False, 'message': 'Training prompt cannot be empty'}, 400
             
             set_setting('training_prompt', training_prompt)
+            response_cache.invalidate()
             
             return {'success': True, 'message': 'Training prompt updated successfully!'}
         except Exception as e:
@@ -3012,6 +3100,7 @@ The platform is designed to be user-friendly while providing powerful AI capabil
             
             db.session.add(plan)
             db.session.commit()
+            plan_cache.invalidate()
             
             flash(f'Plan "{name}" created successfully!')
             return redirect(url_for('admin_plans'))
@@ -3050,6 +3139,7 @@ The platform is designed to be user-friendly while providing powerful AI capabil
                 return render_template('admin/edit_plan.html', plan=plan)
             
             db.session.commit()
+            plan_cache.invalidate()
             flash(f'Plan "{plan.name}" updated successfully!')
             return redirect(url_for('admin_plans'))
         
@@ -3062,6 +3152,7 @@ The platform is designed to be user-friendly while providing powerful AI capabil
         
         db.session.delete(plan)
         db.session.commit()
+        plan_cache.invalidate()
         
         flash(f'Plan "{plan.name}" deleted successfully!')
         return redirect(url_for('admin_plans'))
@@ -3329,6 +3420,11 @@ Sent at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
         """Make site settings available in all templates"""
         return dict(site_settings=get_site_settings())
 
+    @app.context_processor
+    def inject_homepage_chatbot():
+        """Platform assistant (homepage_chatbot, title and placeholder) for all templates"""
+        return homepage_chatbot_cache.get_context()
+
     # Helper injection removed to avoid initialization order issues
 
     # -----------------------------
@@ -3475,6 +3571,7 @@ Sent at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
                             )
                             db.session.add(new_sub)
                             db.session.commit()
+                            plan_cache.invalidate()
                             break
                         except Exception:
                             db.session.rollback()
@@ -3521,6 +3618,10 @@ Sent at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
         elif et == 'customer.subscription.deleted':
             pass
         # Extend later with DB updates when subscription model is added
+        
+        # Subscription state may have changed; resolve plans again
+        if et in ('checkout.session.completed', 'customer.subscription.deleted', 'customer.subscription.updated'):
+            plan_cache.invalidate()
 
         return ('', 200)
 
@@ -3552,10 +3653,26 @@ Sent at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
 
     with app.app_context():
         db.create_all()
+        try:
+            ensure_default_plans()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[WARNING] Failed to create default plans: {e}")
         # Create demo chatbot after all services are initialized
         try:
             create_demo_chatbot_internal()
         except Exception as e:
             print(f"[WARNING] Failed to create demo chatbot: {e}")
+        
+        try:
+            usage_buffer.check_schema()
+        except Exception as e:
+            print(f"[WARNING] Failed to check the chatbot_usage indexes: {e}")
+        
+        # Pick up training jobs interrupted by a restart
+        try:
+            training_queue.recover()
+        except Exception as e:
+            print(f"[WARNING] Failed to recover training jobs: {e}")
     
     return app 
\ No newline at end of file
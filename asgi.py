@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for owlbee.ai
+
+The chat API (/api/chat/<embed_code>) and usage tracking (/api/track-usage/<embed_code>)
+are served by asyncio handlers: OpenAI calls are awaited with AsyncOpenAI, and database
+and retrieval work runs on a thread pool, so one worker process can hold hundreds of
+in-flight conversations. Every other request goes to the Flask app through asgiref.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 1
+
+Requires uvicorn and asgiref (see requirements.txt).
+"""
+import asyncio
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError as e:
+    raise ImportError(
+        "asgi.py needs asgiref (and uvicorn to serve it): pip install 'asgiref>=3.7,<4' 'uvicorn>=0.23,<1', "
+        "or serve the WSGI app with gunicorn run:app instead"
+    ) from e
+
+from app import create_app, Chatbot, track_chatbot_usage, save_conversation, end_conversation
+
+# Threads for database and retrieval work (keep at or below the SQLAlchemy connection pool size)
+ASGI_SYNC_THREADS = int(os.getenv('ASGI_SYNC_THREADS', '16'))
+
+CHAT_PATH = re.compile(r'^/api/chat/([^/]+)/?$')
+TRACK_USAGE_PATH = re.compile(r'^/api/track-usage/([^/]+)/?$')
+
+
+class ChatASGIApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi_app = WsgiToAsgi(flask_app)
+        self.executor = ThreadPoolExecutor(max_workers=ASGI_SYNC_THREADS, thread_name_prefix='asgi-sync')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        # CORS preflight (OPTIONS) and everything else is handled by Flask
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            match = CHAT_PATH.match(scope['path'])
+            if match:
+                await self._handle(self._chat, match.group(1), scope, receive, send)
+                return
+            match = TRACK_USAGE_PATH.match(scope['path'])
+            if match:
+                await self._handle(self._track_usage, match.group(1), scope, receive, send)
+                return
+
+        await self.wsgi_app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def run_sync(self, func, *args):
+        """Run a blocking callable on the thread pool inside a Flask app context"""
+        def call():
+            with self.flask_app.app_context():
+                return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def _handle(self, handler, embed_code, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+
+        try:
+            payload, status = await handler(embed_code, data, headers)
+        except Exception as e:
+            print(f"[ERROR] ASGI API error: {e}")
+            import traceback
+            traceback.print_exc()
+            payload, status = {'error': 'Sorry, I encountered an error. Please try again.'}, 500
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                # Embedded chatbots call the API from any website
+                (b'access-control-allow-origin', b'*'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': json.dumps(payload).encode('utf-8')})
+
+    async def _chat(self, embed_code, data, headers):
+        """Same behaviour as the Flask chat_api route"""
+        def load_chatbot():
+            chatbot = Chatbot.query.filter_by(embed_code=embed_code).first()
+            if not chatbot:
+                return None
+            # Track usage if referer is provided
+            if headers.get('referer'):
+                track_chatbot_usage(chatbot.id, headers['referer'])
+            return {'id': chatbot.id, 'is_trained': chatbot.is_trained, 'system_prompt': chatbot.system_prompt}
+
+        chatbot = await self.run_sync(load_chatbot)
+        if not chatbot:
+            return {'error': 'Chatbot not found. Please check the embed code.'}, 404
+
+        # Allow chatbots with custom prompts to work even without training
+        if not chatbot['is_trained'] and not chatbot['system_prompt']:
+            return {'error': 'Chatbot is not trained yet. Please upload documents and train the chatbot first, or set a system prompt.'}, 400
+
+        if not data:
+            return {'error': 'No data received'}, 400
+
+        # Check if this is an end conversation action
+        if data.get('action') == 'end_conversation':
+            conversation_id = data.get('conversation_id')
+            if not conversation_id:
+                return {'error': 'Conversation ID required for end conversation action'}, 400
+            await self.run_sync(end_conversation, chatbot['id'], conversation_id, data.get('resolved', False))
+            return {'success': True, 'message': 'Conversation status updated', 'conversation_id': conversation_id}, 200
+
+        user_message = data.get('message', '').strip()
+        if not user_message:
+            return {'error': 'Message is required'}, 400
+
+        # Generate conversation ID if not provided (for new conversations)
+        conversation_id = data.get('conversation_id') or str(uuid.uuid4())
+
+        chat_services = self.flask_app.extensions['chat_services']
+        openai_service = await self.run_sync(chat_services['openai'])
+        response = None
+        if openai_service and hasattr(openai_service, 'get_response_async'):
+            try:
+                response = await openai_service.get_response_async(
+                    chatbot['id'], user_message, conversation_id, run_sync=self.run_sync
+                )
+            except Exception as e:
+                print(f"[WARNING] OpenAI service failed: {e}, falling back to local chat service")
+        if response is None:
+            local_service = await self.run_sync(chat_services['local'])
+            response = await self.run_sync(local_service.get_response, chatbot['id'], user_message)
+
+        # Ensure response is not None or empty
+        if not response or response.strip() == "":
+            response = "I'm sorry, I couldn't generate a proper response. Please try asking your question differently."
+
+        await self.run_sync(save_conversation, chatbot['id'], user_message, response, conversation_id)
+        return {'response': response, 'conversation_id': conversation_id}, 200
+
+    async def _track_usage(self, embed_code, data, headers):
+        """Same behaviour as the Flask track_usage_api route"""
+        website_url = data.get('website_url') if data else headers.get('referer')
+
+        def track():
+            chatbot = Chatbot.query.filter_by(embed_code=embed_code).first()
+            if not chatbot:
+                return False
+            if website_url:
+                track_chatbot_usage(chatbot.id, website_url)
+            return True
+
+        if not await self.run_sync(track):
+            return {'error': 'Chatbot not found'}, 404
+        if not website_url:
+            return {'error': 'No website URL provided'}, 400
+        return {'success': True, 'message': 'Usage tracked successfully'}, 200
+
+
+app = ChatASGIApp(create_app())
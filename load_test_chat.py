@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load test for the chat API against a local stub OpenAI server
+
+1. Start the stub (answers every OpenAI call after a fixed delay, like a slow model):
+       python load_test_chat.py stub --port 9999 --delay 2
+
+2. Start the app pointed at the stub, e.g. the ASGI server:
+       OPENAI_BASE_URL=http://127.0.0.1:9999/v1 OPENAI_API_KEY=test uvicorn asgi:app --port 8000
+   (or the gunicorn deployment, to compare: gunicorn run:app --workers 1 --bind 0.0.0.0:8000)
+
+3. Fire concurrent conversations at a chatbot:
+       python load_test_chat.py run --url http://127.0.0.1:8000/api/chat/<embed_code> --concurrency 200 --requests 1000
+
+With a 2s stub delay the ASGI server should keep p50 latency close to 2s at a few hundred
+concurrent conversations, while a single sync worker serves them one after another.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+
+def stub_answer(body):
+    return "Thanks for your question! This is a canned answer from the load-test stub."
+
+
+async def handle_stub_connection(reader, writer, delay):
+    """Minimal HTTP/1.1 server implementing the two OpenAI endpoints the app calls"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', '0')))
+
+            await asyncio.sleep(delay)
+
+            now = int(time.time())
+            answer = stub_answer(body)
+            if path.endswith('/responses'):
+                payload = {
+                    'id': f'resp_{uuid.uuid4().hex}',
+                    'object': 'response',
+                    'created_at': now,
+                    'model': 'stub',
+                    'status': 'completed',
+                    'parallel_tool_calls': False,
+                    'tool_choice': 'auto',
+                    'tools': [],
+                    'output': [{
+                        'type': 'message',
+                        'id': f'msg_{uuid.uuid4().hex}',
+                        'status': 'completed',
+                        'role': 'assistant',
+                        'content': [{'type': 'output_text', 'text': answer, 'annotations': []}],
+                    }],
+                }
+            elif path.endswith('/chat/completions'):
+                payload = {
+                    'id': f'chatcmpl_{uuid.uuid4().hex}',
+                    'object': 'chat.completion',
+                    'created': now,
+                    'model': 'stub',
+                    'choices': [{
+                        'index': 0,
+                        'finish_reason': 'stop',
+                        'message': {'role': 'assistant', 'content': answer},
+                    }],
+                }
+            else:
+                payload = {'error': {'message': f'Unknown stub endpoint {method} {path}'}}
+
+            data = json.dumps(payload).encode('utf-8')
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: application/json\r\n'
+                + f'Content-Length: {len(data)}\r\n\r\n'.encode('latin-1')
+                + data
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_stub(host, port, delay):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_stub_connection(reader, writer, delay), host, port
+    )
+    print(f"Stub OpenAI server on http://{host}:{port}/v1 (delay {delay}s)")
+    async with server:
+        await server.serve_forever()
+
+
+async def run_load(url, concurrency, total_requests, timeout):
+    import httpx
+
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def conversation(client):
+        nonlocal errors
+        for _ in counter:
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json={'message': 'What are your opening hours?'})
+                if response.status_code == 200 and response.json().get('response'):
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            except Exception:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"Requests: {total_requests}, concurrency: {concurrency}, errors: {errors}")
+    print(f"Elapsed: {elapsed:.1f}s, throughput: {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        latencies.sort()
+        print(f"Latency p50: {statistics.median(latencies):.2f}s, "
+              f"p95: {latencies[int(len(latencies) * 0.95) - 1]:.2f}s, "
+              f"max: {latencies[-1]:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    stub = commands.add_parser('stub', help='run the stub OpenAI server')
+    stub.add_argument('--host', default='127.0.0.1')
+    stub.add_argument('--port', type=int, default=9999)
+    stub.add_argument('--delay', type=float, default=2.0, help='seconds before each answer')
+
+    load = commands.add_parser('run', help='send concurrent chat requests')
+    load.add_argument('--url', required=True, help='chat API URL, e.g. http://127.0.0.1:8000/api/chat/<embed_code>')
+    load.add_argument('--concurrency', type=int, default=200)
+    load.add_argument('--requests', type=int, default=1000)
+    load.add_argument('--timeout', type=float, default=120.0)
+
+    args = parser.parse_args()
+    if args.command == 'stub':
+        asyncio.run(run_stub(args.host, args.port, args.delay))
+    else:
+        asyncio.run(run_load(args.url, args.concurrency, args.requests, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Migration script for the conversation analytics rollups.
+Creates the conversation_daily_stats table and the (chatbot_id, timestamp) index on
+conversation, then fills the rollups from the existing conversations. Safe to re-run:
+only days whose rollups do not match their conversations are rebuilt.
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db, ConversationDailyStats
+from services import conversation_rollup
+
+def migrate_add_conversation_daily_stats():
+    """Add the ConversationDailyStats table and backfill it."""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("Starting migration: Conversation daily stats...")
+
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+
+            if 'conversation_daily_stats' not in inspector.get_table_names():
+                print("Creating table conversation_daily_stats...")
+                ConversationDailyStats.__table__.create(db.engine)
+            else:
+                print("Table 'conversation_daily_stats' already exists.")
+
+            indexes = [index['name'] for index in inspector.get_indexes('conversation')]
+            if 'ix_conversation_chatbot_timestamp' not in indexes:
+                print("Adding index ix_conversation_chatbot_timestamp...")
+                db.session.execute(text(
+                    "CREATE INDEX ix_conversation_chatbot_timestamp ON conversation (chatbot_id, timestamp)"
+                ))
+                db.session.commit()
+            else:
+                print("Index 'ix_conversation_chatbot_timestamp' already exists.")
+
+            print("Building rollups from existing conversations...")
+            rebuilt = conversation_rollup.compact()
+            print(f"Rebuilt {rebuilt} chatbot days.")
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrate_add_conversation_daily_stats()
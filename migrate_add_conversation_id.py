@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the conversation_id column to the Conversation model.
+Chat turns are stored with the id of the chat session they belong to, so ending a
+conversation updates only its own rows. Existing rows keep a NULL conversation_id.
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+
+def migrate_add_conversation_id():
+    """Add conversation_id (indexed) to the conversation table."""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("Starting migration: Add conversation_id to Conversation model...")
+
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('conversation')]
+
+            if 'conversation_id' in columns:
+                print("Column 'conversation_id' already exists. Skipping migration.")
+                return
+
+            print("Adding conversation_id column to conversation table...")
+            db.session.execute(text("ALTER TABLE conversation ADD COLUMN conversation_id VARCHAR(64)"))
+            print("Adding index ix_conversation_conversation_id...")
+            db.session.execute(text("CREATE INDEX ix_conversation_conversation_id ON conversation (conversation_id)"))
+
+            db.session.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrate_add_conversation_id()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the response cache settings to the Chatbot model.
+Existing chatbots get the cache enabled with the platform default TTL and size.
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+
+def migrate_add_response_cache():
+    """Add response_cache_enabled, response_cache_ttl and response_cache_max_entries to Chatbot."""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("Starting migration: Add response cache fields to Chatbot model...")
+
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('chatbot')]
+
+            new_columns = [
+                ('response_cache_enabled', 'BOOLEAN DEFAULT TRUE'),
+                ('response_cache_ttl', 'INTEGER'),
+                ('response_cache_max_entries', 'INTEGER'),
+            ]
+
+            for name, definition in new_columns:
+                if name in columns:
+                    print(f"Column '{name}' already exists. Skipping.")
+                    continue
+                print(f"Adding {name} column to chatbot table...")
+                db.session.execute(text(f"ALTER TABLE chatbot ADD COLUMN {name} {definition}"))
+
+            db.session.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrate_add_response_cache()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Migration script to add worker_id and heartbeat_at to the TrainingJob table.
+They let a process notice training jobs whose worker died and re-queue them.
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+
+def migrate_add_training_job_heartbeat():
+    """Add the worker_id and heartbeat_at columns to training_job."""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("Starting migration: TrainingJob owner and heartbeat...")
+
+            from sqlalchemy import inspect, text
+            inspector = inspect(db.engine)
+            columns = [column['name'] for column in inspector.get_columns('training_job')]
+
+            if 'worker_id' not in columns:
+                print("Adding worker_id column...")
+                db.session.execute(text("ALTER TABLE training_job ADD COLUMN worker_id VARCHAR(64)"))
+            else:
+                print("Column 'worker_id' already exists.")
+
+            if 'heartbeat_at' not in columns:
+                print("Adding heartbeat_at column...")
+                db.session.execute(text("ALTER TABLE training_job ADD COLUMN heartbeat_at TIMESTAMP"))
+            else:
+                print("Column 'heartbeat_at' already exists.")
+
+            db.session.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrate_add_training_job_heartbeat()
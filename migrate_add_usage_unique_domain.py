@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migration script to make ChatbotUsage rows unique per (chatbot_id, website_domain).
+Usage is now written in batches with an upsert, which needs this unique index.
+Duplicate rows from older versions are merged first (counts added up).
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db, ChatbotUsage
+
+def migrate_add_usage_unique_domain():
+    """Merge duplicate usage rows and add the uq_chatbot_usage_domain unique index."""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            print("Starting migration: Unique ChatbotUsage per chatbot and domain...")
+
+            from sqlalchemy import inspect, text, func
+            inspector = inspect(db.engine)
+            indexes = [index['name'] for index in inspector.get_indexes('chatbot_usage')]
+
+            if 'uq_chatbot_usage_domain' in indexes:
+                print("Index 'uq_chatbot_usage_domain' already exists. Skipping migration.")
+                return
+
+            duplicates = db.session.query(
+                ChatbotUsage.chatbot_id, ChatbotUsage.website_domain
+            ).group_by(
+                ChatbotUsage.chatbot_id, ChatbotUsage.website_domain
+            ).having(func.count(ChatbotUsage.id) > 1).all()
+
+            print(f"Merging {len(duplicates)} duplicated chatbot/domain pairs...")
+            for chatbot_id, domain in duplicates:
+                rows = ChatbotUsage.query.filter_by(
+                    chatbot_id=chatbot_id, website_domain=domain
+                ).order_by(ChatbotUsage.id).all()
+                keep = rows[0]
+                for row in rows[1:]:
+                    keep.usage_count = (keep.usage_count or 0) + (row.usage_count or 0)
+                    if row.first_seen and (not keep.first_seen or row.first_seen < keep.first_seen):
+                        keep.first_seen = row.first_seen
+                    if row.last_seen and (not keep.last_seen or row.last_seen > keep.last_seen):
+                        keep.last_seen = row.last_seen
+                    keep.is_active = keep.is_active or row.is_active
+                    db.session.delete(row)
+            db.session.commit()
+
+            print("Adding unique index uq_chatbot_usage_domain...")
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX uq_chatbot_usage_domain ON chatbot_usage (chatbot_id, website_domain)"
+            ))
+            db.session.commit()
+            print("Migration completed successfully!")
+
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    migrate_add_usage_unique_domain()
@@ -53,8 +53,9 @@ if __name__ == '__main__':
         import traceback
         traceback.print_exc()
         sys.exit(1)
-else:
+elif __name__ != '__mp_main__':
     # For production deployment (gunicorn)
+    # (skipped when multiprocessing re-imports this file in a document extraction worker)
     print("Creating app for production...")
     try:
         initialize_app()
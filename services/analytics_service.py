@@ -8,6 +8,10 @@ from datetime import datetime, timedelta
 from openai import OpenAI
 import json
 import re
+from .keyword_cache import keyword_cache
+
+# Most recent user messages used for keyword extraction on the rollup-based analytics page
+ANALYTICS_KEYWORD_SAMPLE = int(os.getenv('ANALYTICS_KEYWORD_SAMPLE', '500'))
 
 
 class AnalyticsService:
@@ -34,6 +38,8 @@ class AnalyticsService:
         
         # Calculate basic statistics
         total_conversations = len(conversations)
+        # Turns of one chat share a conversation_id (older rows without one count on their own)
+        total_sessions = len({conv.conversation_id or f'row-{conv.id}' for conv in conversations})
         resolved_count = sum(1 for conv in conversations if conv.response_status == 'resolved')
         resolution_rate = (resolved_count / total_conversations * 100) if total_conversations > 0 else 0
         
@@ -60,6 +66,7 @@ class AnalyticsService:
         
         return {
             'total_conversations': total_conversations,
+            'total_sessions': total_sessions,
             'resolved_count': resolved_count,
             'resolution_rate': round(resolution_rate, 2),
             'top_questions': top_questions,
@@ -70,10 +77,94 @@ class AnalyticsService:
             'time_analytics': time_analytics
         }
     
+    def get_chatbot_analytics(self, chatbot_id, days=30):
+        """
+        Analytics of a chatbot's last N days, from the ConversationDailyStats rollups
+        and SQL aggregates (same structure as get_conversation_analytics)
+        """
+        from . import conversation_rollup
+
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        rows = conversation_rollup.hourly_rows(chatbot_id, start_date.date())
+
+        total_conversations = sum(row.conversation_count for row in rows)
+        if not total_conversations:
+            return self._get_empty_analytics()
+
+        resolved_count = sum(row.resolved_count for row in rows)
+        status_breakdown = {
+            'resolved': resolved_count,
+            'active': sum(row.active_count for row in rows),
+            'pending': sum(row.pending_count for row in rows)
+        }
+
+        daily_counts = Counter()
+        hour_counts = Counter()
+        day_counts = Counter()
+        for row in rows:
+            daily_counts[row.day.strftime('%Y-%m-%d')] += row.conversation_count
+            hour_counts[row.hour] += row.conversation_count
+            day_counts[row.day.strftime('%A')] += row.conversation_count
+
+        since = datetime.combine(start_date.date(), datetime.min.time())
+        
+        # AI keywords are extracted in the background; use the word-frequency version until they are ready
+        keywords = keyword_cache.get(chatbot_id)
+        if keywords is None:
+            keywords = self._extract_keywords_simple(self._recent_user_messages(chatbot_id, since))
+
+        return {
+            'total_conversations': total_conversations,
+            'total_sessions': self._count_sessions(chatbot_id, since),
+            'resolved_count': resolved_count,
+            'resolution_rate': round(resolved_count / total_conversations * 100, 2),
+            'top_questions': self._get_top_questions_sql(chatbot_id, since, total_conversations),
+            'keywords': keywords,
+            'trends': self._format_trends(daily_counts, start_date, end_date),
+            'status_breakdown': status_breakdown,
+            'avg_message_length': round(sum(row.message_length_sum for row in rows) / total_conversations, 2),
+            'time_analytics': self._format_time_analytics(hour_counts, day_counts)
+        }
+
+    def _count_sessions(self, chatbot_id, since):
+        """Distinct conversation ids (older rows without one count on their own)"""
+        from sqlalchemy import func, case, distinct
+        from app import db, Conversation
+        sessions, unassigned = db.session.query(
+            func.count(distinct(Conversation.conversation_id)),
+            func.sum(case((Conversation.conversation_id.is_(None), 1), else_=0))
+        ).filter(Conversation.chatbot_id == chatbot_id, Conversation.timestamp >= since).one()
+        return (sessions or 0) + (unassigned or 0)
+
+    def _get_top_questions_sql(self, chatbot_id, since, total, top_n=10):
+        """Most asked questions, grouped case- and whitespace-insensitively by the database"""
+        from sqlalchemy import func
+        from app import db, Conversation
+        normalized = func.lower(func.trim(Conversation.user_message))
+        rows = db.session.query(
+            func.min(Conversation.user_message), func.count(Conversation.id).label('count')
+        ).filter(
+            Conversation.chatbot_id == chatbot_id, Conversation.timestamp >= since
+        ).group_by(normalized).order_by(func.count(Conversation.id).desc()).limit(top_n).all()
+        return [
+            {'question': question, 'count': count, 'percentage': round((count / total) * 100, 2)}
+            for question, count in rows
+        ]
+
+    def _recent_user_messages(self, chatbot_id, since, limit=ANALYTICS_KEYWORD_SAMPLE):
+        """User messages only (no bot responses), newest first"""
+        from app import db, Conversation
+        rows = db.session.query(Conversation.user_message).filter(
+            Conversation.chatbot_id == chatbot_id, Conversation.timestamp >= since
+        ).order_by(Conversation.timestamp.desc()).limit(limit).all()
+        return [message for message, in rows]
+
     def _get_empty_analytics(self):
         """Return empty analytics structure when no conversations exist"""
         return {
             'total_conversations': 0,
+            'total_sessions': 0,
             'resolved_count': 0,
             'resolution_rate': 0,
             'top_questions': [],
@@ -234,6 +325,10 @@ class AnalyticsService:
                 date_key = conv.timestamp.strftime('%Y-%m-%d')
                 daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
         
+        return self._format_trends(daily_counts, start_date, end_date)
+    
+    def _format_trends(self, daily_counts, start_date, end_date):
+        """Chart labels and counts per day ('%Y-%m-%d' keys)"""
         # Fill in missing days with 0
         current_date = start_date
         labels = []
@@ -286,6 +381,10 @@ class AnalyticsService:
             hour_counts[conv.timestamp.hour] += 1
             day_counts[conv.timestamp.strftime('%A')] += 1
         
+        return self._format_time_analytics(hour_counts, day_counts)
+    
+    def _format_time_analytics(self, hour_counts, day_counts):
+        """Busiest hour/day and the hourly chart from counts per hour and per weekday name"""
         # Find busiest times
         busiest_hour = hour_counts.most_common(1)[0][0] if hour_counts else 0
         busiest_day = day_counts.most_common(1)[0][0] if day_counts else 'N/A'
@@ -2,8 +2,8 @@ import random
 from .chatbot_trainer import ChatbotTrainer
 
 class ChatService:
-    def __init__(self):
-        self.trainer = ChatbotTrainer()
+    def __init__(self, trainer=None):
+        self.trainer = trainer or ChatbotTrainer()
         self.default_responses = [
             "I'm sorry, I don't have information about that topic in my training documents. Could you try asking something else?",
             "I don't have enough information in my training data to answer that question accurately.",
@@ -141,7 +141,7 @@ class ChatService:
                 
                 # First, try to find the answer in the next few sentences
                 if sentence_index >= 0:
-                    chatbot_id = self._get_chatbot_id_from_context()  # We'll need to pass this
+                    chatbot_id = chatbot.id if chatbot else self._get_chatbot_id_from_context()
                     for offset in range(1, 4):  # Check next 3 sentences
                         next_sentence = self.trainer.get_sentence_by_index(chatbot_id, sentence_index + offset)
                         if next_sentence and len(next_sentence.strip()) > 20:
@@ -1,11 +1,24 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import random
 import os
 import re
+import json
+import hashlib
 from .chatbot_trainer import ChatbotTrainer
+from .response_cache import response_cache, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES
+from .conversation_store import get_conversation_store
+from .settings_cache import settings_cache
+
+# Minimum new characters before a streamed answer is re-cleaned and re-formatted
+STREAM_FORMAT_MIN_CHARS = 40
+# Conversation store value for a conversation whose last answer came from the response cache:
+# there is no OpenAI response to continue from, so the next request replays the saved turns
+CACHED_TURN = 'cached'
+# Saved turns replayed into the request that follows a cached answer
+CACHED_TURN_HISTORY = 3
 
 class ChatServiceOpenAI:
-    def __init__(self):
+    def __init__(self, trainer=None, conversation_store=None):
         # Get OpenAI API key from environment variable
         self.api_key = os.getenv('OPENAI_API_KEY')
         
@@ -15,15 +28,18 @@ class ChatServiceOpenAI:
         # Initialize OpenAI client with the new v1.0+ API
         self.client = OpenAI(api_key=self.api_key)
         
-        self.trainer = ChatbotTrainer()
+        self.trainer = trainer or ChatbotTrainer()
         self.default_responses = [
             "I'm sorry, I don't have information about that topic in my training documents.",
             "I don't have enough information in my training data to answer that question accurately.",
             "Could you please ask something related to the documents I've been trained on?",
         ]
         
-        # Track conversation context for Responses API
-        self.conversation_contexts = {}
+        # Conversation id -> previous_response_id for the Responses API (shared between workers)
+        self.conversation_store = conversation_store or get_conversation_store()
+        
+        # Async client for the ASGI serving path, created on first use (see get_response_async)
+        self._async_client = None
     
     def get_response(self, chatbot_id, user_message, conversation_id=None):
         """
@@ -31,11 +47,198 @@ class ChatServiceOpenAI:
         """
         print(f" DEBUG: Processing OpenAI Responses API request for chatbot {chatbot_id}: '{user_message}'")
         
+        request = self._prepare_request(chatbot_id, user_message, conversation_id)
+        if 'answer' in request:
+            return request['answer']
+        
+        try:
+            # Call OpenAI Responses API with web search if needed
+            if request['needs_web_search']:
+                # Use chat completions API for web search model
+                try:
+                    response = self.client.chat.completions.create(
+                        model=request['model'],
+                        web_search_options={},
+                        messages=[
+                            {"role": "system", "content": request['system_prompt']},
+                            {"role": "user", "content": user_message}
+                        ]
+                    )
+                    answer = response.choices[0].message.content.strip()
+                    print(f" DEBUG: Web search API call successful")
+                except Exception as e:
+                    print(f" DEBUG: Web search API call failed: {e}")
+                    raise e
+            else:
+                try:
+                    response = self.client.responses.create(**self._responses_api_args(request))
+                    answer = response.output_text.strip()
+                    print(f" DEBUG: Responses API call successful")
+                except Exception as e:
+                    print(f" DEBUG: Responses API call failed: {e}")
+                    raise e
+            
+            # Store the response ID for future conversation continuity (only for Responses API)
+            if conversation_id and not request['needs_web_search']:
+                self._remember_response(conversation_id, response.id)
+            
+            print(f" DEBUG: OpenAI response generated: {answer[:100]}...")
+            answer = self._finish_answer(answer)
+            self._cache_answer(request, answer)
+            return answer
+            
+        except Exception as e:
+            print(f" DEBUG: OpenAI Responses API error: {e}")
+            print(f" DEBUG: Error type: {type(e).__name__}")
+            print(f" DEBUG: Error details: {str(e)}")
+            return self._fallback_response(chatbot_id, user_message)
+    
+    async def get_response_async(self, chatbot_id, user_message, conversation_id, run_sync):
+        """
+        Async variant of get_response used by the ASGI server (asgi.py). The OpenAI call is
+        awaited on the event loop, while retrieval and database work go through run_sync,
+        a coroutine function that runs a callable on a worker thread inside an app context.
+        """
+        print(f" DEBUG: Processing async OpenAI request for chatbot {chatbot_id}: '{user_message}'")
+        
+        request = await run_sync(self._prepare_request, chatbot_id, user_message, conversation_id)
+        if 'answer' in request:
+            return request['answer']
+        
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.api_key)
+        
+        try:
+            if request['needs_web_search']:
+                response = await self._async_client.chat.completions.create(
+                    model=request['model'],
+                    web_search_options={},
+                    messages=[
+                        {"role": "system", "content": request['system_prompt']},
+                        {"role": "user", "content": user_message}
+                    ]
+                )
+                answer = response.choices[0].message.content.strip()
+            else:
+                response = await self._async_client.responses.create(**self._responses_api_args(request))
+                answer = response.output_text.strip()
+                if conversation_id:
+                    await run_sync(self._remember_response, conversation_id, response.id)
+            
+            print(f" DEBUG: OpenAI response generated: {answer[:100]}...")
+            answer = self._finish_answer(answer)
+            # Caching may embed the question (and load the model), keep it off the event loop
+            await run_sync(self._cache_answer, request, answer)
+            return answer
+            
+        except Exception as e:
+            print(f" DEBUG: OpenAI async API error: {e}")
+            print(f" DEBUG: Error type: {type(e).__name__}")
+            return await run_sync(self._fallback_response, chatbot_id, user_message)
+    
+    def stream_response(self, chatbot_id, user_message, conversation_id=None):
+        """
+        Streaming variant of get_response. Yields events as OpenAI produces tokens:
+            {'type': 'delta', 'text': ...}    text to append to what was sent so far
+            {'type': 'replace', 'text': ...}  formatting changed earlier text, replace everything
+            {'type': 'done', 'response': ...} final cleaned and formatted response (same as get_response)
+        Partial text is cleaned and formatted up to the last complete sentence.
+        """
+        print(f" DEBUG: Processing streaming OpenAI request for chatbot {chatbot_id}: '{user_message}'")
+        
+        request = self._prepare_request(chatbot_id, user_message, conversation_id)
+        if 'answer' in request:
+            yield {'type': 'done', 'response': request['answer']}
+            return
+        
+        raw_answer = ''
+        sent_text = ''
+        formatted_length = 0
+        response_id = None
+        try:
+            if request['needs_web_search']:
+                stream = self.client.chat.completions.create(
+                    model=request['model'],
+                    web_search_options={},
+                    messages=[
+                        {"role": "system", "content": request['system_prompt']},
+                        {"role": "user", "content": user_message}
+                    ],
+                    stream=True
+                )
+                deltas = (chunk.choices[0].delta.content or '' for chunk in stream if chunk.choices)
+            else:
+                stream = self.client.responses.create(**self._responses_api_args(request), stream=True)
+                
+                def responses_deltas():
+                    nonlocal response_id
+                    for event in stream:
+                        if event.type == 'response.output_text.delta':
+                            yield event.delta
+                        elif event.type in ('response.created', 'response.completed'):
+                            response_id = event.response.id
+                
+                deltas = responses_deltas()
+            
+            for delta in deltas:
+                raw_answer += delta
+                
+                # Re-format only when a sentence has completed and enough new text arrived
+                boundary = max(raw_answer.rfind(mark) for mark in ('. ', '! ', '? ', '\n'))
+                if boundary < 0 or boundary + 1 - formatted_length < STREAM_FORMAT_MIN_CHARS:
+                    continue
+                formatted_length = boundary + 1
+                partial = self._finish_answer(raw_answer[:formatted_length].strip(), verbose=False)
+                if partial.startswith(sent_text):
+                    if len(partial) > len(sent_text):
+                        yield {'type': 'delta', 'text': partial[len(sent_text):]}
+                else:
+                    yield {'type': 'replace', 'text': partial}
+                sent_text = partial
+            
+            if conversation_id and response_id:
+                self._remember_response(conversation_id, response_id)
+            
+            answer = raw_answer.strip()
+            print(f" DEBUG: OpenAI streamed response generated: {answer[:100]}...")
+            answer = self._finish_answer(answer)
+            self._cache_answer(request, answer)
+            yield {'type': 'done', 'response': answer}
+            
+        except Exception as e:
+            print(f" DEBUG: OpenAI streaming error: {e}")
+            print(f" DEBUG: Error type: {type(e).__name__}")
+            yield {'type': 'done', 'response': self._fallback_response(chatbot_id, user_message)}
+    
+    def _prepare_request(self, chatbot_id, user_message, conversation_id):
+        """
+        Gather context and build the prompt for a chat request.
+        Returns {'answer': ...} when no OpenAI call is needed, otherwise the request parameters.
+        """
         # Get chatbot info for custom system prompt
         from app import Chatbot
         chatbot = Chatbot.query.get(chatbot_id)
         if not chatbot:
-            return "Chatbot not found."
+            return {'answer': "Chatbot not found."}
+        
+        # Check if this is a continuation of a conversation
+        previous_response_id = self._previous_response_id(conversation_id)
+        
+        # Repeated first-turn questions are answered from the response cache
+        cache = self._response_cache_lookup(chatbot, user_message, previous_response_id)
+        if cache and cache['entry']:
+            # Only the text is shared: the OpenAI response that produced it belongs to another
+            # visitor's conversation. The follow-up replays this turn instead (see _replayed_turns)
+            entry = cache['entry']
+            if conversation_id:
+                self._remember_response(conversation_id, CACHED_TURN)
+            print(f" DEBUG: Answering from response cache: {entry['answer'][:100]}...")
+            return {'answer': entry['answer']}
+        
+        history = ''
+        if previous_response_id == CACHED_TURN:
+            previous_response_id = None
+            history = self._replayed_turns(chatbot_id, conversation_id)
         
         # Get relevant context from training data
         context = self._get_relevant_context(chatbot_id, user_message)
@@ -46,7 +249,7 @@ class ChatServiceOpenAI:
         # Allow chatbot to work even without documents if it has a custom prompt
         if not context and not chatbot.system_prompt:
             print(" DEBUG: No training data found and no custom prompt")
-            return "I haven't been trained yet. Please upload some documents and train me first!"
+            return {'answer': "I haven't been trained yet. Please upload some documents and train me first!"}
         
         if context:
             print(f" DEBUG: Using context from {len(context)} relevant passages")
@@ -68,98 +271,142 @@ class ChatServiceOpenAI:
         print("END OF FULL SYSTEM PROMPT")
         print("="*80 + "\n")
         
+        # Determine if we should use web search model
+        if needs_web_search:
+            selected_model = 'gpt-4o-search-preview'
+            print(f" DEBUG: Using OpenAI web search model: {selected_model}")
+        else:
+            # Get the selected model from database settings
+            selected_model = settings_cache.get('openai_model', 'gpt-3.5-turbo')
+            print(f" DEBUG: Using OpenAI model: {selected_model}")
+        
+        # Prepare the input for Responses API
+        input_text = f"{system_prompt}\n\n{history}User: {user_message}"
+        
+        # FULL INPUT LOGGING - Show the complete input being sent to OpenAI
+        print("\n" + "="*80)
+        print("FULL INPUT TEXT BEING SENT TO OPENAI:")
+        print("="*80)
+        print(input_text)
+        print("="*80)
+        print("END OF FULL INPUT TEXT")
+        print("="*80 + "\n")
+        
+        return {
+            'system_prompt': system_prompt,
+            'input_text': input_text,
+            'model': selected_model,
+            'needs_web_search': needs_web_search,
+            'previous_response_id': previous_response_id,
+            # Web search answers depend on the day they were asked, so they are not cached
+            'cache': None if needs_web_search else cache
+        }
+    
+    def _response_cache_fingerprint(self, chatbot):
+        """
+        Identify everything a cached answer depends on: the trained data on disk,
+        the chatbot's system prompt and the admin training prompt / model settings
+        """
+        parts = [
+            self.trainer.training_data_stamp(chatbot.id),
+            chatbot.system_prompt,
+            settings_cache.get('training_prompt'),
+            settings_cache.get('openai_model')
+        ]
+        return hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()
+    
+    def _previous_response_id(self, conversation_id):
+        if not conversation_id:
+            return None
         try:
-            # Determine if we should use web search model
-            if needs_web_search:
-                selected_model = 'gpt-4o-search-preview'
-                print(f" DEBUG: Using OpenAI web search model: {selected_model}")
-            else:
-                # Get the selected model from database settings
-                try:
-                    from app import Settings
-                    setting = Settings.query.filter_by(key='openai_model').first()
-                    selected_model = setting.value if setting else 'gpt-3.5-turbo'
-                except Exception as e:
-                    print(f" DEBUG: Error accessing database for OpenAI model: {e}")
-                    selected_model = 'gpt-3.5-turbo'
-                print(f" DEBUG: Using OpenAI model: {selected_model}")
-            
-            # Prepare the input for Responses API
-            input_text = f"{system_prompt}\n\nUser: {user_message}"
-            
-            # FULL INPUT LOGGING - Show the complete input being sent to OpenAI
-            print("\n" + "="*80)
-            print("FULL INPUT TEXT BEING SENT TO OPENAI:")
-            print("="*80)
-            print(input_text)
-            print("="*80)
-            print("END OF FULL INPUT TEXT")
-            print("="*80 + "\n")
-            
-            # Check if this is a continuation of a conversation
+            previous_response_id = self.conversation_store.get(conversation_id)
+        except Exception as e:
+            print(f" DEBUG: Could not read conversation state: {e}")
             previous_response_id = None
-            if conversation_id and conversation_id in self.conversation_contexts:
-                previous_response_id = self.conversation_contexts[conversation_id]
-                print(f" DEBUG: Continuing conversation with previous_response_id: {previous_response_id}")
-            else:
-                print(f" DEBUG: Starting new conversation")
-            
-            # Call OpenAI Responses API with web search if needed
-            if needs_web_search:
-                # Use chat completions API for web search model
-                try:
-                    response = self.client.chat.completions.create(
-                        model=selected_model,
-                        web_search_options={},
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_message}
-                        ]
-                    )
-                    answer = response.choices[0].message.content.strip()
-                    print(f" DEBUG: Web search API call successful")
-                except Exception as e:
-                    print(f" DEBUG: Web search API call failed: {e}")
-                    raise e
-            elif previous_response_id:
-                try:
-                    response = self.client.responses.create(
-                        model=selected_model,
-                        previous_response_id=previous_response_id,
-                        input=input_text
-                    )
-                    answer = response.output_text.strip()
-                    print(f" DEBUG: Responses API call with previous_response_id successful")
-                except Exception as e:
-                    print(f" DEBUG: Responses API call with previous_response_id failed: {e}")
-                    raise e
-            else:
-                try:
-                    response = self.client.responses.create(
-                        model=selected_model,
-                        input=input_text
-                    )
-                    answer = response.output_text.strip()
-                    print(f" DEBUG: Responses API call successful")
-                except Exception as e:
-                    print(f" DEBUG: Responses API call failed: {e}")
-                    raise e
-            
-            # Store the response ID for future conversation continuity (only for Responses API)
-            if conversation_id and not needs_web_search:
-                self.conversation_contexts[conversation_id] = response.id
-                print(f" DEBUG: Stored response_id {response.id} for conversation {conversation_id}")
+        if previous_response_id:
+            print(f" DEBUG: Continuing conversation with previous_response_id: {previous_response_id}")
+        else:
+            print(f" DEBUG: Starting new conversation")
+        return previous_response_id
+    
+    def _replayed_turns(self, chatbot_id, conversation_id):
+        """
+        The conversation's last saved turns as 'User: ... / Assistant: ...' text, for the request
+        after a cached answer (the turns are saved by the chat routes before they respond)
+        """
+        from app import Conversation
+        try:
+            turns = Conversation.query.filter(
+                Conversation.chatbot_id == chatbot_id,
+                Conversation.conversation_id == conversation_id[:64]
+            ).order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(CACHED_TURN_HISTORY).all()
+        except Exception as e:
+            print(f" DEBUG: Could not load earlier turns of conversation {conversation_id}: {e}")
+            return ''
+        print(f" DEBUG: Replaying {len(turns)} earlier turns after a cached answer")
+        return ''.join(f"User: {turn.user_message}\nAssistant: {turn.bot_response}\n\n" for turn in reversed(turns))
+    
+    def _remember_response(self, conversation_id, response_id):
+        try:
+            self.conversation_store.set(conversation_id, response_id)
+            print(f" DEBUG: Stored response_id {response_id} for conversation {conversation_id}")
+        except Exception as e:
+            print(f" DEBUG: Could not store conversation state: {e}")
+    
+    def _response_cache_lookup(self, chatbot, user_message, previous_response_id):
+        """
+        Check the response cache for a new conversation's question.
+        Returns None when the answer must not be cached (disabled, or a follow-up that depends
+        on earlier turns), otherwise the cache parameters with 'entry' set on a hit.
+        """
+        if chatbot.response_cache_enabled is False:
+            return None
+        if previous_response_id:
+            return None
+        
+        try:
+            fingerprint = self._response_cache_fingerprint(chatbot)
+        except Exception as e:
+            print(f" DEBUG: Response cache unavailable: {e}")
+            return None
+        
+        ttl = chatbot.response_cache_ttl if chatbot.response_cache_ttl is not None else RESPONSE_CACHE_TTL
+        max_entries = chatbot.response_cache_max_entries if chatbot.response_cache_max_entries is not None else RESPONSE_CACHE_MAX_ENTRIES
+        probe = response_cache.probe(user_message)
+        return {
+            'chatbot_id': chatbot.id,
+            'probe': probe,
+            'fingerprint': fingerprint,
+            'max_entries': max_entries,
+            'entry': response_cache.get(chatbot.id, probe, fingerprint, ttl)
+        }
+    
+    def _cache_answer(self, request, answer):
+        cache = request.get('cache')
+        if cache:
+            response_cache.put(cache['chatbot_id'], cache['probe'], cache['fingerprint'], answer,
+                               max_entries=cache['max_entries'])
+    
+    def _responses_api_args(self, request):
+        args = {'model': request['model'], 'input': request['input_text']}
+        if request['previous_response_id']:
+            args['previous_response_id'] = request['previous_response_id']
+        return args
+    
+    def _finish_answer(self, answer, verbose=True):
+        """
+        Clean up training data references and format the answer for display
+        """
+        if verbose:
+            print(f" DEBUG: Original answer: {answer[:100]}...")
+        try:
+            cleaned_answer = self._clean_training_references(answer)
             
-            print(f" DEBUG: OpenAI response generated: {answer[:100]}...")
+            # Format the response for better readability
+            formatted_answer = self._format_response_text(cleaned_answer)
             
-            # Clean up unwanted training data references
-            print(f" DEBUG: Original answer: {answer[:100]}...")
-            try:
-                cleaned_answer = self._clean_training_references(answer)
+            if verbose:
                 print(f" DEBUG: Cleaned response: {cleaned_answer[:100]}...")
-                
-                # Format the response for better readability
-                formatted_answer = self._format_response_text(cleaned_answer)
                 print(f" DEBUG: Formatted response: {formatted_answer[:100]}...")
                 
                 # Show if JSON conversion was triggered
@@ -167,29 +414,27 @@ class ChatServiceOpenAI:
                     print(" DEBUG: JSON table conversion was triggered!")
                 else:
                     print(" DEBUG: JSON table conversion was NOT triggered")
-                    
-            except Exception as e:
-                print(f" DEBUG: Error in response processing: {e}")
-                # Fallback to original answer
-                formatted_answer = answer
-            
-            return formatted_answer
-            
+                
         except Exception as e:
-            print(f" DEBUG: OpenAI Responses API error: {e}")
-            print(f" DEBUG: Error type: {type(e).__name__}")
-            print(f" DEBUG: Error details: {str(e)}")
-            
-            # Fallback to local similarity matching if OpenAI fails
-            similar_content = self.trainer.find_similar_content(chatbot_id, user_message, top_k=1)
-            if similar_content and similar_content[0]['similarity'] > 0.3:
-                fallback_response = similar_content[0]['content']
-                # Clean up training references from fallback response too
-                cleaned_response = self._clean_training_references(fallback_response)
-                # Format the response for better readability
-                return self._format_response_text(cleaned_response)
-            else:
-                return random.choice(self.default_responses)
+            print(f" DEBUG: Error in response processing: {e}")
+            # Fallback to original answer
+            formatted_answer = answer
+        
+        return formatted_answer
+    
+    def _fallback_response(self, chatbot_id, user_message):
+        """
+        Fallback to local similarity matching if OpenAI fails
+        """
+        similar_content = self.trainer.find_similar_content(chatbot_id, user_message, top_k=1)
+        if similar_content and similar_content[0]['similarity'] > 0.3:
+            fallback_response = similar_content[0]['content']
+            # Clean up training references from fallback response too
+            cleaned_response = self._clean_training_references(fallback_response)
+            # Format the response for better readability
+            return self._format_response_text(cleaned_response)
+        else:
+            return random.choice(self.default_responses)
     
     def _get_relevant_context(self, chatbot_id, user_message, max_context_length=2000):
         """
@@ -407,12 +652,7 @@ class ChatServiceOpenAI:
         Determine if web search should be used as fallback
         """
         # Get similarity threshold from settings
-        try:
-            from app import Settings
-            setting = Settings.query.filter_by(key='web_search_min_similarity').first()
-            min_similarity = float(setting.value) if setting else 0.3
-        except:
-            min_similarity = 0.3
+        min_similarity = settings_cache.get('web_search_min_similarity', 0.3, type=float)
         
         # If we have good context from training documents, don't search
         if context_passages:
@@ -449,14 +689,8 @@ class ChatServiceOpenAI:
         This uses the admin training prompt template with the chatbot's custom prompt and training context
         """
         # Get the admin training prompt template from database
-        try:
-            from app import Settings
-            setting = Settings.query.filter_by(key='training_prompt').first()
-            training_prompt_template = setting.value if setting else ''
-            print(f" DEBUG: Successfully retrieved training prompt from database: {len(training_prompt_template)} characters")
-        except Exception as e:
-            print(f" DEBUG: Error accessing database for training prompt: {e}")
-            training_prompt_template = ''
+        training_prompt_template = settings_cache.get('training_prompt', '')
+        print(f" DEBUG: Retrieved training prompt from settings: {len(training_prompt_template)} characters")
         
         # LOGGING: Show the training prompt template from database
         print("\n" + "="*80)
@@ -845,9 +1079,8 @@ class ChatServiceOpenAI:
         """
         Clear conversation context for a specific conversation
         """
-        if conversation_id in self.conversation_contexts:
-            del self.conversation_contexts[conversation_id]
-            print(f" DEBUG: Cleared conversation context for {conversation_id}")
+        self.conversation_store.delete(conversation_id)
+        print(f" DEBUG: Cleared conversation context for {conversation_id}")
     
     def is_greeting(self, message):
         """
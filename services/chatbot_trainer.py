@@ -1,32 +1,145 @@
 import os
+import uuid
 import pickle
 import json
+import re
+import shutil
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
+from .settings_cache import settings_cache
+from .search_index import (
+    KnowledgeBaseIndex, BM25Index, VectorIndex,
+    normalize_rows, use_hnsw, build_hnsw_index, extend_hnsw_index
+)
 
 # Optional imports for AI functionality
 try:
     import numpy as np
     from sentence_transformers import SentenceTransformer
-    from sklearn.metrics.pairwise import cosine_similarity
     AI_AVAILABLE = True
 except ImportError:
     AI_AVAILABLE = False
     print("WARNING: AI libraries not available. Using OpenAI-only mode.")
 
-class ChatbotTrainer:
-    def __init__(self):
-        if AI_AVAILABLE:
+
+class TrainingDataCache:
+    """
+    Bounded LRU cache of parsed training data, keyed by chatbot id.
+    Each entry remembers the mtime/size of the training file it was parsed from,
+    so a retrain written by another worker is picked up on the next lookup.
+    """
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, chatbot_id, file_stamp):
+        key = str(chatbot_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['stamp'] != file_stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, chatbot_id, file_stamp, data):
+        key = str(chatbot_id)
+        entry = {'stamp': file_stamp, 'data': data, 'derived': {}}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def get_derived(self, chatbot_id, data, name, builder):
+        """
+        Return a structure derived from cached training data (e.g. a search index),
+        building it once per cached entry. Dropped together with the entry.
+        """
+        key = str(chatbot_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['data'] is data and name in entry['derived']:
+                return entry['derived'][name]
+        
+        value = builder(data)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['data'] is data:
+                entry['derived'][name] = value
+        return value
+    
+    def evict(self, chatbot_id):
+        with self._lock:
+            self._entries.pop(str(chatbot_id), None)
+    
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared by every ChatbotTrainer in the process so a chat turn parses the file at most once
+training_data_cache = TrainingDataCache(max_entries=int(os.getenv('TRAINING_DATA_CACHE_SIZE', '32')))
+
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Knowledge base generation: documents longer than this many words are split into
+# overlapping windows, converted in parallel and merged back into one knowledge base
+KB_CHUNK_WORDS = int(os.getenv('KB_CHUNK_WORDS', '4000'))
+KB_CHUNK_OVERLAP_WORDS = int(os.getenv('KB_CHUNK_OVERLAP_WORDS', '200'))
+KB_GENERATION_CONCURRENCY = int(os.getenv('KB_GENERATION_CONCURRENCY', '4'))
+
+# Storage precision for the binary embedding sidecar: float32, float16 or int8
+EMBEDDINGS_DTYPE = os.getenv('EMBEDDINGS_DTYPE', 'float32').lower()
+# Seconds a replaced embedding sidecar is kept before a reader may delete it (the trainer
+# deletes it right away; readers only clean up what could not be deleted then, e.g. on Windows)
+EMBEDDINGS_CLEANUP_GRACE_SECONDS = int(os.getenv('EMBEDDINGS_CLEANUP_GRACE_SECONDS', '600'))
+
+# Process-wide SentenceTransformer registry (model name -> model, or None if loading failed)
+_embedding_models = {}
+_embedding_models_lock = threading.Lock()
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME):
+    """
+    Return the shared SentenceTransformer for model_name, loading it on first use.
+    Loading happens once per process no matter how many trainers or services ask for it.
+    """
+    if not AI_AVAILABLE:
+        return None
+    
+    if model_name in _embedding_models:
+        return _embedding_models[model_name]
+    
+    with _embedding_models_lock:
+        # Another thread may have finished loading while we waited for the lock
+        if model_name not in _embedding_models:
             try:
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
-                print("DEBUG: SentenceTransformer model loaded successfully")
+                _embedding_models[model_name] = SentenceTransformer(model_name)
+                print(f"DEBUG: SentenceTransformer model '{model_name}' loaded successfully")
             except Exception as e:
                 print(f"DEBUG: Failed to load SentenceTransformer: {e}")
-                self.model = None
-        else:
+                _embedding_models[model_name] = None
+        return _embedding_models[model_name]
+
+
+class ChatbotTrainer:
+    def __init__(self):
+        if not AI_AVAILABLE:
             print("DEBUG: AI libraries not available, using text-based search only")
-            self.model = None
-        # Use absolute path to ensure we're always looking in the right directory
-        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'training_data')
+        # Use absolute path to ensure we're always looking in the right directory (TRAINING_DATA_DIR overrides it)
+        self.data_dir = os.getenv('TRAINING_DATA_DIR') or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'training_data')
         os.makedirs(self.data_dir, exist_ok=True)
         
         # Initialize OpenAI client for knowledge base generation
@@ -37,16 +150,32 @@ class ChatbotTrainer:
             self.openai_client = None
             print("WARNING: OPENAI_API_KEY not found. Knowledge base generation will not be available.")
     
-    def generate_knowledge_base(self, text, chatbot_info=None):
+    @property
+    def model(self):
+        """
+        Shared embedding model, loaded lazily on first use
+        """
+        return get_embedding_model()
+    
+    def _get_knowledge_base_model(self):
+        """
+        OpenAI model used for knowledge base generation
+        """
+        # Get model from settings or use default
+        return settings_cache.get('openai_model', 'gpt-4o')
+    
+    def generate_knowledge_base(self, text, chatbot_info=None, model=None):
         """
         Use OpenAI to convert raw document text into a structured JSON knowledge base.
+        Long text is split into overlapping windows that are converted in parallel and merged.
         
         IMPORTANT: This method generates a knowledge base ONLY from the provided document text.
         It does NOT use any sample data or templates - only the structure format is specified.
         The sample_knowledge_base.json file is for reference/documentation only and is NEVER loaded or used.
         
         Args:
-            text (str): The document text to convert (from uploaded documents only)
+            text (str or iterable): The document text to convert (from uploaded documents only),
+                either as a string or as an iterable of lines that is streamed through the chunker
             chatbot_info (dict): Chatbot metadata (name, description)
             
         Returns:
@@ -55,19 +184,141 @@ class ChatbotTrainer:
         if not self.openai_client:
             raise ValueError("OpenAI client not initialized. Please set OPENAI_API_KEY.")
         
-        print(f" DEBUG: Generating knowledge base from {len(text)} characters of text")
+        if isinstance(text, str):
+            print(f" DEBUG: Generating knowledge base from {len(text)} characters of text")
+        else:
+            print(f" DEBUG: Generating knowledge base from streamed document text")
         print(f" DEBUG: Using ONLY the provided document text - no sample data will be used")
         
-        # Get model from settings or use default
-        try:
-            from app import Setting
-            setting = Setting.query.filter_by(key='openai_model').first()
-            model = setting.value if setting else 'gpt-4o'
-        except:
-            model = 'gpt-4o'
-        
+        model = model or self._get_knowledge_base_model()
         print(f" DEBUG: Using OpenAI model: {model}")
         
+        if isinstance(text, str):
+            chunks = self._chunk_text_for_knowledge_base(text)
+            if len(chunks) == 1:
+                return self._generate_knowledge_base_part(text, chatbot_info, model)
+        else:
+            # Lines go straight into the chunker, so the whole text is never held in memory
+            chunks = self._iter_knowledge_base_chunks(text)
+        
+        # Map: convert each window independently (bounded parallelism), then reduce into one KB
+        print(f" DEBUG: Generating knowledge base from chunks (up to {KB_GENERATION_CONCURRENCY} in parallel)")
+        
+        def generate_part(chunk):
+            try:
+                return self._generate_knowledge_base_part(chunk, chatbot_info, model)
+            except Exception as e:
+                print(f" ERROR: Knowledge base generation failed for one chunk: {e}")
+                return None
+        
+        workers = max(1, KB_GENERATION_CONCURRENCY)
+        parts = []
+        chunk_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Only a couple of chunks per worker are read ahead of the running requests
+            pending = deque()
+            for chunk in chunks:
+                chunk_count += 1
+                pending.append(executor.submit(generate_part, chunk))
+                if len(pending) >= 2 * workers:
+                    parts.append(pending.popleft().result())
+            parts.extend(future.result() for future in pending)
+        
+        parts = [part for part in parts if part]
+        if not parts:
+            raise ValueError("Knowledge base generation failed for every chunk of the documents")
+        if chunk_count == 1:
+            return parts[0]
+        print(f" DEBUG: {len(parts)} of {chunk_count} chunks converted, merging")
+        
+        kb_data = self.merge_knowledge_bases(parts)
+        
+        print(f" DEBUG: Merged knowledge base")
+        print(f"   - KB Facts: {len(kb_data.get('kb_facts', []))}")
+        print(f"   - QA Patterns: {len(kb_data.get('qa_patterns', []))}")
+        return kb_data
+    
+    def _chunk_text_for_knowledge_base(self, text):
+        """
+        Split text into overlapping windows of about KB_CHUNK_WORDS words (same idea as
+        DocumentProcessor.chunk_text), keeping line breaks so page/sheet markers survive.
+        """
+        if len(text.split()) <= KB_CHUNK_WORDS:
+            return [text]
+        
+        chunks = list(self._iter_knowledge_base_chunks(text.split('\n')))
+        print(f" DEBUG: Split text into {len(chunks)} chunks for knowledge base generation")
+        return chunks
+    
+    def _iter_knowledge_base_chunks(self, lines):
+        """
+        Generator behind _chunk_text_for_knowledge_base: consumes lines one at a time and
+        yields each window as soon as it is complete
+        """
+        current = []
+        current_words = 0
+        # Whether current holds lines not yet part of any yielded window (not just carried overlap)
+        has_new_content = False
+        for line in lines:
+            line_words = len(line.split())
+            
+            # A single line longer than a window is split on words
+            if line_words > KB_CHUNK_WORDS:
+                if has_new_content:
+                    chunk = self._join_chunk(current)
+                    if chunk:
+                        yield chunk
+                current = []
+                current_words = 0
+                has_new_content = False
+                words = line.split()
+                step = max(1, KB_CHUNK_WORDS - KB_CHUNK_OVERLAP_WORDS)
+                for i in range(0, len(words), step):
+                    yield ' '.join(words[i:i + KB_CHUNK_WORDS])
+                    if i + KB_CHUNK_WORDS >= len(words):
+                        break
+                continue
+            
+            if current_words + line_words > KB_CHUNK_WORDS and current:
+                chunk = self._join_chunk(current)
+                if chunk:
+                    yield chunk
+                has_new_content = False
+                # Carry the last words over as overlap, leaving room for the new line
+                current = self._trailing_words(current, min(KB_CHUNK_OVERLAP_WORDS, KB_CHUNK_WORDS - line_words))
+                current_words = sum(len(previous_line.split()) for previous_line in current)
+            
+            current.append(line)
+            current_words += line_words
+            has_new_content = has_new_content or bool(line.strip())
+        
+        if has_new_content:
+            chunk = self._join_chunk(current)
+            if chunk:
+                yield chunk
+    
+    def _trailing_words(self, lines, limit):
+        """Trailing lines holding at most limit words (the first one cut to its last words if needed)"""
+        kept = []
+        kept_words = 0
+        for line in reversed(lines):
+            if kept_words >= limit:
+                break
+            words = line.split()
+            if kept_words + len(words) > limit:
+                kept.insert(0, ' '.join(words[len(words) - (limit - kept_words):]))
+                break
+            kept.insert(0, line)
+            kept_words += len(words)
+        return kept
+    
+    def _join_chunk(self, lines):
+        return '\n'.join(lines).strip()
+    
+    def _generate_knowledge_base_part(self, text, chatbot_info, model):
+        """
+        Single OpenAI call converting (part of) the document text into a knowledge base
+        """
         # Create the prompt for OpenAI to generate the knowledge base
         brand_name = chatbot_info.get('name', 'the business') if chatbot_info else 'the business'
         brand_desc = chatbot_info.get('description', '') if chatbot_info else ''
@@ -262,6 +513,114 @@ Return ONLY the JSON structure with data extracted from the document text above.
             print(f" ERROR: Failed to generate knowledge base: {e}")
             raise
     
+    def _normalize_key(self, value):
+        return re.sub(r'[^\w\s]', '', str(value).lower()).strip()
+    
+    def _merge_unique(self, target, values):
+        """
+        Append values not already in target (strings compared case-insensitively)
+        """
+        seen = {self._normalize_key(item) if isinstance(item, str) else json.dumps(item, sort_keys=True) for item in target}
+        for value in values or []:
+            key = self._normalize_key(value) if isinstance(value, str) else json.dumps(value, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                target.append(value)
+        return target
+    
+    def merge_knowledge_bases(self, parts):
+        """
+        Reduce step for chunked generation: merge partial knowledge bases (in document order)
+        into one, de-duplicating kb_facts by title and qa_patterns by intent/triggers.
+        """
+        merged = {
+            'version': '1.0',
+            'brand': {},
+            'business_info': {},
+            'routing_hints': {'global_keywords': [], 'urls': {}},
+            'kb_facts': [],
+            'qa_patterns': []
+        }
+        facts_by_title = {}
+        fact_ids = set()
+        patterns_by_key = {}
+        
+        for part in parts:
+            # Brand: first non-empty value wins
+            for key, value in (part.get('brand') or {}).items():
+                if value and not merged['brand'].get(key):
+                    merged['brand'][key] = value
+            
+            # Business info: lists are unioned, plans de-duplicated by name, scalars keep the first value
+            for key, value in (part.get('business_info') or {}).items():
+                if key == 'plans' and isinstance(value, list):
+                    plans = merged['business_info'].setdefault('plans', [])
+                    for plan in value:
+                        if not isinstance(plan, dict):
+                            continue
+                        existing = next((p for p in plans if self._normalize_key(p.get('name', '')) == self._normalize_key(plan.get('name', ''))), None)
+                        if existing is None:
+                            plans.append(plan)
+                        else:
+                            existing['features'] = self._merge_unique(list(existing.get('features') or []), plan.get('features'))
+                elif isinstance(value, list):
+                    self._merge_unique(merged['business_info'].setdefault(key, []), value)
+                elif value and not merged['business_info'].get(key):
+                    merged['business_info'][key] = value
+            
+            routing_hints = part.get('routing_hints') or {}
+            self._merge_unique(merged['routing_hints']['global_keywords'], routing_hints.get('global_keywords'))
+            for name, url in (routing_hints.get('urls') or {}).items():
+                merged['routing_hints']['urls'].setdefault(name, url)
+            
+            # KB facts: same title means same fact; keep ids unique across parts
+            id_map = {}
+            for fact in part.get('kb_facts') or []:
+                if not isinstance(fact, dict):
+                    continue
+                title_key = self._normalize_key(fact.get('title', ''))
+                existing = facts_by_title.get(title_key) if title_key else None
+                if existing is not None:
+                    existing['keywords'] = self._merge_unique(list(existing.get('keywords') or []), fact.get('keywords'))
+                    if len(fact.get('answer_long') or '') > len(existing.get('answer_long') or ''):
+                        existing['answer_long'] = fact.get('answer_long')
+                    id_map[fact.get('id')] = existing.get('id')
+                    continue
+                
+                fact = dict(fact)
+                source_id = fact.get('id')
+                base_id = source_id or f'fact-{len(merged["kb_facts"]) + 1}'
+                new_id = base_id
+                suffix = 2
+                while new_id in fact_ids:
+                    new_id = f'{base_id}-{suffix}'
+                    suffix += 1
+                fact['id'] = new_id
+                fact_ids.add(new_id)
+                if source_id:
+                    id_map[source_id] = new_id
+                merged['kb_facts'].append(fact)
+                if title_key:
+                    facts_by_title[title_key] = fact
+            
+            # QA patterns: merge triggers of patterns with the same intent id
+            for pattern in part.get('qa_patterns') or []:
+                if not isinstance(pattern, dict):
+                    continue
+                pattern = dict(pattern)
+                if pattern.get('response_ref') in id_map:
+                    pattern['response_ref'] = id_map[pattern['response_ref']]
+                
+                key = self._normalize_key(pattern.get('intent_id', '')) or self._normalize_key(' '.join(pattern.get('triggers') or []))
+                existing = patterns_by_key.get(key)
+                if existing is not None:
+                    existing['triggers'] = self._merge_unique(list(existing.get('triggers') or []), pattern.get('triggers'))
+                    continue
+                patterns_by_key[key] = pattern
+                merged['qa_patterns'].append(pattern)
+        
+        return merged
+    
     def train_chatbot(self, chatbot_id, text, use_knowledge_base=True, chatbot_info=None):
         """
         Train a chatbot with the provided text.
@@ -278,21 +637,155 @@ Return ONLY the JSON structure with data extracted from the document text above.
             try:
                 print(" DEBUG: Using new knowledge base generation approach")
                 kb_data = self.generate_knowledge_base(text, chatbot_info)
+                self._save_knowledge_base(chatbot_id, kb_data)
+                return
+                
+            except Exception as e:
+                print(f" ERROR: Knowledge base generation failed: {e}")
+                print(" DEBUG: Falling back to legacy sentence-based approach")
+                # Fall through to legacy approach
+        
+        self._train_legacy(chatbot_id, text)
+    
+    def train_chatbot_from_documents(self, chatbot_id, documents, use_knowledge_base=True, chatbot_info=None):
+        """
+        Train a chatbot from per-document texts, regenerating knowledge base fragments
+        only for documents whose text changed since the last training run.
+        
+        Args:
+            documents (list): one dict per document, in document order, with either the extracted
+                'text' or 'text_file' (path of a UTF-8 file holding it, streamed rather than loaded)
+        """
+        print(f"DEBUG: Starting incremental training for chatbot {chatbot_id} with {len(documents)} documents")
+        
+        if use_knowledge_base and self.openai_client:
+            try:
+                model = self._get_knowledge_base_model()
+                fragments = []
+                fragment_names = set()
+                generated = 0
+                for doc in documents:
+                    if self._document_is_empty(doc):
+                        continue
+                    fragment_name = self._fragment_name(self._document_text_hash(doc), chatbot_info, model)
+                    fragment_names.add(fragment_name)
+                    fragment = self._load_fragment(chatbot_id, fragment_name)
+                    if fragment is None:
+                        source = doc['text'] if 'text' in doc else self._iter_file_lines(doc['text_file'])
+                        fragment = self.generate_knowledge_base(source, chatbot_info, model=model)
+                        self._save_fragment(chatbot_id, fragment_name, fragment)
+                        generated += 1
+                    fragments.append(fragment)
                 
-                # Save the knowledge base
-                file_path = os.path.join(self.data_dir, f'chatbot_{chatbot_id}.json')
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(kb_data, f, ensure_ascii=False, indent=2)
+                if not fragments:
+                    raise ValueError("No content found to train the chatbot")
                 
-                print(f" DEBUG: Saved knowledge base to {file_path}")
-                print(f" DEBUG: Chatbot {chatbot_id} trained with knowledge base successfully")
+                print(f" DEBUG: Knowledge base fragments: {generated} generated, {len(fragments) - generated} reused")
+                kb_data = fragments[0] if len(fragments) == 1 else self.merge_knowledge_bases(fragments)
+                self._save_knowledge_base(chatbot_id, kb_data)
+                self._prune_fragments(chatbot_id, fragment_names, prefix='kb_')
                 return
                 
             except Exception as e:
                 print(f" ERROR: Knowledge base generation failed: {e}")
                 print(" DEBUG: Falling back to legacy sentence-based approach")
-                # Fall through to legacy approach
         
+        self._train_legacy(chatbot_id, "".join(f"\n\n{self._document_text(doc)}" for doc in documents))
+    
+    def _document_text(self, doc):
+        if 'text' in doc:
+            return doc['text']
+        with open(doc['text_file'], 'r', encoding='utf-8', newline='\n') as f:
+            return f.read()
+    
+    def _document_is_empty(self, doc):
+        if 'text' in doc:
+            return not doc['text'].strip()
+        # Extracted text files are already stripped
+        return os.path.getsize(doc['text_file']) == 0
+    
+    def _document_text_hash(self, doc):
+        """SHA-256 of the document text, reading text files in blocks"""
+        if 'text' in doc:
+            return hashlib.sha256(doc['text'].encode('utf-8')).hexdigest()
+        digest = hashlib.sha256()
+        with open(doc['text_file'], 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _iter_file_lines(self, path):
+        with open(path, 'r', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                yield line.rstrip('\n')
+    
+    def _save_knowledge_base(self, chatbot_id, kb_data):
+        # Save the knowledge base
+        file_path = os.path.join(self.data_dir, f'chatbot_{chatbot_id}.json')
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(kb_data, f, ensure_ascii=False, indent=2)
+        self._remove_embeddings_file(chatbot_id)
+        self._cache_training_data(chatbot_id, file_path, kb_data)
+        self._get_kb_index(chatbot_id, kb_data)
+        
+        print(f" DEBUG: Saved knowledge base to {file_path}")
+        print(f" DEBUG: Chatbot {chatbot_id} trained with knowledge base successfully")
+    
+    def _fragments_dir(self, chatbot_id):
+        return os.path.join(self.data_dir, f'chatbot_{chatbot_id}_fragments')
+    
+    def scrape_manifest_path(self, chatbot_id, domain):
+        """
+        Manifest of the last scrape of a website for this chatbot (removed with the chatbot's other data)
+        """
+        return os.path.join(self._fragments_dir(chatbot_id), f"scrape_{re.sub(r'[^A-Za-z0-9.-]', '_', domain)}.json")
+    
+    def _fragment_name(self, text_hash, chatbot_info, model):
+        """
+        Fragments depend on the document text (by hash) and on everything else that goes into the prompt
+        """
+        key = json.dumps([
+            text_hash,
+            model,
+            (chatbot_info or {}).get('name', ''),
+            (chatbot_info or {}).get('description', '')
+        ])
+        return f"kb_{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+    
+    def _load_fragment(self, chatbot_id, fragment_name):
+        path = os.path.join(self._fragments_dir(chatbot_id), fragment_name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_fragment(self, chatbot_id, fragment_name, fragment):
+        fragments_dir = self._fragments_dir(chatbot_id)
+        os.makedirs(fragments_dir, exist_ok=True)
+        path = os.path.join(fragments_dir, fragment_name)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(fragment, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+    
+    def _prune_fragments(self, chatbot_id, keep_names, prefix):
+        """
+        Remove cached fragments with the given prefix that the current documents no longer use
+        """
+        fragments_dir = self._fragments_dir(chatbot_id)
+        if not os.path.isdir(fragments_dir):
+            return
+        for name in os.listdir(fragments_dir):
+            if name.startswith(prefix) and name not in keep_names:
+                try:
+                    os.remove(os.path.join(fragments_dir, name))
+                except OSError as e:
+                    print(f" DEBUG: Could not remove cached fragment {name}: {e}")
+    
+    def _train_legacy(self, chatbot_id, text):
+        """
+        Legacy training: split text into sentences and generate embeddings
+        """
         # LEGACY APPROACH: Split into sentences and generate embeddings
         print(" DEBUG: Using legacy sentence-based training approach")
         print(f"DEBUG: AI_AVAILABLE = {AI_AVAILABLE}")
@@ -318,17 +811,24 @@ Return ONLY the JSON structure with data extracted from the document text above.
         }
         
         # Generate embeddings only if AI libraries are available
+        embeddings = None
         if AI_AVAILABLE and self.model:
             print(" DEBUG: Generating embeddings...")
             try:
-                embeddings = self.model.encode(sentences)
+                embeddings, previous_sentences = self._encode_sentences(chatbot_id, sentences)
                 print(f" DEBUG: Generated embeddings shape: {embeddings.shape}")
-                training_data['embeddings'] = embeddings.tolist()
+                training_data['embeddings'] = None
+                training_data.update(self._save_embeddings(chatbot_id, embeddings))
+                embeddings = self._load_embeddings(chatbot_id, training_data)
+                self._update_vector_index(chatbot_id, embeddings, previous_sentences, sentences)
                 print(f" DEBUG: Successfully generated {len(embeddings)} embeddings")
             except Exception as e:
                 print(f" DEBUG: Error generating embeddings: {e}")
                 print(" DEBUG: Falling back to no embeddings")
+                embeddings = None
                 training_data['embeddings'] = None
+                for key in ('embeddings_file', 'embeddings_dtype', 'embeddings_shape', 'embeddings_scales', 'embeddings_normalized'):
+                    training_data.pop(key, None)
         else:
             print(" DEBUG: Skipping embeddings generation")
             print(f"   - AI_AVAILABLE: {AI_AVAILABLE}")
@@ -336,8 +836,24 @@ Return ONLY the JSON structure with data extracted from the document text above.
             training_data['embeddings'] = None
         
         file_path = os.path.join(self.data_dir, f'chatbot_{chatbot_id}.json')
-        with open(file_path, 'w', encoding='utf-8') as f:
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(training_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, file_path)
+        
+        # Only now does the JSON on disk point at the new sidecar, so earlier ones can go
+        if embeddings is None:
+            self._remove_embeddings_file(chatbot_id)
+        else:
+            self._remove_old_embeddings(chatbot_id, self._current_embeddings_path(chatbot_id, training_data))
+        
+        # Cache the in-memory form (numpy embeddings) that get_training_data would return
+        cached_data = dict(training_data)
+        cached_data['embeddings'] = embeddings
+        self._cache_training_data(chatbot_id, file_path, cached_data)
+        self._get_text_index(chatbot_id, cached_data)
+        if embeddings is not None:
+            self._get_vector_index(chatbot_id, cached_data)
         
         print(f" DEBUG: Saved training data to {file_path}")
         print(f" DEBUG: Chatbot {chatbot_id} trained with {len(sentences)} sentences (legacy format)")
@@ -437,21 +953,239 @@ Return ONLY the JSON structure with data extracted from the document text above.
         
         return starts_with_question or ends_with_question_mark
     
+    def _file_stamp(self, file_path):
+        """
+        Identify a specific version of a training file (mtime + size)
+        """
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def training_data_stamp(self, chatbot_id):
+        """
+        Version of a chatbot's training data, changes on every retrain (None if untrained)
+        """
+        try:
+            return self._file_stamp(os.path.join(self.data_dir, f'chatbot_{chatbot_id}.json'))
+        except OSError:
+            return None
+
+    def _cache_training_data(self, chatbot_id, file_path, data):
+        """
+        Store freshly written training data in the shared cache
+        """
+        try:
+            training_data_cache.put(chatbot_id, self._file_stamp(file_path), data)
+        except OSError as e:
+            print(f" DEBUG: Could not cache training data for chatbot {chatbot_id}: {e}")
+            training_data_cache.evict(chatbot_id)
+    
+    def _embeddings_path(self, chatbot_id, version=None):
+        if version:
+            return os.path.join(self.data_dir, f'chatbot_{chatbot_id}.emb.{version}.npy')
+        return os.path.join(self.data_dir, f'chatbot_{chatbot_id}.emb.npy')
+    
+    def _embeddings_files(self, chatbot_id):
+        """Every embeddings sidecar of a chatbot (the unversioned name is from older trainings)"""
+        prefix = f'chatbot_{chatbot_id}.emb.'
+        try:
+            names = os.listdir(self.data_dir)
+        except OSError:
+            return []
+        return [os.path.join(self.data_dir, name) for name in names
+                if name.startswith(prefix) and name.endswith('.npy')]
+    
+    def _save_embeddings(self, chatbot_id, embeddings):
+        """
+        Write embeddings to the binary sidecar file next to the training JSON.
+        Rows are stored unit-length so similarity search is a plain dot product.
+        Every save gets a new file name, so a matrix still memory-mapped by readers is never
+        overwritten; the previous file is deleted on the next load.
+        Returns the metadata to store in the JSON so the matrix can be loaded back.
+        """
+        embeddings = normalize_rows(embeddings)
+        dtype = EMBEDDINGS_DTYPE if EMBEDDINGS_DTYPE in ('float32', 'float16', 'int8') else 'float32'
+        path = self._embeddings_path(chatbot_id, uuid.uuid4().hex[:12])
+        metadata = {
+            'embeddings_file': os.path.basename(path),
+            'embeddings_dtype': dtype,
+            'embeddings_shape': list(embeddings.shape),
+            'embeddings_normalized': True
+        }
+        
+        if dtype == 'int8':
+            # Symmetric per-row quantization; the scales are small enough to keep in the JSON
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            stored = np.round(embeddings / scales[:, None]).astype(np.int8)
+            metadata['embeddings_scales'] = scales.tolist()
+        else:
+            stored = embeddings.astype(dtype)
+        
+        # Write to a temp file and rename it so a reader never maps a half-written matrix
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, stored)
+        os.replace(tmp_path, path)
+        
+        print(f" DEBUG: Saved {stored.shape[0]} embeddings to {path} ({dtype})")
+        return metadata
+    
+    def _load_embeddings(self, chatbot_id, data):
+        """
+        Memory-map the embedding sidecar described by the training data metadata
+        """
+        embeddings = np.load(self._current_embeddings_path(chatbot_id, data), mmap_mode='r')
+        
+        if data.get('embeddings_dtype') == 'int8':
+            scales = np.asarray(data.get('embeddings_scales', []), dtype=np.float32)
+            embeddings = embeddings.astype(np.float32) * scales[:, None]
+        
+        return embeddings
+    
+    def _current_embeddings_path(self, chatbot_id, data):
+        return os.path.join(self.data_dir, data.get('embeddings_file') or os.path.basename(self._embeddings_path(chatbot_id)))
+    
+    def _remove_old_embeddings(self, chatbot_id, current_path, grace_seconds=None):
+        """
+        Delete a chatbot's sidecars other than the current one. A file another reader still
+        maps cannot be deleted on Windows; it is left for a later cleanup.
+        With grace_seconds (cleanup by readers), only files older than the current one and
+        unchanged for that long are deleted: a newer file may belong to a running training
+        whose JSON is not written yet.
+        """
+        if grace_seconds is not None:
+            try:
+                current_mtime = os.path.getmtime(current_path)
+            except OSError:
+                return
+            cutoff = min(current_mtime, time.time() - grace_seconds)
+        
+        for path in self._embeddings_files(chatbot_id):
+            if os.path.abspath(path) == os.path.abspath(current_path):
+                continue
+            try:
+                if grace_seconds is not None and os.path.getmtime(path) >= cutoff:
+                    continue
+                os.remove(path)
+                print(f" DEBUG: Removed old embeddings file {path}")
+            except OSError as e:
+                print(f" DEBUG: Could not remove old embeddings file {path}: {e}")
+    
+    def _vector_index_path(self, chatbot_id):
+        return os.path.join(self.data_dir, f'chatbot_{chatbot_id}.hnsw')
+    
+    def _remove_embeddings_file(self, chatbot_id):
+        for path in self._embeddings_files(chatbot_id) + [self._vector_index_path(chatbot_id)]:
+            if os.path.exists(path):
+                os.remove(path)
+                print(f" DEBUG: Removed embeddings file {path}")
+    
+    def _encode_sentences(self, chatbot_id, sentences):
+        """
+        Encode sentences, reusing the previous training run's embeddings for sentences that did not change.
+        Returns (embeddings, previous sentences that had embeddings).
+        """
+        previous = self.get_training_data(chatbot_id)
+        previous_sentences = []
+        previous_embeddings = None
+        reusable = {}
+        if previous and not self.is_knowledge_base_format(previous) and previous.get('embeddings') is not None:
+            previous_embeddings = previous['embeddings']
+            if len(previous_embeddings) == len(previous.get('sentences', [])):
+                previous_sentences = previous['sentences']
+                for idx, sentence in enumerate(previous_sentences):
+                    reusable.setdefault(sentence, idx)
+        
+        missing = [idx for idx, sentence in enumerate(sentences) if sentence not in reusable]
+        if len(missing) == len(sentences):
+            return np.asarray(self.model.encode(sentences), dtype=np.float32), previous_sentences
+        
+        new_vectors = self.model.encode([sentences[idx] for idx in missing]) if missing else None
+        dim = new_vectors.shape[1] if new_vectors is not None else previous_embeddings.shape[1]
+        embeddings = np.empty((len(sentences), dim), dtype=np.float32)
+        for idx, sentence in enumerate(sentences):
+            if sentence in reusable:
+                embeddings[idx] = previous_embeddings[reusable[sentence]]
+        for position, idx in enumerate(missing):
+            embeddings[idx] = new_vectors[position]
+        
+        print(f" DEBUG: Reused {len(sentences) - len(missing)} embeddings, encoded {len(missing)} new sentences")
+        return embeddings, previous_sentences
+    
+    def _update_vector_index(self, chatbot_id, embeddings, previous_sentences, sentences):
+        """
+        Keep the persisted approximate index in step with a retrain.
+        Appended sentences are added to the existing index; any other change rebuilds it.
+        """
+        path = self._vector_index_path(chatbot_id)
+        if not use_hnsw(len(sentences)):
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        
+        try:
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            if (os.path.exists(path) and previous_sentences
+                    and sentences[:len(previous_sentences)] == previous_sentences):
+                extend_hnsw_index(path, matrix, len(previous_sentences))
+            else:
+                build_hnsw_index(path, matrix)
+        except Exception as e:
+            print(f" DEBUG: Could not update HNSW index, it will be rebuilt on load: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _get_vector_index(self, chatbot_id, training_data):
+        """
+        Similarity index over the sentence embeddings, built once per loaded training file
+        """
+        normalized = (training_data.get('embeddings_normalized', False)
+                      and training_data.get('embeddings_dtype', 'float32') == 'float32')
+        return training_data_cache.get_derived(
+            chatbot_id, training_data, 'vector_index',
+            lambda data: VectorIndex(data['embeddings'], normalized=normalized,
+                                     hnsw_path=self._vector_index_path(chatbot_id))
+        )
+    
+    def _migrate_json_embeddings(self, chatbot_id, file_path, data):
+        """
+        Move embeddings stored as a JSON list (older training files) into the binary sidecar
+        and rewrite the training JSON without them.
+        """
+        metadata = self._save_embeddings(chatbot_id, data['embeddings'])
+        data['embeddings'] = None
+        data.update(metadata)
+        
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, file_path)
+        self._remove_old_embeddings(chatbot_id, self._current_embeddings_path(chatbot_id, data))
+        
+        print(f" DEBUG: Migrated JSON embeddings for chatbot {chatbot_id} to {metadata['embeddings_file']}")
+    
     def get_training_data(self, chatbot_id):
         """
         Load training data for a specific chatbot.
         Returns either knowledge base format or legacy sentence-based format.
+        Parsed data is served from the shared LRU cache until the file changes on disk.
         """
         file_path = os.path.join(self.data_dir, f'chatbot_{chatbot_id}.json')
         
-        print(f"DEBUG: Looking for training data at: {file_path}")
-        print(f"DEBUG: Data directory exists: {os.path.exists(self.data_dir)}")
-        print(f"DEBUG: Training file exists: {os.path.exists(file_path)}")
-        
-        if not os.path.exists(file_path):
+        try:
+            file_stamp = self._file_stamp(file_path)
+        except OSError:
             print(f" DEBUG: Training file not found: {file_path}")
+            training_data_cache.evict(chatbot_id)
             return None
         
+        entry = training_data_cache.get(chatbot_id, file_stamp)
+        if entry is not None:
+            print(f" DEBUG: Using cached training data for chatbot {chatbot_id}")
+            return entry['data']
+        
+        print(f"DEBUG: Loading training data from: {file_path}")
+        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -461,20 +1195,37 @@ Return ONLY the JSON structure with data extracted from the document text above.
                 print(f" DEBUG: Loaded knowledge base format")
                 print(f"   - KB Facts: {len(data.get('kb_facts', []))}")
                 print(f"   - QA Patterns: {len(data.get('qa_patterns', []))}")
-                return data
             else:
                 # Legacy format
                 print(f" DEBUG: Loaded legacy training data: {len(data.get('sentences', []))} sentences")
                 
-                # Convert embeddings back to numpy array if available
                 embeddings_data = data.get('embeddings')
-                if embeddings_data is not None and len(embeddings_data) > 0 and AI_AVAILABLE:
-                    data['embeddings'] = np.array(embeddings_data)
-                    print(f" DEBUG: Loaded {len(embeddings_data)} embeddings")
+                if embeddings_data and AI_AVAILABLE:
+                    # Older files keep embeddings inline; move them to the binary sidecar once
+                    try:
+                        self._migrate_json_embeddings(chatbot_id, file_path, data)
+                        file_stamp = self._file_stamp(file_path)
+                    except Exception as e:
+                        print(f" DEBUG: Could not migrate embeddings, using inline copy: {e}")
+                        data['embeddings'] = np.array(embeddings_data)
+                
+                if data.get('embeddings_file') and AI_AVAILABLE:
+                    try:
+                        data['embeddings'] = self._load_embeddings(chatbot_id, data)
+                        # Sidecars the trainer could not delete; a newer one may belong to a training in progress
+                        self._remove_old_embeddings(chatbot_id, self._current_embeddings_path(chatbot_id, data),
+                                                    grace_seconds=EMBEDDINGS_CLEANUP_GRACE_SECONDS)
+                    except Exception as e:
+                        print(f" DEBUG: Could not load embeddings file {data['embeddings_file']}: {e}")
+                        data['embeddings'] = None
+                
+                if data.get('embeddings') is not None and len(data['embeddings']) > 0:
+                    print(f" DEBUG: Loaded {len(data['embeddings'])} embeddings")
                 else:
                     print(f" DEBUG: No embeddings available")
-                
-                return data
+            
+            training_data_cache.put(chatbot_id, file_stamp, data)
+            return data
         except Exception as e:
             print(f" DEBUG: Error loading training data: {e}")
             return None
@@ -487,6 +1238,12 @@ Return ONLY the JSON structure with data extracted from the document text above.
             return False
         return 'kb_facts' in training_data or 'qa_patterns' in training_data
     
+    def _get_kb_index(self, chatbot_id, training_data):
+        """
+        Inverted index for a knowledge base, built once per loaded training file
+        """
+        return training_data_cache.get_derived(chatbot_id, training_data, 'kb_index', KnowledgeBaseIndex)
+    
     def query_knowledge_base(self, chatbot_id, user_query, top_k=3):
         """
         Query the knowledge base for relevant information based on user query.
@@ -504,10 +1261,8 @@ Return ONLY the JSON structure with data extracted from the document text above.
         
         print(f" DEBUG: Querying knowledge base for: '{user_query}'")
         
-        # Extract components from knowledge base
-        kb_facts = training_data.get('kb_facts', [])
-        qa_patterns = training_data.get('qa_patterns', [])
-        global_keywords = training_data.get('routing_hints', {}).get('global_keywords', [])
+        # Precomputed inverted index, cached with the training data
+        kb_index = self._get_kb_index(chatbot_id, training_data)
         
         # Normalize user query
         query_lower = user_query.lower().strip()
@@ -515,42 +1270,39 @@ Return ONLY the JSON structure with data extracted from the document text above.
         
         # Match against QA patterns first (most specific)
         qa_matches = []
-        for pattern in qa_patterns:
+        pattern_candidates = kb_index.pattern_candidates(query_lower, query_words)
+        for pattern_idx in sorted(pattern_candidates):
+            pattern = kb_index.patterns[pattern_idx]
             intent_id = pattern.get('intent_id', '')
-            triggers = pattern.get('triggers', [])
-            
-            # Check if any trigger matches the query
-            for trigger in triggers:
-                trigger_lower = trigger.lower()
-                # Calculate match score
-                trigger_words = set(trigger_lower.split())
-                word_overlap = len(query_words.intersection(trigger_words))
-                
-                # Exact phrase match gets highest score
-                if query_lower in trigger_lower or trigger_lower in query_lower:
-                    match_score = 1.0
-                elif word_overlap >= len(query_words) * 0.6:  # 60% word overlap
-                    match_score = 0.7 + (word_overlap / len(query_words)) * 0.3
-                elif word_overlap > 0:
-                    match_score = word_overlap / max(len(query_words), len(trigger_words))
-                else:
-                    continue
-                
-                qa_matches.append({
-                    'type': 'qa_pattern',
-                    'intent_id': intent_id,
-                    'trigger': trigger,
-                    'score': match_score,
-                    'response_inline': pattern.get('response_inline'),
-                    'response_ref': pattern.get('response_ref'),
-                    'data': pattern
-                })
-                print(f"   QA Pattern match: {intent_id} (score: {match_score:.3f})")
-                break  # Only count one match per pattern
+            
+            # Only the first matching trigger counts for a pattern
+            trigger, trigger_lower, trigger_words = kb_index.triggers[pattern_idx][pattern_candidates[pattern_idx]]
+            word_overlap = len(query_words.intersection(trigger_words))
+            
+            # Exact phrase match gets highest score
+            if query_lower in trigger_lower or trigger_lower in query_lower:
+                match_score = 1.0
+            elif word_overlap >= len(query_words) * 0.6:  # 60% word overlap
+                match_score = 0.7 + (word_overlap / len(query_words)) * 0.3
+            else:
+                match_score = word_overlap / max(len(query_words), len(trigger_words))
+            
+            qa_matches.append({
+                'type': 'qa_pattern',
+                'intent_id': intent_id,
+                'trigger': trigger,
+                'score': match_score,
+                'response_inline': pattern.get('response_inline'),
+                'response_ref': pattern.get('response_ref'),
+                'data': pattern
+            })
+            print(f"   QA Pattern match: {intent_id} (score: {match_score:.3f})")
         
         # Match against KB facts (broader knowledge)
         kb_matches = []
-        for fact in kb_facts:
+        for fact_idx in kb_index.fact_candidates(query_lower, query_words):
+            fact = kb_index.facts[fact_idx]
+            title_lower, title_words, keywords_lower = kb_index.fact_fields[fact_idx]
             fact_id = fact.get('id', '')
             title = fact.get('title', '')
             keywords = fact.get('keywords', [])
@@ -559,19 +1311,16 @@ Return ONLY the JSON structure with data extracted from the document text above.
             match_score = 0.0
             
             # Check title match
-            title_lower = title.lower()
             if query_lower in title_lower or title_lower in query_lower:
                 match_score += 0.5
             else:
-                title_words = set(title_lower.split())
                 title_overlap = len(query_words.intersection(title_words))
                 if title_overlap > 0:
                     match_score += (title_overlap / len(query_words)) * 0.3
             
             # Check keyword matches
             keyword_matches = 0
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
+            for keyword_lower in keywords_lower:
                 if keyword_lower in query_lower or any(kw in keyword_lower for kw in query_words):
                     keyword_matches += 1
             
@@ -625,10 +1374,14 @@ Return ONLY the JSON structure with data extracted from the document text above.
             
             print(f" Training data statistics:")
             print(f"   - Sentences: {len(data.get('sentences', []))}")
-            print(f"   - Embeddings: {data.get('embeddings') is not None}")
+            print(f"   - Embeddings: {bool(data.get('embeddings') or data.get('embeddings_file'))}")
             
-            if data.get('embeddings'):
-                print(f"   - Embeddings count: {len(data['embeddings'])}")
+            if data.get('embeddings_file'):
+                embeddings_path = os.path.join(self.data_dir, data['embeddings_file'])
+                print(f"   - Embeddings file: {data['embeddings_file']} (exists: {os.path.exists(embeddings_path)})")
+                print(f"   - Embeddings shape: {data.get('embeddings_shape')} ({data.get('embeddings_dtype', 'float32')})")
+            elif data.get('embeddings'):
+                print(f"   - Embeddings count: {len(data['embeddings'])} (inline JSON, migrated on next load)")
             else:
                 print(f"   -  No embeddings found - this will cause poor search results")
             
@@ -654,6 +1407,10 @@ Return ONLY the JSON structure with data extracted from the document text above.
         """
         file_path = os.path.join(self.data_dir, f'chatbot_{chatbot_id}.json')
         
+        training_data_cache.evict(chatbot_id)
+        self._remove_embeddings_file(chatbot_id)
+        shutil.rmtree(self._fragments_dir(chatbot_id), ignore_errors=True)
+        
         if os.path.exists(file_path):
             os.remove(file_path)
             print(f" DEBUG: Training data for chatbot {chatbot_id} deleted")
@@ -686,7 +1443,7 @@ Return ONLY the JSON structure with data extracted from the document text above.
             print(f"   - AI_AVAILABLE: {AI_AVAILABLE}")
             print(f"   - Embeddings: {embeddings is not None}")
             print(f"   - Model: {self.model is not None}")
-            return self._simple_text_search(training_data['sentences'], query, top_k)
+            return self._simple_text_search(chatbot_id, training_data, query, top_k)
         
         try:
             # Encode the query
@@ -694,18 +1451,12 @@ Return ONLY the JSON structure with data extracted from the document text above.
             query_embedding = self.model.encode([query])
             print(f" DEBUG: Query encoded, shape: {query_embedding.shape}")
             
-            # Calculate similarities
-            print(" DEBUG: Calculating cosine similarities...")
-            similarities = cosine_similarity(query_embedding, training_data['embeddings'])[0]
-            
-            print(f" DEBUG: Similarity scores - min: {similarities.min():.3f}, max: {similarities.max():.3f}, avg: {similarities.mean():.3f}")
-            
-            # Get top k most similar sentences
-            top_indices = np.argsort(similarities)[::-1][:top_k]
+            # Top k most similar sentences from the (pre-normalized) vector index
+            vector_index = self._get_vector_index(chatbot_id, training_data)
+            top_matches = vector_index.search(query_embedding[0], top_k)
             
             results = []
-            for idx in top_indices:
-                similarity_score = similarities[idx]
+            for idx, similarity_score in top_matches:
                 if similarity_score > 0.1:  # Very low threshold to catch more potential matches
                     results.append({
                         'content': training_data['sentences'][idx],
@@ -720,7 +1471,7 @@ Return ONLY the JSON structure with data extracted from the document text above.
         except Exception as e:
             print(f" DEBUG: Error in similarity search: {e}")
             print(" DEBUG: Falling back to simple text matching")
-            return self._simple_text_search(training_data['sentences'], query, top_k)
+            return self._simple_text_search(chatbot_id, training_data, query, top_k)
     
     def get_sentence_by_index(self, chatbot_id, index):
         """
@@ -753,76 +1504,27 @@ Return ONLY the JSON structure with data extracted from the document text above.
         
         return context_sentences 
     
-    def _simple_text_search(self, sentences, query, top_k=3):
+    def _get_text_index(self, chatbot_id, training_data):
         """
-        Simple text-based search when embeddings are not available
+        BM25 index over the training sentences, built once per training run / load
         """
-        query_words = set(query.lower().split())
-        query_lower = query.lower()
-        
-        results = []
-        for idx, sentence in enumerate(sentences):
-            sentence_lower = sentence.lower()
-            sentence_words = set(sentence_lower.split())
-            
-            # Calculate different types of matches
-            word_overlap = len(query_words.intersection(sentence_words))
-            
-            # Partial word matching (for words like "platform" matching "platforms")
-            partial_matches = 0
-            for q_word in query_words:
-                for s_word in sentence_words:
-                    if len(q_word) > 3 and (q_word in s_word or s_word in q_word):
-                        partial_matches += 0.5
-            
-            # Substring matching
-            substring_score = 0
-            for q_word in query_words:
-                if len(q_word) > 3 and q_word in sentence_lower:
-                    substring_score += 0.3
-            
-            # Calculate total score
-            total_matches = word_overlap + partial_matches + substring_score
-            
-            if total_matches > 0:
-                # Improved scoring that considers sentence length and match quality
-                score = total_matches / (len(query_words) + len(sentence_words) - word_overlap + 1)
-                
-                # Boost score for exact phrase matches
-                if query_lower in sentence_lower:
-                    score *= 1.5
-                
-                results.append({
-                    'content': sentence,
-                    'similarity': min(score, 1.0),  # Cap at 1.0
-                    'index': idx
-                })
-                
-                print(f" DEBUG: Simple search match {idx}: score={score:.3f}, content='{sentence[:50]}...'")
-        
-        # If no matches found, try even more lenient matching
-        if not results:
-            print(" DEBUG: No matches found, trying lenient search...")
-            for idx, sentence in enumerate(sentences):
-                sentence_lower = sentence.lower()
-                
-                # Very lenient matching - any word from query in sentence
-                for q_word in query_words:
-                    if len(q_word) > 2 and q_word in sentence_lower:
-                        results.append({
-                            'content': sentence,
-                            'similarity': 0.2,  # Low but non-zero score
-                            'index': idx
-                        })
-                        print(f" DEBUG: Lenient match {idx}: '{sentence[:50]}...'")
-                        break
+        return training_data_cache.get_derived(
+            chatbot_id, training_data, 'bm25_index',
+            lambda data: BM25Index(data.get('sentences', []))
+        )
+    
+    def _simple_text_search(self, chatbot_id, training_data, query, top_k=3):
+        """
+        Text-based search (BM25) when embeddings are not available
+        """
+        text_index = self._get_text_index(chatbot_id, training_data)
+        results = text_index.search(query, top_k)
         
-        # Sort by score and return top k
-        results.sort(key=lambda x: x['similarity'], reverse=True)
-        final_results = results[:top_k]
+        for result in results:
+            print(f" DEBUG: Text search match {result['index']}: score={result['similarity']:.3f}, content='{result['content'][:50]}...'")
         
-        print(f" DEBUG: Simple search returning {len(final_results)} results")
-        return final_results
+        print(f" DEBUG: Simple search returning {len(results)} results")
+        return results
     
     def generate_response(self, chatbot_id, user_message):
         """
@@ -0,0 +1,215 @@
+"""
+Analytics rollups of the Conversation table (ConversationDailyStats)
+Each chat turn is counted in its (chatbot, day, hour) row in the same transaction as the turn,
+and status changes move counts between the status columns of those rows; both only use
+atomic increments. compact() rebuilds any window from Conversation (backfill of older data,
+or repair). Analytics pages read rollups instead of the turns.
+"""
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import func, case
+
+# Rollup column counting each status (turns without a status count as active)
+STATUS_COLUMNS = {'resolved': 'resolved_count', 'active': 'active_count', 'pending': 'pending_count'}
+
+
+def _hour_row_values(chatbot_id, day, hour):
+    return {
+        'chatbot_id': chatbot_id,
+        'day': day,
+        'hour': hour,
+        'conversation_count': 0,
+        'resolved_count': 0,
+        'active_count': 0,
+        'pending_count': 0,
+        'message_length_sum': 0,
+        'updated_at': datetime.utcnow()
+    }
+
+
+def record_turn(chatbot_id, timestamp, message_length):
+    """
+    Count a new (active) chat turn in its hourly row.
+    Runs in the caller's session, so it is committed together with the Conversation row.
+    """
+    from app import db, ConversationDailyStats
+    table = ConversationDailyStats.__table__
+    values = _hour_row_values(chatbot_id, timestamp.date(), timestamp.hour)
+    values.update({'conversation_count': 1, 'active_count': 1, 'message_length_sum': message_length})
+
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.chatbot_id, table.c.day, table.c.hour],
+            set_={
+                'conversation_count': table.c.conversation_count + 1,
+                'active_count': table.c.active_count + 1,
+                'message_length_sum': table.c.message_length_sum + message_length,
+                'updated_at': stmt.excluded.updated_at
+            }
+        ))
+    else:
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.chatbot_id == chatbot_id)
+            .where(table.c.day == values['day'])
+            .where(table.c.hour == values['hour'])
+            .values(conversation_count=table.c.conversation_count + 1,
+                    active_count=table.c.active_count + 1,
+                    message_length_sum=table.c.message_length_sum + message_length,
+                    updated_at=values['updated_at'])
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(**values))
+
+
+def _as_date(value):
+    """DATE() comes back as a string from SQLite and as a date from Postgres"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def set_conversation_status(chatbot_id, conversation_id, status):
+    """
+    Set the status of a conversation's turns and move their counts to the new status column.
+    Turns are updated per (hour, old status) and the rollup is changed by the number of rows
+    each UPDATE really changed, so concurrent requests never count a turn twice.
+    Runs in the caller's session; the caller commits.
+    """
+    from app import db, Conversation, ConversationDailyStats
+    table = ConversationDailyStats.__table__
+    hour = func.extract('hour', Conversation.timestamp)
+
+    groups = db.session.query(
+        func.date(Conversation.timestamp), hour, Conversation.response_status
+    ).filter(
+        Conversation.chatbot_id == chatbot_id,
+        Conversation.conversation_id == conversation_id,
+        Conversation.timestamp.isnot(None)
+    ).group_by(func.date(Conversation.timestamp), hour, Conversation.response_status).all()
+
+    for day, row_hour, old_status in groups:
+        if old_status == status:
+            continue
+        day = _as_date(day)
+        start = datetime.combine(day, time(int(row_hour)))
+        same_status = Conversation.response_status.is_(None) if old_status is None else Conversation.response_status == old_status
+        changed = Conversation.query.filter(
+            Conversation.chatbot_id == chatbot_id,
+            Conversation.conversation_id == conversation_id,
+            same_status,
+            Conversation.timestamp >= start,
+            Conversation.timestamp < start + timedelta(hours=1)
+        ).update({'response_status': status}, synchronize_session=False)
+
+        old_column = STATUS_COLUMNS.get(old_status or 'active')
+        new_column = STATUS_COLUMNS.get(status)
+        if not changed or old_column == new_column:
+            continue
+        values = {'updated_at': datetime.utcnow()}
+        if old_column:
+            values[old_column] = table.c[old_column] - changed
+        if new_column:
+            values[new_column] = table.c[new_column] + changed
+        db.session.execute(
+            table.update()
+            .where(table.c.chatbot_id == chatbot_id)
+            .where(table.c.day == day)
+            .where(table.c.hour == int(row_hour))
+            .values(**values)
+        )
+
+
+def recompute_days(chatbot_id, days):
+    """
+    Rebuild a chatbot's rows for the given days from Conversation (maintenance: rows are
+    deleted and inserted again, so run it while those days receive no new turns).
+    Runs in the caller's session; the caller commits.
+    """
+    from app import db, Conversation, ConversationDailyStats
+    table = ConversationDailyStats.__table__
+    status = Conversation.response_status
+    hour = func.extract('hour', Conversation.timestamp)
+
+    for day in sorted(set(days)):
+        start = datetime.combine(day, time.min)
+        rows = db.session.query(
+            hour,
+            func.count(Conversation.id),
+            func.sum(case((status == 'resolved', 1), else_=0)),
+            func.sum(case((status == 'pending', 1), else_=0)),
+            func.sum(case((status.is_(None), 1), (status == 'active', 1), else_=0)),
+            func.coalesce(func.sum(func.length(Conversation.user_message)), 0)
+        ).filter(
+            Conversation.chatbot_id == chatbot_id,
+            Conversation.timestamp >= start,
+            Conversation.timestamp < start + timedelta(days=1)
+        ).group_by(hour).all()
+
+        db.session.execute(table.delete().where(table.c.chatbot_id == chatbot_id).where(table.c.day == day))
+        for row_hour, count, resolved, pending, active, length_sum in rows:
+            values = _hour_row_values(chatbot_id, day, int(row_hour))
+            values.update({
+                'conversation_count': count,
+                'resolved_count': resolved or 0,
+                'pending_count': pending or 0,
+                'active_count': active or 0,
+                'message_length_sum': int(length_sum or 0)
+            })
+            db.session.execute(table.insert().values(**values))
+
+
+def compact(since=None, chatbot_id=None):
+    """
+    Recompute every (chatbot, day) whose rollup counts differ from its Conversation rows.
+    Commits after each chatbot; returns the number of days rebuilt.
+    """
+    from app import db, Conversation, ConversationDailyStats
+    status = Conversation.response_status
+
+    source = db.session.query(
+        Conversation.chatbot_id, func.date(Conversation.timestamp), func.count(Conversation.id),
+        func.sum(case((status == 'resolved', 1), else_=0)), func.sum(case((status == 'pending', 1), else_=0))
+    ).filter(Conversation.timestamp.isnot(None))
+    rolled = db.session.query(
+        ConversationDailyStats.chatbot_id, ConversationDailyStats.day, func.sum(ConversationDailyStats.conversation_count),
+        func.sum(ConversationDailyStats.resolved_count), func.sum(ConversationDailyStats.pending_count)
+    )
+    if since is not None:
+        source = source.filter(Conversation.timestamp >= datetime.combine(since, time.min))
+        rolled = rolled.filter(ConversationDailyStats.day >= since)
+    if chatbot_id is not None:
+        source = source.filter(Conversation.chatbot_id == chatbot_id)
+        rolled = rolled.filter(ConversationDailyStats.chatbot_id == chatbot_id)
+
+    # (turns, resolved, pending) per chatbot and day, on both sides
+    expected = {(bot, _as_date(day)): tuple(int(n or 0) for n in counts) for bot, day, *counts in
+                source.group_by(Conversation.chatbot_id, func.date(Conversation.timestamp)).all()}
+    actual = {(bot, _as_date(day)): tuple(int(n or 0) for n in counts) for bot, day, *counts in
+              rolled.group_by(ConversationDailyStats.chatbot_id, ConversationDailyStats.day).all()}
+
+    stale = {}
+    for key in set(expected) | set(actual):
+        if expected.get(key, (0, 0, 0)) != actual.get(key, (0, 0, 0)):
+            stale.setdefault(key[0], []).append(key[1])
+
+    for bot, days in stale.items():
+        recompute_days(bot, days)
+        db.session.commit()
+    return sum(len(days) for days in stale.values())
+
+
+def hourly_rows(chatbot_id, since):
+    """Rollup rows of a chatbot from the given day on (at most 24 per day)"""
+    from app import ConversationDailyStats
+    return ConversationDailyStats.query.filter(
+        ConversationDailyStats.chatbot_id == chatbot_id,
+        ConversationDailyStats.day >= since
+    ).all()
@@ -0,0 +1,223 @@
+"""
+Where the OpenAI response chain of each chat conversation is kept (conversation id ->
+previous_response_id), so follow-up questions continue the same conversation.
+Backends: bounded in-memory LRU, the app database (SQLite / Postgres) shared by every
+worker, or Redis. Pick one with CONVERSATION_STORE=memory|sql|redis.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+# Optional Redis client
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'sql').lower()
+# Idle conversations are forgotten after this many seconds
+CONVERSATION_TTL = int(os.getenv('CONVERSATION_TTL', '86400'))
+# Conversations kept per process by the memory backend (and the local Redis stand-in)
+CONVERSATION_STORE_MAX_ENTRIES = int(os.getenv('CONVERSATION_STORE_MAX_ENTRIES', '10000'))
+# How often the SQL backend deletes expired rows
+CONVERSATION_PURGE_INTERVAL = 600
+
+
+class _ExpiringLRU:
+    """Thread-safe dict with a per-key expiry and a size bound (least recently used keys go first)"""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._items.pop(key, None) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class MemoryConversationStore:
+    """Per-process store; conversations do not survive a restart and are not shared between workers"""
+    def __init__(self, ttl=CONVERSATION_TTL, max_entries=CONVERSATION_STORE_MAX_ENTRIES):
+        self.ttl = ttl
+        self._items = _ExpiringLRU(max_entries)
+
+    def get(self, conversation_id):
+        return self._items.get(conversation_id)
+
+    def set(self, conversation_id, response_id):
+        self._items.set(conversation_id, response_id, self.ttl)
+
+    def delete(self, conversation_id):
+        self._items.delete(conversation_id)
+
+
+class SQLConversationStore:
+    """
+    Store backed by the ConversationState table of the app database.
+    Must be used inside an app context; runs on its own connection so it never
+    commits or rolls back the caller's session.
+    """
+    def __init__(self, ttl=CONVERSATION_TTL):
+        self.ttl = ttl
+        self._last_purge = 0.0
+        self._purge_lock = threading.Lock()
+
+    def _table(self):
+        from app import db, ConversationState
+        return db.engine, ConversationState.__table__
+
+    def get(self, conversation_id):
+        engine, table = self._table()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        with engine.connect() as conn:
+            return conn.execute(
+                select(table.c.response_id)
+                .where(table.c.conversation_id == conversation_id)
+                .where(table.c.updated_at >= cutoff)
+            ).scalar()
+
+    def set(self, conversation_id, response_id):
+        engine, table = self._table()
+        values = {'conversation_id': conversation_id, 'response_id': response_id, 'updated_at': datetime.utcnow()}
+        with engine.begin() as conn:
+            if engine.dialect.name in ('postgresql', 'sqlite'):
+                if engine.dialect.name == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(table).values(**values)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=[table.c.conversation_id],
+                    set_={'response_id': stmt.excluded.response_id, 'updated_at': stmt.excluded.updated_at}
+                ))
+            else:
+                updated = conn.execute(
+                    table.update().where(table.c.conversation_id == conversation_id)
+                    .values(response_id=response_id, updated_at=values['updated_at'])
+                ).rowcount
+                if not updated:
+                    conn.execute(table.insert().values(**values))
+        self._purge_expired(engine, table)
+
+    def delete(self, conversation_id):
+        engine, table = self._table()
+        with engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.conversation_id == conversation_id))
+
+    def _purge_expired(self, engine, table):
+        """Delete idle conversations now and then, so the table stays bounded"""
+        now = time.time()
+        if now - self._last_purge < CONVERSATION_PURGE_INTERVAL or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_purge = now
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            with engine.begin() as conn:
+                purged = conn.execute(table.delete().where(table.c.updated_at < cutoff)).rowcount
+            if purged:
+                print(f" DEBUG: Purged {purged} expired conversation states")
+        finally:
+            self._purge_lock.release()
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of the Redis client API the Redis backend uses.
+    Lets CONVERSATION_STORE=redis run without a server (state is then per process).
+    """
+    def __init__(self, max_keys=CONVERSATION_STORE_MAX_ENTRIES):
+        self._items = _ExpiringLRU(max_keys)
+
+    def get(self, name):
+        return self._items.get(name)
+
+    def set(self, name, value, ex=None):
+        self._items.set(name, value, ex)
+        return True
+
+    def delete(self, *names):
+        return sum(1 for name in names if self._items.delete(name))
+
+
+class RedisConversationStore:
+    """Store backed by Redis keys with an expiry; Redis handles eviction and sharing between nodes"""
+    def __init__(self, client, ttl=CONVERSATION_TTL, prefix='conversation:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, conversation_id):
+        value = self.client.get(self.prefix + conversation_id)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, conversation_id, response_id):
+        self.client.set(self.prefix + conversation_id, response_id, ex=self.ttl)
+
+    def delete(self, conversation_id):
+        self.client.delete(self.prefix + conversation_id)
+
+
+def _redis_client():
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url and REDIS_AVAILABLE:
+        return redis.Redis.from_url(redis_url, decode_responses=True)
+    if redis_url:
+        print("WARNING: REDIS_URL is set but the redis package is not installed, using the local Redis stand-in")
+    else:
+        print("WARNING: REDIS_URL not set, using the local Redis stand-in (conversations are not shared between workers)")
+    return LocalRedis()
+
+
+def create_conversation_store(backend=None):
+    backend = (backend or CONVERSATION_STORE).lower()
+    if backend == 'memory':
+        return MemoryConversationStore()
+    if backend == 'redis':
+        return RedisConversationStore(_redis_client())
+    if backend != 'sql':
+        print(f"WARNING: Unknown CONVERSATION_STORE '{backend}', using sql")
+    return SQLConversationStore()
+
+
+_conversation_store = None
+_conversation_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    """Process-wide conversation store, created from CONVERSATION_STORE on first use"""
+    global _conversation_store
+    if _conversation_store is None:
+        with _conversation_store_lock:
+            if _conversation_store is None:
+                _conversation_store = create_conversation_store()
+    return _conversation_store
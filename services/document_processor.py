@@ -1,5 +1,6 @@
 import os
 import json
+import hashlib
 import PyPDF2
 import docx
 import requests
@@ -8,46 +9,311 @@ import csv
 from io import StringIO
 from pathlib import Path
 from openpyxl import load_workbook
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-import httpx
-import trafilatura
-from collections import deque
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
+from .web_crawler import WebCrawler
+
+
+def compute_file_hash(file_path, block_size=1024 * 1024):
+    """
+    SHA-256 of a file's contents, read in blocks so large uploads are not loaded at once
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _strip_blocks(blocks):
+    """
+    Streaming equivalent of ''.join(blocks).strip(): leading whitespace is dropped and
+    whitespace is only passed on once more text follows it
+    """
+    started = False
+    pending = ''
+    for block in blocks:
+        if not started:
+            block = block.lstrip()
+            if not block:
+                continue
+            started = True
+        stripped = block.rstrip()
+        if stripped:
+            yield pending + stripped
+            pending = block[len(stripped):]
+        else:
+            pending += block
+
+
+# Worker processes used to extract a chatbot's documents in parallel during training (0 or 1 = in-process)
+TRAINING_EXTRACT_WORKERS = int(os.getenv('TRAINING_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+
+def _get_extraction_pool():
+    """Process pool shared by all training jobs, started on first use"""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            # spawn rather than fork: the web process runs threads (training workers, DB pool)
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=TRAINING_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _extraction_pool
+
+
+def _reset_extraction_pool():
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False)
+            _extraction_pool = None
+
+
+def _extract_document_job(cache_dir, file_path):
+    """Extraction task run in a worker process (module level so it can be pickled)"""
+    start_time = time.time()
+    text_file = DocumentProcessor(cache_dir=cache_dir).extract_to_file(file_path)
+    return text_file, time.time() - start_time
+
+
+# Bump whenever extraction output changes so cached text from older extractors is not reused
+EXTRACTOR_VERSION = '1'
+
+
+class ExtractionCache:
+    """
+    Persistent cache of extracted document text keyed by file SHA-256 and extractor version.
+    Least recently used entries are evicted once the cache grows past max_bytes. Entries used
+    within the last grace_seconds are kept, since a training job may still be about to read them.
+    """
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, grace_seconds=900):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def _path(self, file_hash, file_extension):
+        extension = file_extension.lstrip('.') or 'bin'
+        return os.path.join(self.cache_dir, f'{file_hash}.{extension}.v{EXTRACTOR_VERSION}.txt')
+    
+    def lookup(self, file_hash, file_extension):
+        """Path of the cached text file, or None if this file has not been extracted yet"""
+        path = self._path(file_hash, file_extension)
+        if not os.path.exists(path):
+            return None
+        
+        # Touch the entry so eviction treats it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+    
+    def put_blocks(self, file_hash, file_extension, blocks):
+        """
+        Write extracted text to the cache block by block, so the full text is never held in memory.
+        Returns the path of the cached text file.
+        """
+        path = self._path(file_hash, file_extension)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                for block in blocks:
+                    f.write(block)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict(keep=(path,))
+        return path
+    
+    def _evict(self, keep=()):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        Never removes the paths in keep, entries used within grace_seconds, or .tmp files
+        still being written (abandoned ones older than a day are cleaned up).
+        """
+        now = time.time()
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith('.tmp'):
+                if now - stat.st_mtime > 86400:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                continue
+            total_size += stat.st_size
+            if path in keep or now - stat.st_mtime < self.grace_seconds:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        if total_size <= self.max_bytes:
+            return
+        
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+                total_size -= size
+                print(f" DEBUG: Evicted extraction cache entry {os.path.basename(path)}")
+            except OSError:
+                pass
+            if total_size <= self.max_bytes:
+                break
+
 
 class DocumentProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, cache_dir=None):
+        # Extracted text cache, disabled when no directory is given
+        self.extraction_cache = None
+        if cache_dir:
+            max_mb = int(os.getenv('EXTRACTION_CACHE_MAX_MB', '512'))
+            grace_seconds = int(os.getenv('EXTRACTION_CACHE_GRACE_SECONDS', '900'))
+            self.extraction_cache = ExtractionCache(cache_dir, max_bytes=max_mb * 1024 * 1024, grace_seconds=grace_seconds)
     
-    def process_document(self, file_path):
+    def process_document(self, file_path, file_hash=None):
         """
-        Process a document and extract text based on file type
+        Process a document and extract text based on file type.
+        Files already extracted (same SHA-256, same extractor version) are served from the cache.
         """
+        if self.extraction_cache:
+            with open(self.extract_to_file(file_path, file_hash), 'r', encoding='utf-8', newline='\n') as f:
+                return f.read()
+        
         print(f" DEBUG: Processing document: {file_path}")
         
         file_extension = Path(file_path).suffix.lower()
         print(f" DEBUG: File extension: {file_extension}")
         
+        text = ''.join(self.iter_text_blocks(file_path, file_extension))
+        
+        print(f" DEBUG: Extracted {len(text)} characters from document")
+        print(f" DEBUG: First 200 characters: {text[:200]}...")
+        
+        return text
+    
+    def extract_to_file(self, file_path, file_hash=None):
+        """
+        Extract a document into the extraction cache, streaming page by page, and return
+        the path of the cached UTF-8 text file (used to feed training without loading it whole)
+        """
+        if not self.extraction_cache:
+            raise ValueError("extract_to_file needs a DocumentProcessor created with a cache_dir")
+        
+        print(f" DEBUG: Processing document: {file_path}")
+        
+        file_extension = Path(file_path).suffix.lower()
+        print(f" DEBUG: File extension: {file_extension}")
+        
+        file_hash = file_hash or compute_file_hash(file_path)
+        cached_path = self.extraction_cache.lookup(file_hash, file_extension)
+        if cached_path:
+            print(f" DEBUG: Using cached extraction ({os.path.getsize(cached_path)} bytes) for {file_path}")
+            return cached_path
+        
+        cached_path = self.extraction_cache.put_blocks(
+            file_hash, file_extension, self.iter_text_blocks(file_path, file_extension)
+        )
+        print(f" DEBUG: Extracted {os.path.getsize(cached_path)} bytes of text from document")
+        return cached_path
+    
+    def extract_documents_to_files(self, file_paths, on_complete=None):
+        """
+        Extract several documents in parallel on the extraction process pool.
+        
+        Args:
+            file_paths (list): documents to extract
+            on_complete (callable): called as on_complete(index, result) as each document finishes
+            
+        Returns:
+            list: one dict per document, in the order of file_paths, with 'text_file' (None on
+                  failure), 'seconds' and 'error' (None on success)
+        """
+        if not self.extraction_cache:
+            raise ValueError("extract_documents_to_files needs a DocumentProcessor created with a cache_dir")
+        
+        results = [None] * len(file_paths)
+        
+        def finish(index, text_file, seconds, error):
+            results[index] = {'text_file': text_file, 'seconds': seconds, 'error': error}
+            if error:
+                print(f" ERROR: Extraction failed for {file_paths[index]} after {seconds:.1f}s: {error}")
+            else:
+                print(f" DEBUG: Extracted {file_paths[index]} in {seconds:.1f}s")
+            if on_complete:
+                on_complete(index, results[index])
+        
+        if TRAINING_EXTRACT_WORKERS <= 1 or len(file_paths) <= 1:
+            for index, file_path in enumerate(file_paths):
+                start_time = time.time()
+                try:
+                    finish(index, self.extract_to_file(file_path), time.time() - start_time, None)
+                except Exception as e:
+                    finish(index, None, time.time() - start_time, str(e))
+            return results
+        
+        start_time = time.time()
+        pool = _get_extraction_pool()
+        futures = {
+            pool.submit(_extract_document_job, self.extraction_cache.cache_dir, file_path): index
+            for index, file_path in enumerate(file_paths)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                text_file, seconds = future.result()
+                finish(index, text_file, seconds, None)
+            except BrokenProcessPool as e:
+                # A worker died (e.g. out of memory); start a fresh pool for the next job
+                _reset_extraction_pool()
+                finish(index, None, time.time() - start_time, f"Extraction worker crashed: {e}")
+            except Exception as e:
+                finish(index, None, time.time() - start_time, str(e))
+        
+        print(f" DEBUG: Extracted {len(file_paths)} documents in {time.time() - start_time:.1f}s "
+              f"({TRAINING_EXTRACT_WORKERS} worker processes)")
+        return results
+    
+    def iter_text_blocks(self, file_path, file_extension=None):
+        """
+        Yield the document text in pieces (PDF pages, DOCX paragraphs, whole text for other types).
+        Concatenated, the pieces give the stripped document text.
+        """
+        file_extension = file_extension or Path(file_path).suffix.lower()
+        
         if file_extension == '.pdf':
-            text = self._process_pdf(file_path)
+            blocks = self._iter_pdf(file_path)
         elif file_extension == '.docx':
-            text = self._process_docx(file_path)
+            blocks = self._iter_docx(file_path)
         elif file_extension == '.txt':
-            text = self._process_txt(file_path)
+            blocks = [self._process_txt(file_path)]
         elif file_extension == '.json':
-            text = self._process_json(file_path)
+            blocks = [self._process_json(file_path)]
         elif file_extension == '.xlsx':
-            text = self._process_xlsx(file_path)
+            blocks = [self._process_xlsx(file_path)]
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
         
-        print(f" DEBUG: Extracted {len(text)} characters from document")
-        print(f" DEBUG: First 200 characters: {text[:200]}...")
-        
-        return text
+        return _strip_blocks(blocks)
     
-    def _process_pdf(self, file_path):
-        """Extract text from PDF file"""
-        text = ""
+    def _iter_pdf(self, file_path):
+        """Extract text from PDF file, yielding one page at a time"""
         try:
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
@@ -56,31 +322,26 @@ class DocumentProcessor:
                 for page_num in range(len(pdf_reader.pages)):
                     page = pdf_reader.pages[page_num]
                     page_text = page.extract_text()
-                    text += page_text + "\n"
                     print(f"   Page {page_num + 1}: {len(page_text)} characters")
+                    yield page_text + "\n"
                     
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
-        
-        return text.strip()
     
-    def _process_docx(self, file_path):
-        """Extract text from DOCX file"""
-        text = ""
+    def _iter_docx(self, file_path):
+        """Extract text from DOCX file, yielding one paragraph at a time"""
         try:
             doc = docx.Document(file_path)
             print(f" DEBUG: DOCX has {len(doc.paragraphs)} paragraphs")
             
             for i, paragraph in enumerate(doc.paragraphs):
                 paragraph_text = paragraph.text
-                text += paragraph_text + "\n"
                 if i < 5:  # Show first 5 paragraphs
                     print(f"   Paragraph {i + 1}: {paragraph_text[:100]}...")
+                yield paragraph_text + "\n"
                     
         except Exception as e:
             raise Exception(f"Error processing DOCX: {str(e)}")
-        
-        return text.strip()
     
     def _process_txt(self, file_path):
         """Extract text from TXT file"""
@@ -501,9 +762,9 @@ class DocumentProcessor:
         
         Strategy:
         1. Try to parse sitemap.xml first for fastest discovery
-        2. If no sitemap, crawl from homepage (breadth-first)
-        3. Use httpx for fetching (fast, modern)
-        4. Use trafilatura for content extraction (best-in-class)
+        2. If no sitemap, crawl from homepage (breadth-first), keeping the fetched HTML
+        3. Fetch pages concurrently with httpx, rate limited per host (see WebCrawler)
+        4. Use trafilatura for content extraction (best-in-class), on a worker pool
         5. Limit to max_pages to respect OpenAI context limits
         
         Args:
@@ -514,10 +775,24 @@ class DocumentProcessor:
         Returns:
             str: Combined text from all scraped pages
         """
+        return self.rescrape_website(url, manifest_path=None, max_pages=max_pages, timeout=timeout)['text']
+    
+    def rescrape_website(self, url, manifest_path, max_pages=50, timeout=120):
+        """
+        Scrape a website like scrape_website, using a manifest from the previous scrape
+        (URL, ETag, Last-Modified, sitemap <lastmod> and text hash per page) to send
+        conditional requests and skip unchanged pages. The manifest is updated afterwards.
+        
+        Args:
+            manifest_path (str): JSON manifest file, or None to scrape from scratch without one
+            
+        Returns:
+            dict: 'text' (combined text of all pages), 'new_pages', 'changed_pages' and
+                  'removed_pages' (lists of URLs), 'unchanged_count' and 'has_changes'
+        """
         print(f" DEBUG: Starting website scraping for: {url}")
         print(f" DEBUG: Max pages: {max_pages}, Timeout: {timeout}s")
         
-        import time
         start_time = time.time()
         
         try:
@@ -530,68 +805,19 @@ class DocumentProcessor:
             
             print(f" DEBUG: Base domain: {base_domain}")
             
-            # Step 1: Try to get URLs from sitemap.xml
-            urls_to_scrape = self._get_urls_from_sitemap(base_domain, max_pages)
-            
-            # Step 2: If no sitemap or insufficient URLs, crawl the site
-            if len(urls_to_scrape) < max_pages:
-                print(f" DEBUG: Sitemap provided {len(urls_to_scrape)} URLs, crawling for more...")
-                crawled_urls = self._crawl_website(url, base_domain, max_pages - len(urls_to_scrape))
-                urls_to_scrape.extend(crawled_urls)
-            
-            # Remove duplicates and limit to max_pages
-            urls_to_scrape = list(dict.fromkeys(urls_to_scrape))[:max_pages]
+            previous_pages = self._load_scrape_manifest(manifest_path) if manifest_path else {}
+            pages = WebCrawler().crawl(url, max_pages=max_pages, timeout=timeout, previous_pages=previous_pages)
             
-            print(f" DEBUG: Will scrape {len(urls_to_scrape)} pages")
-            
-            # Step 3: Fetch and extract content from each URL
             all_content = []
-            successful_scrapes = 0
-            
-            with httpx.Client(timeout=30.0, follow_redirects=True) as client:
-                for idx, page_url in enumerate(urls_to_scrape, 1):
-                    # Check timeout
-                    if time.time() - start_time > timeout:
-                        print(f" WARNING: Timeout reached after {idx-1} pages")
-                        break
-                    
-                    try:
-                        print(f" DEBUG: [{idx}/{len(urls_to_scrape)}] Fetching: {page_url}")
-                        
-                        # Fetch the page
-                        response = client.get(
-                            page_url,
-                            headers={
-                                'User-Agent': 'Mozilla/5.0 (compatible; OwlbeeChatbotTrainer/1.0; +https://owlbee.ai)'
-                            }
-                        )
-                        
-                        if response.status_code == 200:
-                            # Extract clean text using trafilatura
-                            extracted_text = trafilatura.extract(
-                                response.text,
-                                include_comments=False,
-                                include_tables=True,
-                                no_fallback=False
-                            )
-                            
-                            if extracted_text and len(extracted_text.strip()) > 100:
-                                # Add page metadata
-                                page_content = f"\n\n=== PAGE: {page_url} ===\n\n{extracted_text}\n\n=== END OF PAGE ===\n"
-                                all_content.append(page_content)
-                                successful_scrapes += 1
-                                print(f"   ✓ Extracted {len(extracted_text)} characters")
-                            else:
-                                print(f"   ✗ No content extracted or content too short")
-                        else:
-                            print(f"   ✗ HTTP {response.status_code}")
-                        
-                        # Be polite - rate limiting
-                        time.sleep(0.5)
-                        
-                    except Exception as e:
-                        print(f"   ✗ Error fetching {page_url}: {str(e)}")
-                        continue
+            kept_pages = {}
+            for page in pages:
+                extracted_text = page['text']
+                if extracted_text and len(extracted_text.strip()) > 100:
+                    # Add page metadata
+                    page_content = f"\n\n=== PAGE: {page['url']} ===\n\n{extracted_text}\n\n=== END OF PAGE ===\n"
+                    all_content.append(page_content)
+                    kept_pages[page['url']] = page
+            successful_scrapes = len(all_content)
             
             if not all_content:
                 raise Exception("No content could be extracted from the website. The site may be blocking automated access or the content may not be accessible.")
@@ -603,7 +829,7 @@ class DocumentProcessor:
             summary = f"""=== WEBSITE SCRAPE SUMMARY ===
 Source: {url}
 Base Domain: {base_domain}
-Pages Scraped: {successful_scrapes} of {len(urls_to_scrape)} attempted
+Pages Scraped: {successful_scrapes} of {len(pages)} attempted
 Total Characters: {len(combined_text)}
 Scraped At: {time.strftime('%Y-%m-%d %H:%M:%S')}
 === END SUMMARY ===
@@ -612,204 +838,50 @@ Scraped At: {time.strftime('%Y-%m-%d %H:%M:%S')}
             
             final_text = summary + combined_text
             
+            result = {
+                'text': final_text,
+                'new_pages': [page_url for page_url in kept_pages if page_url not in previous_pages],
+                'changed_pages': [page['url'] for page in kept_pages.values() if page['state'] == 'changed'],
+                'removed_pages': [page_url for page_url in previous_pages if page_url not in kept_pages],
+                'unchanged_count': sum(1 for page in kept_pages.values() if page['state'] != 'changed' and page['url'] in previous_pages),
+            }
+            result['has_changes'] = bool(result['new_pages'] or result['changed_pages'] or result['removed_pages'])
+            
+            if manifest_path:
+                self._save_scrape_manifest(manifest_path, url, kept_pages)
+            
             elapsed_time = time.time() - start_time
             print(f" DEBUG: Scraping complete!")
-            print(f"   - Successful: {successful_scrapes}/{len(urls_to_scrape)} pages")
+            print(f"   - Successful: {successful_scrapes}/{len(pages)} pages")
+            print(f"   - New: {len(result['new_pages'])}, changed: {len(result['changed_pages'])}, "
+                  f"removed: {len(result['removed_pages'])}, unchanged: {result['unchanged_count']}")
             print(f"   - Total content: {len(final_text)} characters")
             print(f"   - Time elapsed: {elapsed_time:.1f}s")
             
-            return final_text
+            return result
             
         except Exception as e:
             print(f" ERROR: Website scraping failed: {str(e)}")
             raise Exception(f"Failed to scrape website: {str(e)}")
     
-    def _get_urls_from_sitemap(self, base_url, max_urls=50):
-        """
-        Try to extract URLs from sitemap.xml
-        Returns list of URLs found in sitemap
-        Uses multiple parsing approaches for maximum compatibility
-        """
-        urls = []
-        sitemap_urls = [
-            f"{base_url}/sitemap.xml",
-            f"{base_url}/sitemap_index.xml",
-            f"{base_url}/sitemap1.xml"
-        ]
-        
-        print(f" DEBUG: Checking for sitemap...")
-        
-        try:
-            with httpx.Client(timeout=10.0, follow_redirects=True) as client:
-                for sitemap_url in sitemap_urls:
-                    try:
-                        response = client.get(sitemap_url)
-                        if response.status_code == 200:
-                            print(f"   ✓ Found sitemap: {sitemap_url}")
-                            
-                            # Try multiple parsing approaches
-                            urls_found = self._parse_sitemap_content(response.content, max_urls)
-                            if urls_found:
-                                urls.extend(urls_found)
-                                print(f"   ✓ Extracted {len(urls_found)} URLs from sitemap")
-                                if len(urls) >= max_urls:
-                                    return urls[:max_urls]
-                    except Exception as e:
-                        print(f"   ✗ Error parsing sitemap {sitemap_url}: {str(e)}")
-                        continue
-        except Exception as e:
-            print(f"   ✗ No sitemap found: {str(e)}")
-        
-        return urls[:max_urls]
-    
-    def _parse_sitemap_content(self, content, max_urls=50):
-        """
-        Parse sitemap content using multiple approaches for maximum compatibility
-        """
-        urls = []
-        
-        # Approach 1: Try BeautifulSoup with built-in XML parser
-        try:
-            soup = BeautifulSoup(content, 'xml')
-            loc_tags = soup.find_all('loc')
-            for loc in loc_tags:
-                url = loc.text.strip()
-                if url and url.startswith('http'):
-                    urls.append(url)
-                    if len(urls) >= max_urls:
-                        break
-            if urls:
-                return urls
-        except Exception as e:
-            print(f"   ✗ BeautifulSoup XML parsing failed: {str(e)}")
-        
-        # Approach 2: Try BeautifulSoup with HTML parser (fallback)
-        try:
-            soup = BeautifulSoup(content, 'html.parser')
-            loc_tags = soup.find_all('loc')
-            for loc in loc_tags:
-                url = loc.text.strip()
-                if url and url.startswith('http'):
-                    urls.append(url)
-                    if len(urls) >= max_urls:
-                        break
-            if urls:
-                return urls
-        except Exception as e:
-            print(f"   ✗ BeautifulSoup HTML parsing failed: {str(e)}")
-        
-        # Approach 3: Simple regex extraction (most compatible)
-        try:
-            import re
-            # Look for URLs in <loc> tags using regex
-            url_pattern = r'<loc>(https?://[^<]+)</loc>'
-            matches = re.findall(url_pattern, content.decode('utf-8', errors='ignore'))
-            for url in matches:
-                url = url.strip()
-                if url and url.startswith('http'):
-                    urls.append(url)
-                    if len(urls) >= max_urls:
-                        break
-            if urls:
-                return urls
-        except Exception as e:
-            print(f"   ✗ Regex parsing failed: {str(e)}")
-        
-        return []
-    
-    def _crawl_website(self, start_url, base_domain, max_urls=50):
-        """
-        Crawl website starting from start_url using breadth-first search.
-        Only follows internal links within the same domain.
-        
-        Returns list of URLs discovered
-        """
-        print(f" DEBUG: Crawling website from: {start_url}")
-        
-        visited = set()
-        to_visit = deque([start_url])
-        discovered_urls = []
-        
+    def _load_scrape_manifest(self, manifest_path):
+        """Pages recorded by the previous scrape, keyed by URL"""
         try:
-            with httpx.Client(timeout=10.0, follow_redirects=True) as client:
-                while to_visit and len(discovered_urls) < max_urls:
-                    current_url = to_visit.popleft()
-                    
-                    # Skip if already visited
-                    if current_url in visited:
-                        continue
-                    
-                    visited.add(current_url)
-                    
-                    try:
-                        print(f"   Crawling: {current_url}")
-                        response = client.get(
-                            current_url,
-                            headers={
-                                'User-Agent': 'Mozilla/5.0 (compatible; OwlbeeChatbotTrainer/1.0; +https://owlbee.ai)'
-                            }
-                        )
-                        
-                        if response.status_code == 200 and 'text/html' in response.headers.get('content-type', ''):
-                            discovered_urls.append(current_url)
-                            
-                            # Parse HTML to find more links
-                            soup = BeautifulSoup(response.text, 'html.parser')
-                            
-                            # Find all links
-                            for link in soup.find_all('a', href=True):
-                                href = link['href']
-                                
-                                # Convert relative URLs to absolute
-                                absolute_url = urljoin(current_url, href)
-                                
-                                # Only add if it's from the same domain and not visited
-                                parsed = urlparse(absolute_url)
-                                if (parsed.netloc == urlparse(base_domain).netloc and
-                                    absolute_url not in visited and
-                                    absolute_url not in to_visit and
-                                    not self._should_skip_url(absolute_url)):
-                                    to_visit.append(absolute_url)
-                        
-                        # Be polite
-                        time.sleep(0.3)
-                        
-                    except Exception as e:
-                        print(f"   ✗ Error crawling {current_url}: {str(e)}")
-                        continue
-        except Exception as e:
-            print(f" ERROR: Crawling failed: {str(e)}")
-        
-        print(f"   ✓ Discovered {len(discovered_urls)} URLs via crawling")
-        return discovered_urls
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('pages', {})
+        except (OSError, ValueError):
+            return {}
     
-    def _should_skip_url(self, url):
-        """
-        Check if URL should be skipped (e.g., files, common non-content pages)
-        """
-        skip_extensions = [
-            '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.tar', '.gz',
-            '.mp4', '.mp3', '.avi', '.mov', '.doc', '.docx', '.xls', '.xlsx',
-            '.css', '.js', '.xml', '.json', '.ico', '.svg', '.woff', '.ttf'
-        ]
-        
-        skip_patterns = [
-            '/feed/', '/rss/', '/atom/', '/wp-json/', '/api/',
-            '/login', '/logout', '/signin', '/signup', '/register',
-            '/cart', '/checkout', '/account', '/admin',
-            '#', 'javascript:', 'mailto:', 'tel:'
-        ]
-        
-        url_lower = url.lower()
-        
-        # Skip if has file extension we want to avoid
-        for ext in skip_extensions:
-            if url_lower.endswith(ext):
-                return True
-        
-        # Skip if matches patterns
-        for pattern in skip_patterns:
-            if pattern in url_lower:
-                return True
-        
-        return False 
\ No newline at end of file
+    def _save_scrape_manifest(self, manifest_path, url, pages):
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        manifest = {
+            'source': url,
+            'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'pages': {
+                page_url: {key: page[key] for key in ('etag', 'last_modified', 'lastmod', 'text_hash', 'text', 'links')}
+                for page_url, page in pages.items()
+            }
+        }
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(manifest_path + '.tmp', manifest_path)
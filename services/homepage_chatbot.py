@@ -0,0 +1,97 @@
+"""
+Platform assistant shown on the public and dashboard pages (homepage_chatbot_* settings)
+The chatbot is resolved once per process and kept as a plain snapshot. Changing the settings
+picks a new one on every worker; invalidate() is for edits to the chatbot itself.
+"""
+import uuid
+import threading
+
+from .settings_cache import settings_cache
+
+# Shown when no homepage chatbot is configured (or the configured one was deleted)
+DEMO_EMBED_CODE = 'a80eb9ae-21cb-4b87-bfa4-2b3a0ec6cafb'
+DEFAULT_TITLE = 'Platform Assistant'
+DEFAULT_PLACEHOLDER = 'Ask me anything about the platform...'
+
+GENERATION_KEY = 'homepage_chatbot_generation'
+
+
+class ChatbotSnapshot:
+    """Read-only copy of a Chatbot row's columns"""
+    def __init__(self, chatbot):
+        for column in chatbot.__table__.columns:
+            setattr(self, column.key, getattr(chatbot, column.key))
+
+    def __repr__(self):
+        return f'<ChatbotSnapshot {self.name}>'
+
+
+class HomepageChatbotCache:
+    def __init__(self):
+        self._entry = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_context(self):
+        """Template variables for the platform assistant: homepage_chatbot, its title and placeholder"""
+        chatbot_id = settings_cache.get('homepage_chatbot_id')
+        key = (chatbot_id, settings_cache.get(GENERATION_KEY))
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry['key'] == key:
+                self.hits += 1
+                chatbot = entry['chatbot']
+            else:
+                self.misses += 1
+                entry = None
+
+        if entry is None:
+            try:
+                chatbot = self._load(chatbot_id)
+            except Exception as e:
+                print(f" DEBUG: Could not load homepage chatbot: {e}")
+                chatbot = None
+            else:
+                with self._lock:
+                    self._entry = {'key': key, 'chatbot': chatbot}
+
+        return {
+            'homepage_chatbot': chatbot,
+            'homepage_chatbot_title': settings_cache.get('homepage_chatbot_title', DEFAULT_TITLE),
+            'homepage_chatbot_placeholder': settings_cache.get('homepage_chatbot_placeholder', DEFAULT_PLACEHOLDER)
+        }
+
+    def _load(self, chatbot_id):
+        from app import Chatbot
+        chatbot = None
+        if chatbot_id:
+            chatbot = Chatbot.query.get(chatbot_id)
+        # Fall back to the demo chatbot if no specific one is configured
+        if not chatbot:
+            chatbot = Chatbot.query.filter_by(embed_code=DEMO_EMBED_CODE).first()
+        return ChatbotSnapshot(chatbot) if chatbot else None
+
+    def invalidate(self, chatbot_id=None):
+        """
+        Reload the assistant on every worker after a chatbot was edited or deleted.
+        With chatbot_id, nothing happens unless that chatbot is the one being shown.
+        Commits: call it after the change itself has been committed.
+        """
+        with self._lock:
+            entry = self._entry
+            if chatbot_id is not None and entry is not None and \
+                    (entry['chatbot'] is None or entry['chatbot'].id != chatbot_id):
+                return
+            self._entry = None
+
+        from app import set_setting
+        set_setting(GENERATION_KEY, uuid.uuid4().hex)
+
+    def stats(self):
+        with self._lock:
+            return {'cached': self._entry is not None, 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared by every request in the process
+homepage_chatbot_cache = HomepageChatbotCache()
@@ -0,0 +1,125 @@
+"""
+Stored AI keyword extraction for the analytics page (ChatbotKeywords table)
+Keywords are computed by a background thread and served from the table with their
+computed_at time; an entry is refreshed once it is KEYWORD_REFRESH_INTERVAL seconds old
+or KEYWORD_REFRESH_CONVERSATIONS new conversations came in since it was computed.
+"""
+import os
+import json
+import queue
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+KEYWORD_REFRESH_INTERVAL = int(os.getenv('KEYWORD_REFRESH_INTERVAL', '21600'))
+KEYWORD_REFRESH_CONVERSATIONS = int(os.getenv('KEYWORD_REFRESH_CONVERSATIONS', '50'))
+# Conversations the keywords are extracted from (same window as the analytics page)
+KEYWORD_WINDOW_DAYS = 30
+
+
+class KeywordCache:
+    def __init__(self, app=None, refresh_interval=KEYWORD_REFRESH_INTERVAL, refresh_after=KEYWORD_REFRESH_CONVERSATIONS):
+        """
+        Args:
+            app: Flask app, used to give the worker thread an application context
+            refresh_interval: seconds after which stored keywords are recomputed
+            refresh_after: new conversations after which stored keywords are recomputed
+        """
+        self.app = app
+        self.refresh_interval = refresh_interval
+        self.refresh_after = refresh_after
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def get(self, chatbot_id):
+        """
+        Stored keywords of a chatbot, or None while none have been computed.
+        Schedules a background refresh when the entry is missing or stale.
+        """
+        from app import Conversation, ChatbotKeywords
+
+        entry = ChatbotKeywords.query.get(chatbot_id)
+        if entry is None:
+            self.schedule(chatbot_id)
+            return None
+
+        age = datetime.utcnow() - entry.computed_at
+        if age > timedelta(seconds=self.refresh_interval):
+            self.schedule(chatbot_id)
+        else:
+            new_conversations = Conversation.query.filter(
+                Conversation.chatbot_id == chatbot_id,
+                Conversation.timestamp > entry.computed_at
+            ).limit(self.refresh_after).count()
+            if new_conversations >= self.refresh_after:
+                self.schedule(chatbot_id)
+
+        try:
+            return json.loads(entry.keywords)
+        except (TypeError, ValueError):
+            return None
+
+    def schedule(self, chatbot_id):
+        """Queue a keyword refresh (at most one pending per chatbot)"""
+        if self.app is None:
+            return
+        with self._lock:
+            if chatbot_id in self._pending:
+                return
+            self._pending.add(chatbot_id)
+        self._ensure_thread()
+        self._queue.put(chatbot_id)
+
+    def _ensure_thread(self):
+        """Start the worker thread on first use (daemon thread never blocks shutdown)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker_loop, name='keyword-worker', daemon=True)
+                self._thread.start()
+
+    def _worker_loop(self):
+        while True:
+            chatbot_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self.refresh(chatbot_id)
+            except Exception as e:
+                print(f"[ERROR] Keyword extraction failed for chatbot {chatbot_id}: {e}")
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._pending.discard(chatbot_id)
+                self._queue.task_done()
+
+    def refresh(self, chatbot_id):
+        """Extract and store a chatbot's keywords now (needs an app context)"""
+        from app import db, Chatbot, ChatbotKeywords
+        from .analytics_service import AnalyticsService
+
+        if Chatbot.query.get(chatbot_id) is None:
+            return None
+
+        computed_at = datetime.utcnow()
+        analytics_service = AnalyticsService()
+        since = datetime.combine((computed_at - timedelta(days=KEYWORD_WINDOW_DAYS)).date(), datetime.min.time())
+        messages = analytics_service._recent_user_messages(chatbot_id, since)
+        keywords = analytics_service._extract_keywords_ai(messages)
+
+        entry = ChatbotKeywords.query.get(chatbot_id)
+        if entry is None:
+            entry = ChatbotKeywords(chatbot_id=chatbot_id)
+            db.session.add(entry)
+        entry.keywords = json.dumps(keywords)
+        entry.computed_at = computed_at
+        db.session.commit()
+        print(f" DEBUG: Stored {len(keywords)} keywords for chatbot {chatbot_id}")
+        return keywords
+
+
+# Shared by the app and the analytics service (init_app is called in create_app)
+keyword_cache = KeywordCache()
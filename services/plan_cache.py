@@ -0,0 +1,76 @@
+"""
+Per-user cache of resolved plans (see get_user_plan in app.py)
+Plans are cached as plain snapshots, so they can outlive the request that loaded them.
+invalidate() drops local entries and changes a shared token in the settings table,
+which makes every other worker drop theirs on its next settings check.
+"""
+import os
+import uuid
+import threading
+from collections import OrderedDict
+
+from .settings_cache import settings_cache
+
+PLAN_CACHE_SIZE = int(os.getenv('PLAN_CACHE_SIZE', '1024'))
+
+GENERATION_KEY = 'plan_cache_generation'
+
+
+class PlanSnapshot:
+    """Read-only copy of a Plan row's columns"""
+    def __init__(self, plan):
+        for column in plan.__table__.columns:
+            setattr(self, column.key, getattr(plan, column.key))
+
+    def __repr__(self):
+        return f'<PlanSnapshot {self.name}>'
+
+
+class PlanCache:
+    def __init__(self, max_entries=PLAN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, is_admin):
+        generation = settings_cache.get(GENERATION_KEY)
+        key = (user_id, bool(is_admin))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['generation'] != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['plan']
+
+    def put(self, user_id, is_admin, plan):
+        """Cache a resolved plan for a user and return its snapshot"""
+        snapshot = PlanSnapshot(plan)
+        entry = {'plan': snapshot, 'generation': settings_cache.get(GENERATION_KEY)}
+        with self._lock:
+            self._entries[(user_id, bool(is_admin))] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self):
+        """
+        Forget every cached plan after a subscription or plan change (these are rare).
+        Commits: call it after the change itself has been committed.
+        """
+        with self._lock:
+            self._entries.clear()
+
+        from app import set_setting
+        set_setting(GENERATION_KEY, uuid.uuid4().hex)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared by every request in the process
+plan_cache = PlanCache()
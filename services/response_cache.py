@@ -0,0 +1,161 @@
+"""
+Per-chatbot cache of chat answers for repeated questions.
+Questions match on their normalised text, or by embedding similarity for near-duplicates
+when the shared embedding model is available. Each chatbot's entries are tied to a
+fingerprint of its training data and prompts, so a retrain or prompt change drops them.
+"""
+import os
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Defaults for chatbots that do not set their own TTL / size (see the Chatbot model)
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '86400'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '200'))
+# Chatbots kept in memory per process (least recently used chatbots are dropped first)
+RESPONSE_CACHE_MAX_CHATBOTS = int(os.getenv('RESPONSE_CACHE_MAX_CHATBOTS', '256'))
+# Cosine similarity for near-duplicate questions (0 = exact normalised match only)
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.95'))
+
+
+def normalize_question(text):
+    """
+    Canonical form of a question: case, punctuation and spacing do not matter
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def _embed_question(question):
+    """Unit-length embedding of a normalised question, or None without the embedding model"""
+    from .chatbot_trainer import get_embedding_model
+    model = get_embedding_model()
+    if model is None:
+        return None
+    try:
+        return model.encode([question], normalize_embeddings=True)[0]
+    except Exception as e:
+        print(f" DEBUG: Could not embed question for response cache: {e}")
+        return None
+
+
+class ResponseCache:
+    """
+    Bounded per-chatbot LRU of answers with a TTL.
+    A lookup goes through a probe (see probe()) so the question is normalised and
+    embedded at most once per request, whether it ends in a hit or a put.
+    """
+    def __init__(self, max_chatbots=RESPONSE_CACHE_MAX_CHATBOTS, similarity_threshold=RESPONSE_CACHE_SIMILARITY):
+        self.max_chatbots = max_chatbots
+        self.similarity_threshold = similarity_threshold
+        self._chatbots = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def probe(self, question):
+        return {'question': normalize_question(question), 'embedding': None}
+
+    def _embedding(self, probe):
+        if self.similarity_threshold <= 0:
+            return None
+        if probe['embedding'] is None:
+            probe['embedding'] = _embed_question(probe['question'])
+        return probe['embedding']
+
+    def _bucket(self, chatbot_id, fingerprint):
+        """Entries of a chatbot, emptied when its fingerprint changed (call with the lock held)"""
+        key = str(chatbot_id)
+        bucket = self._chatbots.get(key)
+        if bucket is None or bucket['fingerprint'] != fingerprint:
+            if bucket is not None:
+                print(f" DEBUG: Response cache for chatbot {chatbot_id} is stale, dropping {len(bucket['entries'])} answers")
+            bucket = {'fingerprint': fingerprint, 'entries': OrderedDict()}
+            self._chatbots[key] = bucket
+        self._chatbots.move_to_end(key)
+        while len(self._chatbots) > self.max_chatbots:
+            self._chatbots.popitem(last=False)
+        return bucket
+
+    def get(self, chatbot_id, probe, fingerprint, ttl=RESPONSE_CACHE_TTL):
+        """
+        Return the cached entry ({'answer', 'created_at', ...}) for a question, or None
+        """
+        if not probe['question']:
+            return None
+        now = time.time()
+
+        with self._lock:
+            entries = self._bucket(chatbot_id, fingerprint)['entries']
+            for question in [q for q, entry in entries.items() if now - entry['created_at'] > ttl]:
+                del entries[question]
+
+            entry = entries.get(probe['question'])
+            if entry is not None:
+                entries.move_to_end(probe['question'])
+                self.hits += 1
+                return entry
+            has_embeddings = any(entry['embedding'] is not None for entry in entries.values())
+
+        # Near-duplicate lookup; the model runs outside the lock
+        embedding = self._embedding(probe) if has_embeddings else None
+        if embedding is not None:
+            with self._lock:
+                entries = self._bucket(chatbot_id, fingerprint)['entries']
+                best_question, best_score = None, self.similarity_threshold
+                for question, entry in entries.items():
+                    if entry['embedding'] is None:
+                        continue
+                    score = float(entry['embedding'] @ embedding)
+                    if score >= best_score:
+                        best_question, best_score = question, score
+                if best_question is not None:
+                    entries.move_to_end(best_question)
+                    self.similar_hits += 1
+                    print(f" DEBUG: Response cache near-duplicate ({best_score:.3f}): '{best_question}'")
+                    return entries[best_question]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, chatbot_id, probe, fingerprint, answer, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        if not probe['question'] or not answer or max_entries <= 0:
+            return
+        entry = {
+            'answer': answer,
+            'created_at': time.time(),
+            'embedding': self._embedding(probe)
+        }
+        with self._lock:
+            entries = self._bucket(chatbot_id, fingerprint)['entries']
+            entries[probe['question']] = entry
+            entries.move_to_end(probe['question'])
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, chatbot_id=None):
+        """Drop the answers of one chatbot, or of every chatbot"""
+        with self._lock:
+            if chatbot_id is None:
+                self._chatbots.clear()
+            else:
+                self._chatbots.pop(str(chatbot_id), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'chatbots': len(self._chatbots),
+                'entries': sum(len(bucket['entries']) for bucket in self._chatbots.values()),
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses
+            }
+
+
+# Shared by every chat service in the process
+response_cache = ResponseCache()
@@ -0,0 +1,399 @@
+"""
+Search indexes for chatbot training data
+Built once per loaded training file and cached alongside it, so chat queries
+only look at entries that can actually match instead of scanning everything
+"""
+import heapq
+import math
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+# Optional imports for vector search
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSW_AVAILABLE = False
+
+# Number of sentences above which an approximate (HNSW) index is used instead of the exact scan
+VECTOR_INDEX_THRESHOLD = int(os.getenv('VECTOR_INDEX_THRESHOLD', '20000'))
+
+
+class SubstringIndex:
+    """
+    Answers the two substring questions the knowledge base scoring asks:
+    which stored strings contain a needle, and which are contained in a text.
+    """
+    SEPARATOR = '\x00'
+
+    def __init__(self, items):
+        """
+        Args:
+            items: iterable of (string, payload) pairs
+        """
+        self.strings = []
+        self.payloads = []
+        self.by_string = {}
+        for string, payload in items:
+            self.strings.append(string)
+            self.payloads.append(payload)
+            self.by_string.setdefault(string, []).append(payload)
+
+        # All strings joined into one haystack so a needle is found with a single C-level scan
+        self.starts = []
+        offset = 0
+        for string in self.strings:
+            self.starts.append(offset)
+            offset += len(string) + 1
+        self.haystack = self.SEPARATOR.join(self.strings)
+        self.lengths = sorted(set(len(string) for string in self.strings))
+
+    def containing(self, needle):
+        """
+        Payloads whose string contains needle (needle in string)
+        """
+        if not needle:
+            return list(self.payloads)
+
+        if self.SEPARATOR in needle:
+            return [payload for string, payload in zip(self.strings, self.payloads) if needle in string]
+
+        results = []
+        position = self.haystack.find(needle)
+        while position != -1:
+            item = bisect_right(self.starts, position) - 1
+            results.append(self.payloads[item])
+            # Skip the rest of this string, one hit per string is enough
+            position = self.haystack.find(needle, self.starts[item] + len(self.strings[item]) + 1)
+        return results
+
+    def contained_in(self, text):
+        """
+        Payloads whose string is contained in text (string in text)
+        """
+        results = []
+        seen = set()
+        for length in self.lengths:
+            if length > len(text):
+                break
+            for start in range(len(text) - length + 1):
+                fragment = text[start:start + length]
+                if fragment in seen:
+                    continue
+                seen.add(fragment)
+                results.extend(self.by_string.get(fragment, ()))
+        return results
+
+
+class KnowledgeBaseIndex:
+    """
+    Inverted index over a knowledge base's QA pattern triggers and KB fact titles/keywords.
+    Candidate generation is exact for the scoring in ChatbotTrainer.query_knowledge_base:
+    every entry that could score is a candidate, so results match a full scan.
+    """
+    def __init__(self, training_data):
+        # QA patterns: per pattern, the lowercased triggers and their word sets in original order
+        self.patterns = training_data.get('qa_patterns', [])
+        self.triggers = []
+        trigger_items = []
+        self.trigger_tokens = {}
+        for pattern_idx, pattern in enumerate(self.patterns):
+            pattern_triggers = []
+            for trigger_idx, trigger in enumerate(pattern.get('triggers', [])):
+                trigger_lower = trigger.lower()
+                trigger_words = set(trigger_lower.split())
+                pattern_triggers.append((trigger, trigger_lower, trigger_words))
+                trigger_items.append((trigger_lower, (pattern_idx, trigger_idx)))
+                for word in trigger_words:
+                    self.trigger_tokens.setdefault(word, []).append((pattern_idx, trigger_idx))
+            self.triggers.append(pattern_triggers)
+        self.trigger_substrings = SubstringIndex(trigger_items)
+
+        # KB facts: lowercased title, title words and keywords
+        self.facts = training_data.get('kb_facts', [])
+        self.fact_fields = []
+        title_items = []
+        keyword_items = []
+        self.title_tokens = {}
+        for fact_idx, fact in enumerate(self.facts):
+            title_lower = fact.get('title', '').lower()
+            title_words = set(title_lower.split())
+            keywords_lower = [keyword.lower() for keyword in fact.get('keywords', [])]
+            self.fact_fields.append((title_lower, title_words, keywords_lower))
+            title_items.append((title_lower, fact_idx))
+            for word in title_words:
+                self.title_tokens.setdefault(word, set()).add(fact_idx)
+            for keyword_lower in keywords_lower:
+                keyword_items.append((keyword_lower, fact_idx))
+        self.title_substrings = SubstringIndex(title_items)
+        self.keyword_substrings = SubstringIndex(keyword_items)
+
+    def pattern_candidates(self, query_lower, query_words):
+        """
+        Map of pattern index -> index of the first trigger that matches the query.
+        A trigger matches when it shares a word with the query or one is a substring of the other.
+        """
+        candidates = {}
+
+        def add(pattern_idx, trigger_idx):
+            if trigger_idx < candidates.get(pattern_idx, trigger_idx + 1):
+                candidates[pattern_idx] = trigger_idx
+
+        for word in query_words:
+            for pattern_idx, trigger_idx in self.trigger_tokens.get(word, ()):
+                add(pattern_idx, trigger_idx)
+        for pattern_idx, trigger_idx in self.trigger_substrings.containing(query_lower):
+            add(pattern_idx, trigger_idx)
+        for pattern_idx, trigger_idx in self.trigger_substrings.contained_in(query_lower):
+            add(pattern_idx, trigger_idx)
+
+        return candidates
+
+    def fact_candidates(self, query_lower, query_words):
+        """
+        Sorted indexes of facts whose title or keywords can contribute to the score
+        """
+        candidates = set()
+        for word in query_words:
+            candidates.update(self.title_tokens.get(word, ()))
+            candidates.update(self.keyword_substrings.containing(word))
+        candidates.update(self.title_substrings.containing(query_lower))
+        candidates.update(self.title_substrings.contained_in(query_lower))
+        candidates.update(self.keyword_substrings.contained_in(query_lower))
+        return sorted(candidates)
+
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
+    'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'can', 'what', 'when', 'where',
+    'who', 'how', 'why', 'which', 'this', 'that', 'these', 'those',
+    'i', 'you', 'it', 'we', 'they', 'my', 'your', 'its', 'our', 'their', 'me', 'us'
+}
+
+
+def stem_token(token):
+    """
+    Very light suffix stripping so plural and simple verb forms share a term
+    (platform/platforms, price/prices/pricing, policy/policies, integrate/integration)
+    """
+    if len(token) <= 3:
+        return token
+    if token.endswith('ies') and len(token) > 4:
+        token = token[:-3] + 'y'
+    elif token.endswith('sses'):
+        token = token[:-2]
+    elif token.endswith(('ches', 'shes', 'xes', 'zes')):
+        token = token[:-2]
+    elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        token = token[:-1]
+    elif token.endswith('ing') and len(token) > 5:
+        token = token[:-3]
+    elif token.endswith('ed') and len(token) > 4:
+        token = token[:-2]
+    elif token.endswith('tion') and len(token) > 6:
+        token = token[:-3]
+    
+    if token.endswith('e') and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [stem_token(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over training sentences, used when embeddings are not available.
+    Query terms also match longer vocabulary terms that start with them (at reduced weight),
+    e.g. "config" finds "configuration".
+    """
+    K1 = 1.5
+    B = 0.75
+    PREFIX_WEIGHT = 0.5
+    MIN_PREFIX_LENGTH = 4
+
+    def __init__(self, sentences):
+        self.sentences = sentences
+        self.sentences_lower = [sentence.lower() for sentence in sentences]
+        self.doc_lengths = []
+        self.postings = {}
+        for doc_idx, sentence_lower in enumerate(self.sentences_lower):
+            terms = tokenize(sentence_lower)
+            self.doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings.setdefault(term, []).append((doc_idx, frequency))
+
+        self.doc_count = len(sentences)
+        self.avg_doc_length = (sum(self.doc_lengths) / self.doc_count) if self.doc_count else 0.0
+        self.vocabulary = sorted(self.postings)
+
+    def idf(self, term):
+        document_frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (self.doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _prefix_terms(self, term):
+        """
+        Vocabulary terms that extend term (term itself excluded)
+        """
+        if len(term) < self.MIN_PREFIX_LENGTH:
+            return []
+        matches = []
+        position = bisect_left(self.vocabulary, term)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(term):
+            if self.vocabulary[position] != term:
+                matches.append(self.vocabulary[position])
+            position += 1
+        return matches
+
+    def search(self, query, top_k=3):
+        """
+        Return up to top_k {'content', 'similarity', 'index'} results.
+        Similarity is the BM25 score normalised by the score of a document containing every
+        query term once at average length, capped at 1 like the embedding similarity it stands in for.
+        """
+        query_lower = query.lower()
+        query_terms = set(tokenize(query_lower))
+        if not query_terms or not self.doc_count:
+            return []
+
+        scores = {}
+        max_score = 0.0
+        for term in query_terms:
+            term_idf = self.idf(term)
+            max_score += term_idf
+
+            weighted_terms = [(term, 1.0)] + [(prefix_term, self.PREFIX_WEIGHT) for prefix_term in self._prefix_terms(term)]
+            for matched_term, weight in weighted_terms:
+                # Prefix matches use the query term's idf so rare extensions don't outweigh exact hits
+                for doc_idx, frequency in self.postings.get(matched_term, ()):
+                    length_norm = 1 - self.B + self.B * self.doc_lengths[doc_idx] / self.avg_doc_length
+                    term_score = term_idf * frequency * (self.K1 + 1) / (frequency + self.K1 * length_norm)
+                    scores[doc_idx] = scores.get(doc_idx, 0.0) + weight * term_score
+
+        if not scores or max_score <= 0:
+            return []
+
+        results = []
+        for doc_idx, score in scores.items():
+            similarity = score / max_score
+            # Boost exact phrase matches
+            if query_lower in self.sentences_lower[doc_idx]:
+                similarity *= 1.5
+            results.append((min(similarity, 1.0), doc_idx))
+
+        top = heapq.nsmallest(top_k, results, key=lambda item: (-item[0], item[1]))
+        return [{
+            'content': self.sentences[doc_idx],
+            'similarity': similarity,
+            'index': doc_idx
+        } for similarity, doc_idx in top]
+
+
+def normalize_rows(matrix):
+    """
+    Scale each row to unit length so a dot product equals cosine similarity
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def use_hnsw(count):
+    return HNSW_AVAILABLE and count >= VECTOR_INDEX_THRESHOLD
+
+
+def _save_hnsw(index, path):
+    tmp_path = path + '.tmp'
+    index.save_index(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def build_hnsw_index(path, matrix):
+    """
+    Build an HNSW index over normalized rows and persist it next to the training data
+    """
+    index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+    index.init_index(max_elements=matrix.shape[0], ef_construction=200, M=16)
+    index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(matrix.shape[0]))
+    _save_hnsw(index, path)
+    print(f" DEBUG: Built HNSW index with {matrix.shape[0]} vectors at {path}")
+    return index
+
+
+def extend_hnsw_index(path, matrix, start):
+    """
+    Add rows start.. of matrix to an existing persisted HNSW index.
+    Used on retrain when the new sentences only extend the previous ones.
+    """
+    index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+    index.load_index(path, max_elements=matrix.shape[0])
+    if index.get_current_count() != start:
+        return build_hnsw_index(path, matrix)
+    if start < matrix.shape[0]:
+        index.add_items(np.asarray(matrix[start:], dtype=np.float32), np.arange(start, matrix.shape[0]))
+    _save_hnsw(index, path)
+    print(f" DEBUG: Extended HNSW index from {start} to {matrix.shape[0]} vectors at {path}")
+    return index
+
+
+class VectorIndex:
+    """
+    Nearest-neighbour search over sentence embeddings.
+    Exact by default: one matrix-vector product on pre-normalized rows plus argpartition.
+    Past VECTOR_INDEX_THRESHOLD rows, and when hnswlib is installed, an HNSW index persisted
+    at hnsw_path is used instead.
+    """
+    def __init__(self, embeddings, normalized=False, hnsw_path=None):
+        self.matrix = embeddings if normalized else normalize_rows(embeddings)
+        self.count = self.matrix.shape[0]
+        self.hnsw = None
+
+        if hnsw_path and use_hnsw(self.count):
+            try:
+                if os.path.exists(hnsw_path):
+                    self.hnsw = hnswlib.Index(space='ip', dim=self.matrix.shape[1])
+                    self.hnsw.load_index(hnsw_path, max_elements=self.count)
+                    if self.hnsw.get_current_count() != self.count:
+                        self.hnsw = build_hnsw_index(hnsw_path, self.matrix)
+                else:
+                    self.hnsw = build_hnsw_index(hnsw_path, self.matrix)
+            except Exception as e:
+                print(f" DEBUG: HNSW index unavailable, using exact search: {e}")
+                self.hnsw = None
+
+    def search(self, query_embedding, top_k=3):
+        """
+        Return [(row index, cosine similarity)] for the top_k rows, best first
+        """
+        if self.count == 0:
+            return []
+        top_k = min(top_k, self.count)
+        query = normalize_rows(np.asarray(query_embedding).reshape(1, -1))[0]
+
+        if self.hnsw is not None:
+            self.hnsw.set_ef(max(50, top_k * 4))
+            labels, distances = self.hnsw.knn_query(query, k=top_k)
+            # 'ip' distance is 1 - dot product
+            return [(int(label), float(1.0 - distance)) for label, distance in zip(labels[0], distances[0])]
+
+        similarities = self.matrix @ query
+        if top_k < self.count:
+            candidates = np.argpartition(-similarities, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(self.count)
+        ordered = candidates[np.argsort(-similarities[candidates], kind='stable')]
+        return [(int(idx), float(similarities[idx])) for idx in ordered]
@@ -0,0 +1,124 @@
+"""
+Process-wide cache of the Settings table
+The whole table is loaded in one query and kept until another worker changes a setting:
+set_setting stores a new generation token in the table, and each process compares its
+token at most every SETTINGS_CHECK_INTERVAL seconds. Within a request one snapshot is used.
+"""
+import os
+import time
+import uuid
+import threading
+
+# Seconds between checks of the shared generation token (0 = check on every request)
+SETTINGS_CHECK_INTERVAL = float(os.getenv('SETTINGS_CHECK_INTERVAL', '5'))
+
+GENERATION_KEY = '_settings_generation'
+
+
+class SettingsCache:
+    def __init__(self, check_interval=SETTINGS_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._values = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, key, default=None, type=None):
+        """
+        Value of a setting, or default when it is missing.
+        With type (e.g. int, float), the value is converted and default returned if that fails.
+        """
+        value = self._snapshot().get(key)
+        if value is None:
+            return default
+        if type is not None:
+            try:
+                return type(value)
+            except (TypeError, ValueError):
+                return default
+        return value
+
+    def all(self):
+        return dict(self._snapshot())
+
+    def _snapshot(self):
+        """Settings for the current request, refreshed from the database when stale"""
+        try:
+            from flask import g, has_request_context
+            in_request = has_request_context()
+        except ImportError:
+            in_request = False
+        if in_request and '_settings_snapshot' in g:
+            return g._settings_snapshot
+
+        values = self._current_values()
+        if in_request:
+            g._settings_snapshot = values
+        return values
+
+    def _current_values(self):
+        """
+        Cached settings, reloaded when the generation token changed. The lock only guards
+        reading and swapping the cached state; the queries run without it, so one slow
+        database round trip never blocks the other threads of the process.
+        """
+        now = time.monotonic()
+        with self._lock:
+            values, generation, epoch = self._values, self._generation, self._epoch
+            if values is not None and now - self._checked_at < self.check_interval:
+                return values
+
+        from app import db, Settings
+        try:
+            if values is not None:
+                current = db.session.query(Settings.value).filter_by(key=GENERATION_KEY).scalar()
+                if current == generation:
+                    with self._lock:
+                        if self._epoch == epoch and self._generation == generation:
+                            self._checked_at = max(self._checked_at, now)
+                    return values
+
+            rows = db.session.query(Settings.key, Settings.value).all()
+        except Exception as e:
+            print(f" DEBUG: Could not load settings: {e}")
+            return values if values is not None else {}
+
+        values = {key: value for key, value in rows if key != GENERATION_KEY}
+        generation = next((value for key, value in rows if key == GENERATION_KEY), None)
+        with self._lock:
+            # Skip the swap if invalidate_local ran meanwhile: these rows may predate that change
+            if self._epoch == epoch:
+                self._values = values
+                self._generation = generation
+                self._checked_at = now
+            self.loads += 1
+        return values
+
+    def bump_generation(self):
+        """
+        Mark settings as changed for every process. Adds the new token to the session; the
+        caller commits it together with the setting it changed, then calls invalidate_local().
+        """
+        from app import db, Settings
+        token = uuid.uuid4().hex
+        updated = Settings.query.filter_by(key=GENERATION_KEY).update({'value': token}, synchronize_session=False)
+        if not updated:
+            db.session.add(Settings(key=GENERATION_KEY, value=token))
+
+    def invalidate_local(self):
+        """Reload on the next lookup in this process"""
+        with self._lock:
+            self._values = None
+            self._epoch += 1
+        try:
+            from flask import g, has_request_context
+            if has_request_context():
+                g.pop('_settings_snapshot', None)
+        except ImportError:
+            pass
+
+
+# Shared by the app and services
+settings_cache = SettingsCache()
@@ -0,0 +1,224 @@
+"""
+Background Training Queue
+Training requests are stored as TrainingJob rows (the database acts as the broker)
+and executed by a small pool of worker threads, so the HTTP request returns immediately.
+Each job records the process that owns it and a heartbeat, so jobs orphaned by a crash
+or a restart are noticed and re-queued instead of blocking retraining.
+"""
+import os
+import uuid
+import queue
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+# Seconds between heartbeats of a running job, and without one before the job counts as dead
+TRAINING_HEARTBEAT_INTERVAL = int(os.getenv('TRAINING_HEARTBEAT_INTERVAL', '30'))
+TRAINING_HEARTBEAT_TIMEOUT = int(os.getenv('TRAINING_HEARTBEAT_TIMEOUT', '120'))
+
+# Owner id of jobs queued or run by this process: host, pid and a token for this boot
+WORKER_ID = f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def owner_alive(worker_id):
+    """
+    Whether the process that owns a job may still be running.
+    Processes on other hosts cannot be checked here; their heartbeat decides.
+    """
+    if not worker_id:
+        return False
+    if worker_id == WORKER_ID:
+        return True
+    try:
+        host, pid, _ = worker_id.rsplit(':', 2)
+        pid = int(pid)
+    except ValueError:
+        return False
+    if host != socket.gethostname()[:40]:
+        return True
+    if pid == os.getpid():
+        return False  # An earlier boot that had the same pid (e.g. pid 1 in a container)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class TrainingQueue:
+    def __init__(self, app, handler, max_workers=2):
+        """
+        Args:
+            app: Flask app, used to give worker threads an application context
+            handler: callable(job, report_progress) that performs the training for a TrainingJob,
+                optionally returning a completion message
+            max_workers: number of worker threads
+        """
+        self.app = app
+        self.handler = handler
+        self.max_workers = max(1, max_workers)
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self):
+        """Start worker threads on first use (daemon threads never block shutdown)"""
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'training-worker-{len(self._workers) + 1}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, job_id):
+        """Hand a queued TrainingJob to the worker pool (the job's worker_id should be WORKER_ID)"""
+        self._ensure_workers()
+        self._queue.put(job_id)
+        print(f" DEBUG: Training job {job_id} submitted ({self._queue.qsize()} waiting)")
+
+    def recover(self):
+        """Re-queue jobs left behind by a previous process (called at startup)"""
+        recovered = self.requeue_stale()
+        if recovered:
+            print(f" DEBUG: Recovered {recovered} pending training jobs")
+
+    def is_stale(self, job):
+        """
+        Whether a queued or running job has nobody working on it: its owner process is gone,
+        or (running) its heartbeat is older than TRAINING_HEARTBEAT_TIMEOUT
+        """
+        if job.status not in ('queued', 'running'):
+            return False
+        if not owner_alive(job.worker_id):
+            return True
+        if job.status == 'running':
+            last_beat = job.heartbeat_at or job.started_at
+            return last_beat is None or last_beat < datetime.utcnow() - timedelta(seconds=TRAINING_HEARTBEAT_TIMEOUT)
+        return False
+
+    def requeue_stale(self, chatbot_id=None):
+        """
+        Take over queued/running jobs whose owner died and submit them to this process.
+        Each job is taken with a conditional UPDATE, so only one process re-queues it.
+        Returns the number of jobs re-queued.
+        """
+        from app import db, TrainingJob
+
+        jobs = TrainingJob.query.filter(TrainingJob.status.in_(['queued', 'running']))
+        if chatbot_id is not None:
+            jobs = jobs.filter(TrainingJob.chatbot_id == chatbot_id)
+
+        requeued = []
+        for job in jobs.order_by(TrainingJob.created_at).all():
+            if not self.is_stale(job):
+                continue
+            taken = TrainingJob.query.filter_by(id=job.id, status=job.status, worker_id=job.worker_id).update({
+                'status': 'queued',
+                'worker_id': WORKER_ID,
+                'heartbeat_at': None,
+                'message': 'Re-queued after its worker stopped'
+            }, synchronize_session=False)
+            if taken:
+                requeued.append(job.id)
+        db.session.commit()
+
+        for job_id in requeued:
+            self.submit(job_id)
+        return len(requeued)
+
+    def _claim(self, job_id):
+        """
+        Atomically move a job from queued to running.
+        Returns False if another worker (or process) already took it.
+        """
+        from app import db, TrainingJob
+
+        now = datetime.utcnow()
+        claimed = TrainingJob.query.filter_by(id=job_id, status='queued').update({
+            'status': 'running',
+            'worker_id': WORKER_ID,
+            'started_at': now,
+            'heartbeat_at': now,
+            'message': 'Training started'
+        }, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    def _worker_loop(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run_job(job_id)
+            except Exception as e:
+                print(f"[ERROR] Training worker crashed on job {job_id}: {e}")
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job_id):
+        from app import db, TrainingJob
+
+        if not self._claim(job_id):
+            print(f" DEBUG: Training job {job_id} already claimed, skipping")
+            return
+
+        job = TrainingJob.query.get(job_id)
+        print(f" DEBUG: Running training job {job_id} for chatbot {job.chatbot_id}")
+
+        def report_progress(message):
+            job.message = message[:500]
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+
+        stop_heartbeat = threading.Event()
+        threading.Thread(
+            target=self._heartbeat_loop, args=(job_id, stop_heartbeat),
+            name=f'training-heartbeat-{job_id}', daemon=True
+        ).start()
+        try:
+            result_message = self.handler(job, report_progress)
+            job.status = 'completed'
+            job.message = (result_message or 'Chatbot trained successfully!')[:500]
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            print(f" DEBUG: Training job {job_id} completed")
+        except Exception as e:
+            print(f"[ERROR] Training job {job_id} failed: {e}")
+            traceback.print_exc()
+            db.session.rollback()
+
+            job = TrainingJob.query.get(job_id)
+            if job:  # The chatbot (and its jobs) may have been deleted meanwhile
+                job.status = 'failed'
+                job.error = str(e)
+                job.message = 'Training failed'
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+        finally:
+            stop_heartbeat.set()
+
+    def _heartbeat_loop(self, job_id, stop):
+        """Mark a running job as alive until it finishes (own connection, not the job's session)"""
+        from app import db, TrainingJob
+        table = TrainingJob.__table__
+        while not stop.wait(TRAINING_HEARTBEAT_INTERVAL):
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(
+                            table.update()
+                            .where(table.c.id == job_id)
+                            .where(table.c.status == 'running')
+                            .where(table.c.worker_id == WORKER_ID)
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+            except Exception as e:
+                print(f"[WARNING] Training job {job_id} heartbeat failed: {e}")
@@ -0,0 +1,189 @@
+"""
+Write-behind buffer for chatbot usage tracking
+Chat requests only add to an in-memory counter per (chatbot, domain); a background thread
+writes the totals as one bulk upsert every few seconds, when the buffer fills up, and at exit
+"""
+import atexit
+import threading
+import traceback
+from datetime import datetime
+
+# Unique index on chatbot_usage (chatbot_id, website_domain) the bulk upsert relies on
+UNIQUE_INDEX = 'uq_chatbot_usage_domain'
+
+
+class UsageBuffer:
+    def __init__(self, app=None, flush_interval=5.0, max_pending=500):
+        """
+        Args:
+            app: Flask app, used to give the flush thread an application context
+            flush_interval: seconds between flushes
+            max_pending: distinct (chatbot, domain) pairs that trigger an early flush
+        """
+        self.app = None
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._upsert = None  # Whether UNIQUE_INDEX exists (checked once, see check_schema)
+        if app is not None:
+            self.init_app(app, flush_interval, max_pending)
+
+    def init_app(self, app, flush_interval=None, max_pending=None):
+        self.app = app
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if max_pending is not None:
+            self.max_pending = max_pending
+
+    def check_schema(self):
+        """
+        Look for the unique index the bulk upsert needs (inside an app context).
+        db.create_all() does not add it to an existing table; without it usage is written row by row.
+        """
+        from sqlalchemy import inspect
+        from app import db
+
+        indexes = inspect(db.engine).get_indexes('chatbot_usage')
+        self._upsert = any(
+            index['name'] == UNIQUE_INDEX or
+            (index.get('unique') and set(index['column_names']) == {'chatbot_id', 'website_domain'})
+            for index in indexes
+        )
+        if not self._upsert:
+            print(f"WARNING: chatbot_usage has no {UNIQUE_INDEX} index, usage is written row by row "
+                  f"(run migrate_add_usage_unique_domain.py)")
+        return self._upsert
+
+    def record(self, chatbot_id, domain, website_url):
+        """Count one use of a chatbot on a website (never touches the database)"""
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get((chatbot_id, domain))
+            if entry is None:
+                self._pending[(chatbot_id, domain)] = {'count': 1, 'first_seen': now, 'last_seen': now, 'website_url': website_url}
+            else:
+                entry['count'] += 1
+                entry['last_seen'] = now
+            full = len(self._pending) >= self.max_pending
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        """Start the flush thread on first use (daemon thread; atexit writes what is left)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    atexit.register(self.flush)
+                self._thread = threading.Thread(target=self._flush_loop, name='usage-flusher', daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[ERROR] Usage flush failed: {e}")
+                traceback.print_exc()
+
+    def flush(self):
+        """Write buffered usage to the database; counts are kept for the next flush if it fails"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending or self.app is None:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    written = self._write(pending)
+                print(f" DEBUG: Flushed usage for {written} chatbot websites")
+                return written
+            except Exception:
+                self._restore(pending)
+                raise
+
+    def _restore(self, pending):
+        with self._lock:
+            for key, entry in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = entry
+                else:
+                    current['count'] += entry['count']
+                    current['first_seen'] = min(current['first_seen'], entry['first_seen'])
+                    current['last_seen'] = max(current['last_seen'], entry['last_seen'])
+
+    def _write(self, pending):
+        from sqlalchemy import select, func
+        from app import db, Chatbot, ChatbotUsage
+
+        engine = db.engine
+        table = ChatbotUsage.__table__
+
+        # Chatbots deleted since their usage was buffered would break the foreign key
+        chatbot_ids = {chatbot_id for chatbot_id, _ in pending}
+        with engine.connect() as conn:
+            existing = set(conn.execute(
+                select(Chatbot.__table__.c.id).where(Chatbot.__table__.c.id.in_(chatbot_ids))
+            ).scalars())
+
+        rows = [
+            {
+                'chatbot_id': chatbot_id,
+                'website_url': entry['website_url'],
+                'website_domain': domain,
+                'website_title': None,  # Could be populated later with web scraping
+                'first_seen': entry['first_seen'],
+                'last_seen': entry['last_seen'],
+                'usage_count': entry['count'],
+                'is_active': True
+            }
+            for (chatbot_id, domain), entry in pending.items() if chatbot_id in existing
+        ]
+        if not rows:
+            return 0
+
+        if self._upsert is None:
+            self.check_schema()
+
+        with engine.begin() as conn:
+            if self._upsert and engine.dialect.name in ('postgresql', 'sqlite'):
+                if engine.dialect.name == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(table)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=[table.c.chatbot_id, table.c.website_domain],
+                    set_={
+                        'usage_count': table.c.usage_count + stmt.excluded.usage_count,
+                        'last_seen': stmt.excluded.last_seen,
+                        'is_active': True
+                    }
+                ), rows)
+            else:
+                for row in rows:
+                    # One row per pair (older databases may still hold duplicates)
+                    first_id = conn.execute(select(func.min(table.c.id)).where(
+                        table.c.chatbot_id == row['chatbot_id'],
+                        table.c.website_domain == row['website_domain']
+                    )).scalar()
+                    if first_id is None:
+                        conn.execute(table.insert().values(**row))
+                    else:
+                        conn.execute(
+                            table.update()
+                            .where(table.c.id == first_id)
+                            .values(usage_count=table.c.usage_count + row['usage_count'],
+                                    last_seen=row['last_seen'], is_active=True)
+                        )
+        return len(rows)
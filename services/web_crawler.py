@@ -0,0 +1,359 @@
+"""
+Concurrent Website Crawler
+Fetches pages with an async HTTP client, limited per host by a connection semaphore
+and a token-bucket request rate, and extracts text with trafilatura on a worker pool.
+HTML fetched while discovering links is reused, so every page is downloaded once.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import httpx
+import trafilatura
+from bs4 import BeautifulSoup
+
+USER_AGENT = 'Mozilla/5.0 (compatible; OwlbeeChatbotTrainer/1.0; +https://owlbee.ai)'
+
+# Politeness limits, applied per host
+SCRAPE_CONCURRENCY_PER_HOST = int(os.getenv('SCRAPE_CONCURRENCY_PER_HOST', '4'))
+SCRAPE_REQUESTS_PER_SECOND = float(os.getenv('SCRAPE_REQUESTS_PER_SECOND', '4'))
+SCRAPE_EXTRACT_WORKERS = int(os.getenv('SCRAPE_EXTRACT_WORKERS', '4'))
+
+SKIP_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.tar', '.gz',
+    '.mp4', '.mp3', '.avi', '.mov', '.doc', '.docx', '.xls', '.xlsx',
+    '.css', '.js', '.xml', '.json', '.ico', '.svg', '.woff', '.ttf'
+)
+
+SKIP_PATTERNS = (
+    '/feed/', '/rss/', '/atom/', '/wp-json/', '/api/',
+    '/login', '/logout', '/signin', '/signup', '/register',
+    '/cart', '/checkout', '/account', '/admin',
+    '#', 'javascript:', 'mailto:', 'tel:'
+)
+
+
+def should_skip_url(url):
+    """
+    Check if URL should be skipped (e.g., files, common non-content pages)
+    """
+    url_lower = url.lower()
+    return url_lower.endswith(SKIP_EXTENSIONS) or any(pattern in url_lower for pattern in SKIP_PATTERNS)
+
+
+def parse_sitemap(content, max_urls=50):
+    """
+    Parse sitemap content using multiple approaches for maximum compatibility
+    Returns list of (url, lastmod) tuples; lastmod is None when the sitemap does not give one
+    """
+    # Approach 1 and 2: BeautifulSoup with the built-in XML parser, then the HTML parser
+    for parser in ('xml', 'html.parser'):
+        try:
+            soup = BeautifulSoup(content, parser)
+            entries = []
+            for loc in soup.find_all('loc'):
+                url = loc.text.strip()
+                if url and url.startswith('http'):
+                    lastmod = loc.find_next_sibling('lastmod')
+                    entries.append((url, lastmod.text.strip() if lastmod is not None else None))
+                    if len(entries) >= max_urls:
+                        break
+            if entries:
+                return entries
+        except Exception as e:
+            print(f"   ✗ BeautifulSoup {parser} parsing failed: {str(e)}")
+
+    # Approach 3: Simple regex extraction (most compatible)
+    try:
+        matches = re.findall(
+            r'<loc>(https?://[^<]+)</loc>\s*(?:<lastmod>([^<]+)</lastmod>)?',
+            content.decode('utf-8', errors='ignore')
+        )
+        return [(url.strip(), lastmod.strip() or None) for url, lastmod in matches if url.strip()][:max_urls]
+    except Exception as e:
+        print(f"   ✗ Regex parsing failed: {str(e)}")
+
+    return []
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def extract_links(html, page_url, netloc):
+    """Absolute same-host links from an HTML page, in document order"""
+    links = []
+    soup = BeautifulSoup(html, 'html.parser')
+    for link in soup.find_all('a', href=True):
+        absolute_url = urljoin(page_url, link['href'])
+        if urlparse(absolute_url).netloc == netloc and not should_skip_url(absolute_url):
+            links.append(absolute_url)
+    return links
+
+
+def extract_page_text(html):
+    """Clean page text using trafilatura"""
+    return trafilatura.extract(
+        html,
+        include_comments=False,
+        include_tables=True,
+        no_fallback=False
+    )
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows bursts of up to `capacity` requests,
+    refilled at `rate` requests per second
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = max(rate, 0.01)
+        self.capacity = capacity or max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class WebCrawler:
+    def __init__(self, concurrency_per_host=None, requests_per_second=None, extract_workers=None):
+        self.concurrency_per_host = concurrency_per_host or SCRAPE_CONCURRENCY_PER_HOST
+        self.requests_per_second = requests_per_second or SCRAPE_REQUESTS_PER_SECOND
+        self.extract_workers = extract_workers or SCRAPE_EXTRACT_WORKERS
+
+    def crawl(self, start_url, max_pages=50, timeout=120, previous_pages=None):
+        """
+        Discover and fetch up to max_pages pages of a site and extract their text.
+
+        Args:
+            previous_pages (dict): url -> page dict from an earlier crawl (see below). When given,
+                pages are requested conditionally (ETag / Last-Modified), pages whose sitemap
+                <lastmod> did not move are not requested at all, and unchanged pages reuse
+                their previous text.
+
+        Returns:
+            list: page dicts in discovery order (sitemap URLs first, then crawled ones) with
+                  'url', 'status', 'text' (None if nothing was extracted), 'text_hash', 'etag',
+                  'last_modified', 'lastmod', 'links' and 'state' (one of 'new', 'changed',
+                  'unchanged' or 'failed')
+        """
+        return asyncio.run(self._crawl(start_url, max_pages, timeout, previous_pages or {}))
+
+    async def _crawl(self, start_url, max_pages, timeout, previous_pages):
+        self._deadline = time.monotonic() + timeout
+        self._semaphores = {}
+        self._buckets = {}
+        self._previous = previous_pages
+        self._lastmods = {}
+        self._links = {}
+
+        parsed_url = urlparse(start_url)
+        base_domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=self.extract_workers, thread_name_prefix='scrape-extract') as executor:
+            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, headers={'User-Agent': USER_AGENT}) as client:
+                # Step 1: Try to get URLs from sitemap.xml
+                urls_to_scrape = await self._sitemap_urls(client, base_domain, max_pages)
+                print(f" DEBUG: Sitemap provided {len(urls_to_scrape)} URLs")
+
+                # Step 2: If no sitemap or insufficient URLs, crawl the site (keeping the fetched HTML)
+                fetched = {}
+                if len(urls_to_scrape) < max_pages:
+                    crawled_urls = await self._discover(client, executor, start_url, parsed_url.netloc,
+                                                        max_pages - len(urls_to_scrape), fetched)
+                    urls_to_scrape.extend(crawled_urls)
+
+                urls_to_scrape = list(dict.fromkeys(urls_to_scrape))[:max_pages]
+                print(f" DEBUG: Will scrape {len(urls_to_scrape)} pages ({len(fetched)} already fetched during discovery)")
+
+                # Step 3: Fetch the remaining pages concurrently until the deadline,
+                # except pages whose sitemap <lastmod> is unchanged since the previous crawl
+                missing = [
+                    page_url for page_url in urls_to_scrape
+                    if page_url not in fetched and not self._unchanged_in_sitemap(page_url)
+                ]
+                tasks = {asyncio.ensure_future(self._fetch(client, page_url, conditional=True)): page_url for page_url in missing}
+                if tasks:
+                    done, pending = await asyncio.wait(tasks, timeout=max(0.0, self._deadline - time.monotonic()))
+                    for task in pending:
+                        task.cancel()
+                    if pending:
+                        print(f" WARNING: Timeout reached, {len(pending)} pages not fetched")
+                    for task in done:
+                        if not task.cancelled() and task.exception() is None:
+                            fetched[tasks[task]] = task.result()
+
+            # Step 4: Extract text on the worker pool
+            responses = [fetched.get(page_url) for page_url in urls_to_scrape]
+            extractions = [
+                loop.run_in_executor(executor, extract_page_text, response.text)
+                if response is not None and response.status_code == 200 else None
+                for response in responses
+            ]
+            pages = []
+            for page_url, response, extraction in zip(urls_to_scrape, responses, extractions):
+                extracted_text = None
+                if extraction is not None:
+                    try:
+                        extracted_text = await extraction
+                    except Exception as e:
+                        print(f"   ✗ Error extracting {page_url}: {str(e)}")
+                pages.append(self._page_result(page_url, response, extracted_text))
+
+        return pages
+
+    def _unchanged_in_sitemap(self, url):
+        previous = self._previous.get(url)
+        lastmod = self._lastmods.get(url)
+        return bool(lastmod and previous and previous.get('text') and previous.get('lastmod') == lastmod)
+
+    def _page_result(self, url, response, extracted_text):
+        """Build the page dict for a crawled URL, carrying over the previous crawl where the page did not change"""
+        previous = self._previous.get(url)
+        page = {
+            'url': url,
+            'status': response.status_code if response is not None else None,
+            'text': extracted_text,
+            'text_hash': text_hash(extracted_text) if extracted_text else None,
+            'etag': response.headers.get('etag') if response is not None else None,
+            'last_modified': response.headers.get('last-modified') if response is not None else None,
+            'lastmod': self._lastmods.get(url),
+            'links': self._links.get(url, []),
+        }
+
+        if previous and (page['status'] == 304 or (response is None and self._unchanged_in_sitemap(url))):
+            # Not modified: keep what was extracted last time
+            for key in ('text', 'text_hash', 'etag', 'last_modified', 'links'):
+                page[key] = page[key] or previous.get(key)
+            page['state'] = 'unchanged'
+        elif not extracted_text:
+            if previous and (page['status'] is None or page['status'] >= 500):
+                # Temporary failure: keep serving the previous content rather than dropping the page
+                for key in ('text', 'text_hash', 'etag', 'last_modified', 'links'):
+                    page[key] = previous.get(key)
+            page['state'] = 'failed'
+        elif not previous:
+            page['state'] = 'new'
+        elif previous.get('text_hash') == page['text_hash']:
+            page['state'] = 'unchanged'
+        else:
+            page['state'] = 'changed'
+        return page
+
+    def _host_limits(self, url):
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.concurrency_per_host)
+            self._buckets[host] = TokenBucket(self.requests_per_second)
+        return self._semaphores[host], self._buckets[host]
+
+    def _conditional_headers(self, url):
+        previous = self._previous.get(url) or {}
+        if not previous.get('text'):
+            return {}
+        headers = {}
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+        return headers
+
+    async def _fetch(self, client, url, conditional=False):
+        """GET a URL within the host's limits; returns the response or None on error/timeout"""
+        if time.monotonic() > self._deadline:
+            return None
+        semaphore, bucket = self._host_limits(url)
+        async with semaphore:
+            await bucket.acquire()
+            try:
+                headers = self._conditional_headers(url) if conditional else None
+                response = await client.get(url, headers=headers)
+                print(f"   {'✓' if response.status_code in (200, 304) else '✗'} HTTP {response.status_code}: {url}")
+                return response
+            except Exception as e:
+                print(f"   ✗ Error fetching {url}: {str(e)}")
+                return None
+
+    async def _sitemap_urls(self, client, base_url, max_urls):
+        """Try to extract URLs (and their <lastmod>) from the usual sitemap locations"""
+        urls = []
+        for sitemap_url in (f"{base_url}/sitemap.xml", f"{base_url}/sitemap_index.xml", f"{base_url}/sitemap1.xml"):
+            response = await self._fetch(client, sitemap_url)
+            if response is None or response.status_code != 200:
+                continue
+            try:
+                entries = parse_sitemap(response.content, max_urls)
+            except Exception as e:
+                print(f"   ✗ Error parsing sitemap {sitemap_url}: {str(e)}")
+                continue
+            for url, lastmod in entries:
+                urls.append(url)
+                if lastmod:
+                    self._lastmods[url] = lastmod
+            if len(urls) >= max_urls:
+                break
+        return urls[:max_urls]
+
+    async def _discover(self, client, executor, start_url, netloc, max_urls, fetched):
+        """
+        Breadth-first crawl from start_url, fetching each wave of queued links concurrently.
+        HTML pages are kept in `fetched` so they are not downloaded again; pages that answer
+        304 Not Modified are followed through the links recorded by the previous crawl.
+        """
+        loop = asyncio.get_running_loop()
+        visited = {start_url}
+        to_visit = [start_url]
+        discovered_urls = []
+
+        while to_visit and len(discovered_urls) < max_urls and time.monotonic() < self._deadline:
+            # Never fetch more pages in a wave than could still be used
+            needed = max_urls - len(discovered_urls)
+            wave, to_visit = to_visit[:needed], to_visit[needed:]
+
+            # Pages are only fetched conditionally when the previous crawl recorded their links
+            responses = await asyncio.gather(*(
+                self._fetch(client, url, conditional=bool((self._previous.get(url) or {}).get('links')))
+                for url in wave
+            ))
+            html_pages = []
+            for url, response in zip(wave, responses):
+                if response is None:
+                    continue
+                if response.status_code == 304:
+                    discovered_urls.append(url)
+                    fetched[url] = response
+                    self._links[url] = self._previous[url]['links']
+                elif response.status_code == 200 and 'text/html' in response.headers.get('content-type', ''):
+                    discovered_urls.append(url)
+                    fetched[url] = response
+                    html_pages.append((url, response.text))
+
+            link_lists = await asyncio.gather(*(
+                loop.run_in_executor(executor, extract_links, html, url, netloc) for url, html in html_pages
+            ))
+            for (url, _), links in zip(html_pages, link_lists):
+                self._links[url] = links
+
+            for url in wave:
+                for link in self._links.get(url, []):
+                    if link not in visited:
+                        visited.add(link)
+                        to_visit.append(link)
+
+        print(f"   ✓ Discovered {len(discovered_urls)} URLs via crawling")
+        return discovered_urls
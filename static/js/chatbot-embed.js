@@ -971,6 +971,15 @@
                 requestData.conversation_id = this.conversationId;
             }
 
+            // Stream the answer when the browser supports it, otherwise wait for the full JSON response
+            if (this.config.stream !== false && window.ReadableStream && window.TextDecoder) {
+                this.sendMessageStreaming(requestData);
+            } else {
+                this.sendMessageJson(requestData);
+            }
+        },
+
+        sendMessageJson: function(requestData) {
             // Send to API
             fetch(this.config.apiUrl, {
                 method: 'POST',
@@ -999,6 +1008,106 @@
             });
         },
 
+        sendMessageStreaming: function(requestData) {
+            const streamUrl = this.config.streamUrl || `${this.config.apiUrl.replace(/\/$/, '')}/stream`;
+            let messageDiv = null;
+            let text = '';
+
+            // Show partial output as it arrives: 'delta' appends, 'replace' rewrites, 'done' has the final text
+            const handleEvent = (eventName, data) => {
+                if (eventName === 'delta' || eventName === 'replace' || eventName === 'done') {
+                    text = eventName === 'delta' ? text + data.text :
+                           eventName === 'replace' ? data.text :
+                           (data.response || 'Sorry, I encountered an issue. Please try again.');
+                    if (!messageDiv) {
+                        this.hideTyping();
+                        messageDiv = this.addMessage(text, 'bot');
+                    } else {
+                        this.updateMessage(messageDiv, text);
+                    }
+                    
+                    // Store conversation ID for future messages
+                    if (eventName === 'done' && data.conversation_id) {
+                        this.conversationId = data.conversation_id;
+                        console.log('Conversation ID stored:', this.conversationId);
+                    }
+                } else if (eventName === 'error') {
+                    this.hideTyping();
+                    this.addMessage(data.error || 'Sorry, I encountered an error. Please try again.', 'bot');
+                }
+            };
+
+            fetch(streamUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
+                },
+                body: JSON.stringify(requestData)
+            })
+            .then(response => {
+                const contentType = response.headers.get('Content-Type') || '';
+                if (!response.body || contentType.indexOf('text/event-stream') === -1) {
+                    // Validation errors come back as JSON; anything else means no streaming support
+                    return response.json().then(data => {
+                        this.hideTyping();
+                        this.addMessage(data.response || data.error || 'Sorry, I encountered an issue. Please try again.', 'bot');
+                    }, () => this.sendMessageJson(requestData));
+                }
+
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+
+                const pump = () => reader.read().then(({ done, value }) => {
+                    if (done) {
+                        if (!messageDiv) {
+                            this.hideTyping();
+                            this.addMessage('Sorry, I encountered an issue. Please try again.', 'bot');
+                        }
+                        return;
+                    }
+                    buffer += decoder.decode(value, { stream: true });
+
+                    // Events are separated by a blank line
+                    let separator;
+                    while ((separator = buffer.indexOf('\n\n')) !== -1) {
+                        const rawEvent = buffer.slice(0, separator);
+                        buffer = buffer.slice(separator + 2);
+
+                        let eventName = 'message';
+                        const dataLines = [];
+                        rawEvent.split('\n').forEach(line => {
+                            if (line.startsWith('event:')) {
+                                eventName = line.slice(6).trim();
+                            } else if (line.startsWith('data:')) {
+                                dataLines.push(line.slice(5).trim());
+                            }
+                        });
+                        if (dataLines.length) {
+                            handleEvent(eventName, JSON.parse(dataLines.join('\n')));
+                        }
+                    }
+                    return pump();
+                });
+                return pump();
+            })
+            .catch(error => {
+                this.hideTyping();
+                if (!messageDiv) {
+                    this.addMessage('Sorry, I encountered an error. Please try again.', 'bot');
+                }
+                console.error('Chat error:', error);
+            });
+        },
+
+        updateMessage: function(messageDiv, text) {
+            const bubble = messageDiv.querySelector('.message-bubble');
+            bubble.innerHTML = this.convertLinksToHtml(text);
+            const messagesContainer = document.getElementById(`chatbot-messages-${this.config.embedCode}`);
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        },
+
         addMessage: function(text, sender) {
             const messagesContainer = document.getElementById(`chatbot-messages-${this.config.embedCode}`);
             const messageDiv = document.createElement('div');
@@ -1023,6 +1132,7 @@
 
             messagesContainer.appendChild(messageDiv);
             messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            return messageDiv;
         },
 
         convertLinksToHtml: function(text) {
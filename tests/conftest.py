@@ -0,0 +1,43 @@
+"""
+Shared fixtures: one app for the whole session, backed by a temporary SQLite database
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    os.environ['TRAINING_DATA_DIR'] = str(tmp_path_factory.mktemp('training_data'))
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def make_chatbot(app_context):
+    """Create a user-owned chatbot and return its id"""
+    from werkzeug.security import generate_password_hash
+    from app import db, User, Chatbot
+
+    def make(name='Test bot'):
+        token = uuid.uuid4().hex[:8]
+        user = User(username=f'user-{token}', email=f'{token}@example.com', password_hash=generate_password_hash('pw'))
+        db.session.add(user)
+        db.session.commit()
+        chatbot = Chatbot(name=name, user_id=user.id, embed_code=str(uuid.uuid4()))
+        db.session.add(chatbot)
+        db.session.commit()
+        return chatbot.id
+
+    return make
@@ -0,0 +1,82 @@
+import asyncio
+import types
+import uuid
+
+import pytest
+
+from services.conversation_store import MemoryConversationStore
+from services.response_cache import response_cache
+
+
+class FakeResponses:
+    """Stands in for client.responses, recording the requests it gets"""
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return types.SimpleNamespace(id=f'resp_{len(self.requests)}', output_text=f'Answer {len(self.requests)}.')
+
+
+@pytest.fixture
+def service(app_context, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    from services.chat_service_openai import ChatServiceOpenAI
+
+    service = ChatServiceOpenAI(conversation_store=MemoryConversationStore())
+    service.client = types.SimpleNamespace(responses=FakeResponses())
+    monkeypatch.setattr(service, '_get_relevant_context', lambda chatbot_id, message: ['Opening hours are nine to five.'])
+    monkeypatch.setattr(service, '_should_use_web_search', lambda context, message: False)
+    monkeypatch.setattr(response_cache, 'similarity_threshold', 0)
+    response_cache.invalidate()
+    return service
+
+
+def chat(service, chatbot_id, message, conversation_id):
+    """One chat turn the way the chat route runs it"""
+    from app import save_conversation
+    answer = service.get_response(chatbot_id, message, conversation_id)
+    save_conversation(chatbot_id, message, answer, conversation_id)
+    return answer
+
+
+def test_follow_up_after_a_cached_answer_sees_that_answer(service, make_chatbot):
+    chatbot_id = make_chatbot()
+    requests = service.client.responses.requests
+
+    first = chat(service, chatbot_id, 'What are your hours?', 'visitor-a')
+    cached = chat(service, chatbot_id, 'what are your hours', 'visitor-b')
+    assert cached == first
+    assert len(requests) == 1
+    # The stranger's response chain is never handed to visitor b
+    assert service.conversation_store.get('visitor-b') != 'resp_1'
+
+    # A follow-up that repeats a cached question is not answered from the cache again
+    chat(service, chatbot_id, 'What are your hours?', 'visitor-b')
+    assert len(requests) == 2
+    follow_up = requests[-1]
+    assert 'previous_response_id' not in follow_up
+    assert f'User: what are your hours\nAssistant: {first}\n\nUser: What are your hours?' in follow_up['input']
+
+    # Later turns continue the new response chain as usual
+    chat(service, chatbot_id, 'And on weekends?', 'visitor-b')
+    assert requests[-1]['previous_response_id'] == 'resp_2'
+
+
+def test_async_answers_are_cached_on_the_worker_thread(service, make_chatbot, monkeypatch):
+    chatbot_id = make_chatbot()
+    calls = []
+
+    class FakeAsyncResponses:
+        async def create(self, **kwargs):
+            return types.SimpleNamespace(id='resp_async', output_text='Async answer.')
+
+    async def run_sync(func, *args):
+        calls.append(func.__name__)
+        return func(*args)
+
+    service._async_client = types.SimpleNamespace(responses=FakeAsyncResponses())
+    answer = asyncio.run(service.get_response_async(chatbot_id, 'Do you ship abroad?', str(uuid.uuid4()), run_sync))
+
+    assert answer.startswith('Async answer')
+    assert '_cache_answer' in calls
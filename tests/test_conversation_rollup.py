@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import conversation_rollup
+
+
+def rollup_totals(chatbot_id):
+    from app import ConversationDailyStats
+    rows = ConversationDailyStats.query.filter_by(chatbot_id=chatbot_id).all()
+    return {
+        'turns': sum(row.conversation_count for row in rows),
+        'resolved': sum(row.resolved_count for row in rows),
+        'active': sum(row.active_count for row in rows),
+        'pending': sum(row.pending_count for row in rows),
+        'length': sum(row.message_length_sum for row in rows),
+    }
+
+
+@pytest.fixture
+def chatbot_id(make_chatbot):
+    return make_chatbot()
+
+
+def test_saved_turns_are_counted_in_their_hour(chatbot_id):
+    from app import save_conversation, ConversationDailyStats
+    save_conversation(chatbot_id, 'hello', 'hi', 'conv-1')
+    save_conversation(chatbot_id, 'how much?', 'ten', 'conv-1')
+
+    rows = ConversationDailyStats.query.filter_by(chatbot_id=chatbot_id).all()
+    assert sum(row.conversation_count for row in rows) == 2
+    assert rollup_totals(chatbot_id) == {'turns': 2, 'resolved': 0, 'active': 2, 'pending': 0, 'length': 14}
+    assert all(0 <= row.hour < 24 for row in rows)
+
+
+def test_record_turn_upserts_the_same_row(chatbot_id):
+    from app import db, ConversationDailyStats
+    when = datetime(2026, 1, 5, 14, 30)
+    conversation_rollup.record_turn(chatbot_id, when, 4)
+    conversation_rollup.record_turn(chatbot_id, when + timedelta(minutes=10), 6)
+    conversation_rollup.record_turn(chatbot_id, when + timedelta(hours=1), 1)
+    db.session.commit()
+
+    rows = ConversationDailyStats.query.filter_by(chatbot_id=chatbot_id).order_by(ConversationDailyStats.hour).all()
+    assert [(row.hour, row.conversation_count, row.active_count, row.message_length_sum) for row in rows] == \
+        [(14, 2, 2, 10), (15, 1, 1, 1)]
+
+
+def test_ending_a_conversation_moves_status_counts(chatbot_id):
+    from app import save_conversation, end_conversation
+    save_conversation(chatbot_id, 'a', 'x', 'conv-1')
+    save_conversation(chatbot_id, 'b', 'x', 'conv-1')
+    save_conversation(chatbot_id, 'c', 'x', 'conv-2')
+
+    end_conversation(chatbot_id, 'conv-1', True)
+    assert rollup_totals(chatbot_id)['resolved'] == 2
+    assert rollup_totals(chatbot_id)['active'] == 1
+
+    # Ending it again changes nothing
+    end_conversation(chatbot_id, 'conv-1', True)
+    assert rollup_totals(chatbot_id)['resolved'] == 2
+
+    end_conversation(chatbot_id, 'conv-1', False)
+    assert rollup_totals(chatbot_id)['resolved'] == 0
+    assert rollup_totals(chatbot_id)['active'] == 3
+    assert conversation_rollup.compact(chatbot_id=chatbot_id) == 0
+
+
+def test_compact_backfills_and_repairs(chatbot_id):
+    from app import db, Conversation, ConversationDailyStats
+    now = datetime.utcnow()
+    # Turns written without the rollup (e.g. before it existed)
+    for days_ago, status in [(0, 'active'), (0, 'resolved'), (3, 'pending'), (3, None), (10, 'resolved')]:
+        db.session.add(Conversation(chatbot_id=chatbot_id, user_message='question', bot_response='answer',
+                                    timestamp=now - timedelta(days=days_ago), response_status=status))
+    db.session.commit()
+
+    assert conversation_rollup.compact(chatbot_id=chatbot_id) == 3
+    assert rollup_totals(chatbot_id) == {'turns': 5, 'resolved': 2, 'active': 2, 'pending': 1, 'length': 40}
+    assert conversation_rollup.compact(chatbot_id=chatbot_id) == 0
+
+    # A rollup row that drifted is rebuilt; a row without turns is removed
+    row = ConversationDailyStats.query.filter_by(chatbot_id=chatbot_id).first()
+    row.conversation_count += 5
+    db.session.add(ConversationDailyStats(chatbot_id=chatbot_id, day=(now - timedelta(days=20)).date(), hour=3,
+                                          conversation_count=1, active_count=1))
+    db.session.commit()
+    assert conversation_rollup.compact(chatbot_id=chatbot_id) == 2
+    assert rollup_totals(chatbot_id)['turns'] == 5
+
+
+def test_compact_since_only_looks_at_recent_days(chatbot_id):
+    from app import db, Conversation
+    now = datetime.utcnow()
+    for days_ago in (1, 15):
+        db.session.add(Conversation(chatbot_id=chatbot_id, user_message='q', bot_response='a',
+                                    timestamp=now - timedelta(days=days_ago)))
+    db.session.commit()
+
+    assert conversation_rollup.compact(since=(now - timedelta(days=7)).date(), chatbot_id=chatbot_id) == 1
+    assert rollup_totals(chatbot_id)['turns'] == 1
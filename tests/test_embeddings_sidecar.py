@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRAINING_DATA_DIR', str(tmp_path))
+    from services.chatbot_trainer import ChatbotTrainer
+    return ChatbotTrainer()
+
+
+def sidecars(trainer, chatbot_id):
+    return sorted(os.path.basename(path) for path in trainer._embeddings_files(chatbot_id))
+
+
+def test_each_save_writes_a_new_file(trainer):
+    first = trainer._save_embeddings(1, np.random.rand(3, 4))
+    mapped = trainer._load_embeddings(1, first)
+    second = trainer._save_embeddings(1, np.random.rand(3, 4))
+
+    assert first['embeddings_file'] != second['embeddings_file']
+    assert sidecars(trainer, 1) == sorted([first['embeddings_file'], second['embeddings_file']])
+    # The matrix mapped from the first file is still readable after the second save
+    assert np.allclose(np.linalg.norm(mapped, axis=1), 1.0, atol=1e-5)
+
+
+def test_old_sidecars_are_removed_once_the_new_one_is_loaded(trainer):
+    open(os.path.join(trainer.data_dir, 'chatbot_1.emb.npy'), 'wb').close()
+    open(os.path.join(trainer.data_dir, 'chatbot_12.emb.abc.npy'), 'wb').close()
+    trainer._save_embeddings(1, np.random.rand(2, 4))
+    current = trainer._save_embeddings(1, np.random.rand(2, 4))
+
+    trainer._load_embeddings(1, current)
+    trainer._remove_old_embeddings(1, trainer._current_embeddings_path(1, current))
+
+    assert sidecars(trainer, 1) == [current['embeddings_file']]
+    assert sidecars(trainer, 12) == ['chatbot_12.emb.abc.npy']
+
+    trainer._remove_embeddings_file(1)
+    assert sidecars(trainer, 1) == []
+
+
+def test_int8_embeddings_round_trip(trainer, monkeypatch):
+    import services.chatbot_trainer as chatbot_trainer
+    monkeypatch.setattr(chatbot_trainer, 'EMBEDDINGS_DTYPE', 'int8')
+    vectors = np.random.rand(5, 8).astype(np.float32)
+
+    metadata = trainer._save_embeddings(1, vectors)
+    loaded = trainer._load_embeddings(1, metadata)
+
+    expected = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    assert metadata['embeddings_dtype'] == 'int8'
+    assert np.allclose(loaded, expected, atol=0.02)
+
+
+def test_readers_never_delete_newer_or_recent_sidecars(trainer):
+    def sidecar(name, age):
+        path = os.path.join(trainer.data_dir, name)
+        open(path, 'wb').close()
+        when = time.time() - age
+        os.utime(path, (when, when))
+        return path
+
+    current = sidecar('chatbot_1.emb.current.npy', age=3600)
+    training = sidecar('chatbot_1.emb.training.npy', age=0)     # JSON not written yet
+    replaced = sidecar('chatbot_1.emb.replaced.npy', age=3700)
+    recent = sidecar('chatbot_1.emb.recent.npy', age=3650)
+
+    trainer._remove_old_embeddings(1, current, grace_seconds=3680)
+
+    assert os.path.exists(current)
+    assert os.path.exists(training)
+    assert os.path.exists(recent)
+    assert not os.path.exists(replaced)
+
+
+def test_loading_during_a_retrain_keeps_the_new_sidecar(trainer, monkeypatch):
+    import json
+    import services.chatbot_trainer as chatbot_trainer
+    monkeypatch.setattr(chatbot_trainer, 'AI_AVAILABLE', True)
+    data = {'sentences': ['a', 'b'], 'legacy_format': True, 'embeddings': None}
+    data.update(trainer._save_embeddings(1, np.random.rand(2, 4)))
+    with open(os.path.join(trainer.data_dir, 'chatbot_1.json'), 'w') as f:
+        json.dump(data, f)
+
+    # A retrain has written its sidecar but not yet the JSON pointing at it
+    pending = trainer._save_embeddings(1, np.random.rand(2, 4))
+    loaded = trainer.get_training_data(1)
+
+    assert loaded['embeddings_file'] == data['embeddings_file']
+    assert loaded['embeddings'].shape == (2, 4)
+    assert pending['embeddings_file'] in sidecars(trainer, 1)
@@ -0,0 +1,44 @@
+import os
+import time
+
+from services.document_processor import ExtractionCache
+
+
+def write(path, size, age):
+    with open(path, 'w') as f:
+        f.write('x' * size)
+    when = time.time() - age
+    os.utime(path, (when, when))
+
+
+def test_eviction_skips_recent_entries_and_temp_files(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=250, grace_seconds=60)
+    old = tmp_path / 'old.txt'
+    older = tmp_path / 'older.txt'
+    recent = tmp_path / 'recent.txt'
+    writing = tmp_path / 'entry.txt.123.456.tmp'
+    abandoned = tmp_path / 'entry.txt.1.2.tmp'
+    write(older, 100, age=3600)
+    write(old, 100, age=1800)
+    write(recent, 100, age=5)
+    write(writing, 100, age=1)
+    write(abandoned, 100, age=2 * 86400)
+
+    cache._evict()
+
+    assert not older.exists()      # least recently used goes first
+    assert old.exists()            # cache fits again after one eviction
+    assert recent.exists()
+    assert writing.exists()        # still being written by put_blocks
+    assert not abandoned.exists()  # left behind by a crashed writer
+
+
+def test_put_blocks_keeps_the_entry_it_returns(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=10, grace_seconds=0)
+    write(tmp_path / 'other.txt', 50, age=3600)
+
+    path = cache.put_blocks('abc', '.pdf', ['x' * 40, 'y' * 40])
+
+    assert os.path.exists(path)
+    assert not (tmp_path / 'other.txt').exists()
+    assert cache.lookup('abc', '.pdf') == path
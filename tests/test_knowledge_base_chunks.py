@@ -0,0 +1,84 @@
+import pytest
+
+from services import chatbot_trainer
+from services.chatbot_trainer import ChatbotTrainer
+
+CHUNK_WORDS = 50
+OVERLAP_WORDS = 10
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRAINING_DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(chatbot_trainer, 'KB_CHUNK_WORDS', CHUNK_WORDS)
+    monkeypatch.setattr(chatbot_trainer, 'KB_CHUNK_OVERLAP_WORDS', OVERLAP_WORDS)
+    return ChatbotTrainer()
+
+
+def make_text(line_lengths):
+    """Lines of unique words w0 w1 ..., so overlaps can be measured exactly"""
+    lines = []
+    n = 0
+    for length in line_lengths:
+        lines.append(' '.join(f'w{i}' for i in range(n, n + length)))
+        n += length
+    return '\n'.join(lines), n
+
+
+def overlap(previous, following):
+    previous, following = previous.split(), following.split()
+    for k in range(min(len(previous), len(following)), 0, -1):
+        if previous[-k:] == following[:k]:
+            return k
+    return 0
+
+
+@pytest.mark.parametrize('line_lengths', [
+    [7] * 40,                    # many short lines
+    [30, 300, 8, 8, 45, 49, 3],  # a line longer than a window
+    [45, 45, 45, 45],            # lines that nearly fill a window
+    [12, 180, 12, 12],           # long line between short ones
+    [49, 1, 49, 1, 49],
+    [120, 5],                    # short tail after a line longer than a window
+    [30, 120, 9],                # tail shorter than the overlap
+])
+def test_windows_and_overlaps_are_bounded(trainer, line_lengths):
+    text, total_words = make_text(line_lengths)
+    chunks = trainer._chunk_text_for_knowledge_base(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk.split()) <= CHUNK_WORDS
+    for previous, following in zip(chunks, chunks[1:]):
+        assert overlap(previous, following) <= OVERLAP_WORDS
+
+    # Every word of the document ends up in some window
+    seen = {word for chunk in chunks for word in chunk.split()}
+    assert seen == {f'w{i}' for i in range(total_words)}
+
+
+def test_short_text_is_one_chunk(trainer):
+    text, _ = make_text([10, 10])
+    assert trainer._chunk_text_for_knowledge_base(text) == [text]
+
+
+def test_overlap_carries_the_last_words(trainer):
+    text, _ = make_text([40, 40])
+    first, second = trainer._chunk_text_for_knowledge_base(text)
+    assert overlap(first, second) == OVERLAP_WORDS
+    assert second.split()[:OVERLAP_WORDS] == first.split()[-OVERLAP_WORDS:]
+
+
+def test_text_after_an_overlong_line_is_kept(trainer):
+    long_line, _ = make_text([CHUNK_WORDS * 2 + 1])
+    contact = 'Contact us at support@example.com for refunds.'
+    chunks = trainer._chunk_text_for_knowledge_base(long_line + '\n' + contact)
+
+    assert chunks[-1] == contact
+    assert all(len(chunk.split()) <= CHUNK_WORDS for chunk in chunks)
+
+
+def test_no_window_holds_only_carried_overlap(trainer):
+    text, _ = make_text([40, 40])
+    chunks = trainer._chunk_text_for_knowledge_base(text + '\n\n\n')
+    assert len(chunks) == 2
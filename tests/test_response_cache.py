@@ -0,0 +1,33 @@
+from services.response_cache import ResponseCache, normalize_question
+
+
+def test_questions_match_on_normalised_text():
+    assert normalize_question('  What are your HOURS?! ') == 'what are your hours'
+
+    cache = ResponseCache(similarity_threshold=0)
+    cache.put(1, cache.probe('What are your hours?'), 'v1', 'Nine to five.')
+
+    entry = cache.get(1, cache.probe('what are your hours'), 'v1')
+    assert entry['answer'] == 'Nine to five.'
+    assert 'response_id' not in entry     # only the text is shared between visitors
+    assert cache.get(2, cache.probe('what are your hours'), 'v1') is None
+
+
+def test_fingerprint_change_and_ttl_drop_answers():
+    cache = ResponseCache(similarity_threshold=0)
+    cache.put(1, cache.probe('hours?'), 'v1', 'Nine to five.')
+
+    assert cache.get(1, cache.probe('hours?'), 'v2') is None
+    cache.put(1, cache.probe('hours?'), 'v2', 'Ten to six.')
+    assert cache.get(1, cache.probe('hours?'), 'v2', ttl=-1) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_entries_per_chatbot_are_bounded():
+    cache = ResponseCache(similarity_threshold=0)
+    for n in range(5):
+        cache.put(1, cache.probe(f'question {n}'), 'v1', f'answer {n}', max_entries=3)
+
+    assert cache.get(1, cache.probe('question 0'), 'v1') is None
+    assert cache.get(1, cache.probe('question 4'), 'v1')['answer'] == 'answer 4'
+    assert cache.stats()['entries'] == 3
@@ -0,0 +1,88 @@
+import pytest
+
+from services.search_index import stem_token, tokenize, BM25Index, SubstringIndex, VectorIndex
+
+
+@pytest.mark.parametrize('words', [
+    ('platform', 'platforms'),
+    ('price', 'prices', 'pricing'),
+    ('policy', 'policies'),
+    ('integrate', 'integrates', 'integration'),
+    ('box', 'boxes'),
+])
+def test_word_forms_share_a_stem(words):
+    assert len({stem_token(word) for word in words}) == 1
+
+
+def test_short_words_and_protected_endings_are_kept():
+    assert stem_token('api') == 'api'
+    assert stem_token('class') == 'class'
+    assert stem_token('status') == 'status'
+    assert stem_token('analysis') == 'analysis'
+
+
+def test_tokenize_drops_stop_words():
+    assert tokenize('What are the Pricing plans?') == [stem_token('pricing'), stem_token('plans')]
+
+
+SENTENCES = [
+    'Our pricing plans start at ten dollars a month.',
+    'The platform integrates with Slack and email.',
+    'Contact support by email for billing questions about plans, invoices, refunds and anything else.',
+    'Configuration lives in the settings page.',
+    'Refunds are issued within five days.',
+]
+
+
+def test_bm25_ranks_documents_matching_more_query_terms_first():
+    index = BM25Index(SENTENCES)
+    results = index.search('price plans')
+
+    assert [result['index'] for result in results] == [0, 2]
+    assert results[0]['content'] == SENTENCES[0]
+    assert all(0 < result['similarity'] <= 1.0 for result in results)
+
+
+def test_bm25_prefers_shorter_documents_and_rarer_terms():
+    index = BM25Index(SENTENCES)
+
+    # 'refunds' appears in a short and a long sentence: the short one wins
+    results = index.search('refunded')
+    assert [result['index'] for result in results] == [4, 2]
+    assert results[0]['similarity'] > results[1]['similarity']
+    # 'email' is in two sentences, 'slack' only in one; the rarer term carries more weight
+    assert index.idf(stem_token('slack')) > index.idf(stem_token('email'))
+    assert index.search('slack email')[0]['index'] == 1
+
+
+def test_bm25_prefix_matches_count_less_than_exact_terms():
+    index = BM25Index(['Change the config file.', 'Configuration lives in the settings page.'])
+    results = index.search('config')
+
+    assert [result['index'] for result in results] == [0, 1]
+    assert results[1]['similarity'] < results[0]['similarity']
+
+
+def test_bm25_limits_results_and_ignores_stop_word_queries():
+    index = BM25Index(SENTENCES)
+
+    assert len(index.search('plans refunds email', top_k=2)) == 2
+    assert index.search('what is the') == []
+    assert BM25Index([]).search('plans') == []
+
+
+def test_substring_index_finds_containing_and_contained_strings():
+    index = SubstringIndex([('pricing', 'a'), ('refund policy', 'b'), ('price', 'c')])
+
+    assert sorted(index.containing('pric')) == ['a', 'c']
+    assert index.containing('policy') == ['b']
+    assert sorted(index.contained_in('what is your refund policy and price?')) == ['b', 'c']
+
+
+def test_vector_index_returns_best_rows_first():
+    np = pytest.importorskip('numpy')
+    index = VectorIndex(np.array([[1.0, 0.0], [0.0, 2.0], [1.0, 1.0]]))
+
+    results = index.search([0.1, 1.0], top_k=2)
+    assert [row for row, _ in results] == [1, 2]
+    assert results[0][1] == pytest.approx(1.0 / np.sqrt(1.01), rel=1e-5)
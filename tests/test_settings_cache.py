@@ -0,0 +1,38 @@
+from services.settings_cache import SettingsCache
+
+
+def test_reloads_when_another_process_changes_a_setting(app_context):
+    from app import db, Settings, set_setting
+
+    cache = SettingsCache(check_interval=0)
+    set_setting('test_greeting', 'hello')
+    assert cache.get('test_greeting') == 'hello'
+    loads = cache.loads
+
+    # Unchanged generation: no reload
+    assert cache.get('test_greeting') == 'hello'
+    assert cache.loads == loads
+
+    # Another worker writes the value and bumps the generation
+    Settings.query.filter_by(key='test_greeting').update({'value': 'hi'})
+    cache.bump_generation()
+    db.session.commit()
+    assert cache.get('test_greeting') == 'hi'
+    assert cache.loads == loads + 1
+
+
+def test_lock_is_not_held_while_querying(app_context, monkeypatch):
+    from app import db
+
+    cache = SettingsCache(check_interval=0)
+    held = []
+    query = db.session.query
+
+    def watching_query(*args, **kwargs):
+        held.append(cache._lock.locked())
+        return query(*args, **kwargs)
+
+    monkeypatch.setattr(db.session, 'query', watching_query)
+    cache.get('anything')
+    cache.get('anything')
+    assert held and not any(held)
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from services.usage_buffer import UsageBuffer, UNIQUE_INDEX
+
+
+def usage_counts(chatbot_id):
+    from app import ChatbotUsage
+    rows = ChatbotUsage.query.filter_by(chatbot_id=chatbot_id).order_by(ChatbotUsage.id).all()
+    return [(row.website_domain, row.usage_count) for row in rows]
+
+
+@pytest.fixture
+def buffer(app):
+    # Long interval: the tests flush explicitly
+    return UsageBuffer(app, flush_interval=3600)
+
+
+@pytest.fixture
+def without_unique_index(app_context):
+    """chatbot_usage as it is on a database where the unique index migration was not run"""
+    from app import db
+    db.session.execute(text(f'DROP INDEX {UNIQUE_INDEX}'))
+    db.session.commit()
+    yield
+    db.session.rollback()
+    db.session.execute(text('DELETE FROM chatbot_usage'))
+    db.session.execute(text(f'CREATE UNIQUE INDEX {UNIQUE_INDEX} ON chatbot_usage (chatbot_id, website_domain)'))
+    db.session.commit()
+
+
+def test_flush_merges_counts_with_upsert(buffer, make_chatbot):
+    chatbot_id = make_chatbot()
+    assert buffer.check_schema() is True
+
+    for _ in range(3):
+        buffer.record(chatbot_id, 'a.example', 'https://a.example/')
+    buffer.record(chatbot_id, 'b.example', 'https://b.example/page')
+    assert buffer.flush() == 2
+    assert usage_counts(chatbot_id) == [('a.example', 3), ('b.example', 1)]
+
+    buffer.record(chatbot_id, 'a.example', 'https://a.example/')
+    buffer.flush()
+    assert usage_counts(chatbot_id) == [('a.example', 4), ('b.example', 1)]
+
+
+def test_flush_without_unique_index_updates_row_by_row(buffer, make_chatbot, without_unique_index):
+    from app import db, ChatbotUsage
+    chatbot_id = make_chatbot()
+    # Duplicates left over from before the migration
+    for _ in range(2):
+        db.session.add(ChatbotUsage(chatbot_id=chatbot_id, website_url='https://a.example/',
+                                    website_domain='a.example', usage_count=5))
+    db.session.commit()
+
+    assert buffer.check_schema() is False
+    buffer.record(chatbot_id, 'a.example', 'https://a.example/')
+    buffer.record(chatbot_id, 'c.example', 'https://c.example/')
+    assert buffer.flush() == 2
+    db.session.expire_all()
+    assert usage_counts(chatbot_id) == [('a.example', 6), ('a.example', 5), ('c.example', 1)]
+
+
+def test_failed_flush_keeps_counts(buffer, make_chatbot, monkeypatch):
+    chatbot_id = make_chatbot()
+    buffer.record(chatbot_id, 'a.example', 'https://a.example/')
+
+    def fail(pending):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(buffer, '_write', fail)
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    monkeypatch.undo()
+
+    buffer.record(chatbot_id, 'a.example', 'https://a.example/')
+    buffer.flush()
+    assert usage_counts(chatbot_id) == [('a.example', 2)]
+
+
+def test_usage_of_deleted_chatbot_is_dropped(buffer, app_context):
+    buffer.record(987654, 'gone.example', 'https://gone.example/')
+    assert buffer.flush() == 0
+    assert buffer._pending == {}